@@ -26,6 +26,7 @@ def create_app(config_object=None):
     _register_extensions(app)
     _register_jinja_globals(app)
     _register_blueprints(app)
+    _configure_biometrics(app)
     _ensure_models(app)
 
     return app
@@ -43,11 +44,11 @@ def _register_jinja_globals(app: Flask) -> None:
     """Registra funciones globales de Jinja."""
     
     def safe_csrf_token():
-        """Retorna el CSRF token si está disponible, cadena vacía si no."""
+        """Retorna el CSRF token de la sesión, cadena vacía fuera de un request."""
+        from app.csrf import generate_csrf_token
         try:
-            from flask_wtf.csrf import generate_csrf
-            return generate_csrf()
-        except (ImportError, RuntimeError):
+            return generate_csrf_token()
+        except RuntimeError:
             return ''
     
     app.jinja_env.globals['csrf_token'] = safe_csrf_token
@@ -61,6 +62,17 @@ def _register_blueprints(app: Flask) -> None:
     app.register_blueprint(auth)
 
 
+def _configure_biometrics(app: Flask) -> None:
+    """Activa las métricas biométricas y, si se pide, precarga los modelos."""
+    from app.metrics import configure_metrics
+    configure_metrics(app.config)
+
+    # Sin warm-up los modelos se cargan en el primer uso (o en los workers del motor)
+    if app.config.get('BIOMETRIC_WARM_UP'):
+        from app.services.biometrics.model_registry import warm_up
+        warm_up()
+
+
 def _ensure_models(app: Flask) -> None:
     """Verifica y descarga modelos ML al iniciar (solo si no es testing)."""
     if app.config.get('TESTING'):
@@ -1,13 +1,76 @@
 from flask import render_template, url_for, request, jsonify
 from flask_login import login_user, current_user, login_required
 from app import db
+from app.csrf import csrf_request_is_valid
+from app.logging_config import get_logger
 from app.models import User
 from app.services.biometrics import (
     pipelines,
     repository,
 )
+from app.services.biometrics.tracking import get_session_store
+from app.services.biometrics.engine import EngineError
 from .. import auth
 
+logger = get_logger('auth.biometric')
+
+# Cuerpos binarios aceptados (imagen sin Base64 ni JSON)
+BINARY_IMAGE_MIMETYPES = ('image/jpeg', 'image/png', 'application/octet-stream')
+POSE_FRAME_FIELD_PREFIX = 'pose_frame_'
+
+
+def _read_frame_request():
+    """
+    Extrae la imagen y los campos de una petición biométrica.
+    Acepta tres formatos:
+      - Cuerpo image/jpeg (campos en la query string)
+      - multipart/form-data con el archivo 'image' (campos en el formulario)
+      - JSON con la imagen en Base64 (formato original)
+    Los formatos binarios se leen directo a bytes, sin cadenas intermedias.
+    image/jpeg y multipart no fuerzan preflight CORS: las rutas que usan esta
+    función verifican antes el token CSRF (csrf_request_is_valid).
+
+    Returns:
+        tuple: (imagen: bytes | str | None, campos: dict-like)
+    """
+    if request.mimetype in BINARY_IMAGE_MIMETYPES:
+        return request.get_data(cache=False), request.args
+
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        return (upload.read() if upload else None), request.form
+
+    data = request.get_json(silent=True) or {}
+    return data.get('image'), data
+
+
+def _read_pose_frames(fields):
+    """Frames de pose del enrolamiento: archivos 'pose_frame_<POSE>' o lista JSON."""
+    if request.mimetype == 'multipart/form-data':
+        return [
+            {'pose': name[len(POSE_FRAME_FIELD_PREFIX):], 'image': upload.read()}
+            for name, upload in request.files.items(multi=True)
+            if name.startswith(POSE_FRAME_FIELD_PREFIX)
+        ]
+    return fields.get('pose_frames')
+
+
+def _busy_response(payload, error):
+    """503 con Retry-After cuando el motor rechaza o no completa el trabajo."""
+    logger.warning(f"Motor biométrico no disponible: {error}")
+    response = jsonify(payload)
+    response.status_code = 503
+    response.headers['Retry-After'] = str(getattr(error, 'retry_after', 1))
+    return response
+
+
+def _claimed_user_id(fields):
+    """user_id declarado como entero (los campos de formulario llegan como texto)."""
+    try:
+        return int(fields.get('user_id'))
+    except (TypeError, ValueError):
+        return None
+
 
 @auth.route('/face-enroll-page', methods=['GET'])
 @login_required
@@ -20,21 +83,41 @@ def face_login_page():
     return render_template('auth_biometric/face_login.html')
 
 
+@auth.route('/check-pose/session', methods=['POST'])
+@login_required
+def start_pose_session():
+    """Abre una sesión de seguimiento para el desafío de pose."""
+    if not csrf_request_is_valid():
+        return jsonify({'error': 'Token CSRF inválido'}), 400
+    token = get_session_store().create(current_user.id)
+    return jsonify({'session': token})
+
+
 @auth.route('/check-pose', methods=['POST'])
 @login_required
 def check_pose():
     """Valida si el usuario está cumpliendo el movimiento solicitado (Sin guardar)."""
+    if not csrf_request_is_valid():
+        return jsonify({'valid': False, 'message': 'Token CSRF inválido'}), 400
+
     try:
-        data = request.get_json()
-        if not data or 'image' not in data:
+        image_data, fields = _read_frame_request()
+        if not image_data:
             return jsonify({'valid': False, 'message': 'Imagen requerida'}), 400
 
-        target_pose = data.get('pose', 'CENTER')
-        image_data = data['image']
+        target_pose = fields.get('pose', 'CENTER')
         
-        is_valid, msg = pipelines.validate_pose_challenge(image_data, target_pose)
-        return jsonify({'valid': is_valid, 'message': msg})
+        # Sesión de seguimiento opcional (clientes sin token usan detección completa)
+        token = fields.get('session')
+        session = get_session_store().get(token, current_user.id) if token else None
+        if token and session is None:
+            return jsonify({'valid': False, 'restart': True, 'message': 'Sesión expirada, reinicia el desafío'})
+        
+        is_valid, msg = pipelines.validate_pose_challenge(image_data, target_pose, session)
+        return jsonify({'valid': is_valid, 'message': msg, 'restart': bool(session and session.broken)})
 
+    except EngineError as e:
+        return _busy_response({'valid': False, 'message': 'Servidor ocupado, reintenta'}, e)
     except Exception as e:
         print(f"Error Check Pose: {e}")
         return jsonify({'valid': False, 'message': 'Error IA'}), 500
@@ -43,23 +126,44 @@ def check_pose():
 @auth.route('/face-enroll', methods=['POST'])
 @login_required
 def face_enroll():
+    if not csrf_request_is_valid():
+        return jsonify({'error': 'Token CSRF inválido'}), 400
+
     try:
-        data = request.get_json()
-        if not data or 'image' not in data:
+        image_data, fields = _read_frame_request()
+        if not image_data:
             return jsonify({'error': 'Sin imagen'}), 400
 
-        image_data = data['image']
-        
+        # Si el desafío se hizo con sesión, todos sus frames deben ser del mismo rostro.
+        # La sesión se consume solo tras guardar: un fallo permite reintentar el envío
+        token = fields.get('pose_session')
+        session = get_session_store().get(token, current_user.id) if token else None
+        if token and (session is None or not session.is_complete()):
+            return jsonify({'error': 'Desafío de pose inválido, reinícialo'}), 400
+
         success, message, encoding = pipelines.enroll_biometric_pipeline(image_data)
         
         if not success:
             return jsonify({'error': message}), 400
         
         if encoding is not None:
-            repository.save_face_encoding(current_user, encoding)
+            # Plantillas extra de los frames de pose (CENTER/LEFT/RIGHT) del mismo rostro.
+            # Solo con un desafío completo: sin sesión los frames no prueban continuidad
+            pose_frames = _read_pose_frames(fields) if session is not None else None
+            extra_templates = pipelines.extract_pose_templates(pose_frames, encoding)
+            if extra_templates:
+                saved = repository.save_face_templates(current_user, [('CENTER', encoding)] + extra_templates)
+            else:
+                saved = repository.save_face_encoding(current_user, encoding)
+            if not saved:
+                return jsonify({'error': 'No se pudo guardar el registro, reintenta'}), 500
         
+        if session is not None:
+            get_session_store().pop(token, current_user.id)
         return jsonify({'message': message, 'redirect': '/dashboard'})
 
+    except EngineError as e:
+        return _busy_response({'error': 'Servidor ocupado, reintenta'}, e)
     except Exception as e:
         print(f"ERROR ENROLL: {e}")
         return jsonify({'error': 'Error interno del servidor'}), 500
@@ -70,14 +174,20 @@ def face_login():
     if current_user.is_authenticated:
         return jsonify({'status': 'redirect', 'url': url_for('main.dashboard')})
 
+    if not csrf_request_is_valid():
+        return jsonify({'status': 'error', 'message': 'Token CSRF inválido'}), 400
+
     try:
-        data = request.get_json()
-        if not data or 'image' not in data:
+        image_data, fields = _read_frame_request()
+        if not image_data:
             return jsonify({'status': 'error', 'message': 'Sin datos de imagen'}), 400
 
-        image_data = data['image']
-        
-        success, message, matching_user = pipelines.login_biometric_pipeline(image_data)
+        # Identidad declarada opcional: activa la verificación 1:1
+        success, message, matching_user = pipelines.login_biometric_pipeline(
+            image_data,
+            username=fields.get('username') or None,
+            user_id=_claimed_user_id(fields),
+        )
         
         if success and matching_user:
             login_user(matching_user)
@@ -85,6 +195,8 @@ def face_login():
         else:
             return jsonify({'status': 'error', 'message': message}), 401
 
+    except EngineError as e:
+        return _busy_response({'status': 'error', 'message': 'Servidor ocupado, reintenta'}, e)
     except Exception as e:
         print(f"ERROR LOGIN: {e}")
         return jsonify({'status': 'error', 'message': 'Error de sistema'}), 500
@@ -1,12 +1,41 @@
 from flask import render_template, redirect, url_for, flash, request, session
 from flask_login import login_user, logout_user, current_user
-from app import db, bcrypt, limiter
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from app import db, limiter
 from app.models import User
+from app.services.passwords import HasherError, check_password, hash_password, schedule_rehash
 from ..utils import send_confirmation_email, send_reset_email
 from .. import auth
 import re
 from datetime import datetime
 
+BUSY_MESSAGE = 'El servidor está ocupado. Intenta de nuevo en unos segundos.'
+
+TAKEN_MESSAGES = {
+    'username': 'El usuario ya existe.',
+    'email': 'Ese correo ya está registrado.',
+    'phone_number': 'Ese número de teléfono ya está registrado.',
+}
+
+
+def _taken_fields(username, email, phone):
+    """
+    Retorna los campos únicos ya ocupados, en el orden de TAKEN_MESSAGES.
+    Una sola consulta (OR sobre los índices únicos de User) para los tres.
+    """
+    # Sin teléfono no hay colisión posible (NULL no choca con el índice único)
+    values = {name: value for name, value in
+              (('username', username), ('email', email), ('phone_number', phone)) if value is not None}
+    rows = (
+        User.query.with_entities(User.username, User.email, User.phone_number)
+        .filter(or_(*(getattr(User, name) == value for name, value in values.items())))
+        .limit(3)
+        .all()
+    )
+    return [name for name in TAKEN_MESSAGES
+            if name in values and any(getattr(row, name) == values[name] for row in rows)]
+
 
 @auth.route("/register", methods=['GET', 'POST'])
 def register():
@@ -25,23 +54,28 @@ def register():
             flash('La contraseña no cumple los requisitos de seguridad.', 'danger')
             return redirect(url_for('auth.register'))
 
-        if User.query.filter_by(username=username).first():
-            flash('El usuario ya existe.', 'danger')
-            return redirect(url_for('auth.register'))
-        
-        if User.query.filter_by(email=email).first():
-            flash('Ese correo ya está registrado.', 'danger')
-            return redirect(url_for('auth.register'))
-
-        if User.query.filter_by(phone_number=phone).first():
-            flash('Ese número de teléfono ya está registrado.', 'danger')
+        # Una sola consulta para los tres campos únicos (antes de pagar el hash)
+        taken = _taken_fields(username, email, phone)
+        if taken:
+            flash(TAKEN_MESSAGES[taken[0]], 'danger')
             return redirect(url_for('auth.register'))
 
-        hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
+        try:
+            hashed_pw = hash_password(password)
+        except HasherError:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth_password/register.html'), 503
         
         user = User(username=username, email=email, phone_number=phone, password=hashed_pw, confirmed=False)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Registro concurrente con los mismos datos: los índices únicos deciden
+            db.session.rollback()
+            taken = _taken_fields(username, email, phone)
+            flash(TAKEN_MESSAGES[taken[0]] if taken else 'No se pudo crear la cuenta. Intenta de nuevo.', 'danger')
+            return redirect(url_for('auth.register'))
         
         send_confirmation_email(user)
         flash('Cuenta creada. ¡Revisa tu correo para activar tu cuenta!', 'info')
@@ -80,8 +114,17 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         user = User.query.filter_by(username=username).first()
-        
-        if user and bcrypt.check_password_hash(user.password, password):
+
+        try:
+            valid = user is not None and check_password(user.password, password)
+        except HasherError:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth_password/login.html'), 503
+
+        if valid:
+            # Hash por debajo de la política vigente: se recalcula en segundo plano
+            schedule_rehash(user, password)
+
             if not user.confirmed:
                 flash('Debes confirmar tu correo electrónico antes de entrar.', 'warning')
                 return render_template('auth_password/login.html')
@@ -135,8 +178,11 @@ def reset_token(token):
             flash('La contraseña es débil.', 'danger')
             return redirect(url_for('auth.reset_token', token=token))
 
-        hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
-        user.password = hashed_pw
+        try:
+            user.password = hash_password(password)
+        except HasherError:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth_password/reset_token.html'), 503
         db.session.commit()
         flash('Contraseña actualizada. Inicia sesión.', 'success')
         return redirect(url_for('auth.login'))
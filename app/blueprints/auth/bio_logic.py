@@ -1,21 +1,9 @@
-import cv2
 import numpy as np
-import dlib
-import os
 from scipy.spatial import distance as dist
 
-# --- CONFIGURACIÓN ---
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-MODEL_PATH = os.path.join(BASE_DIR, 'static', 'models', 'shape_predictor_68_face_landmarks.dat')
-
-predictor = None
-try:
-    if os.path.exists(MODEL_PATH):
-        predictor = dlib.shape_predictor(MODEL_PATH)
-    else:
-        print("CRITICAL: Modelo de landmarks no encontrado.")
-except Exception as e:
-    print(f"CRITICAL: Error cargando Dlib: {e}")
+# El predictor se comparte con app.services.biometrics vía el registro de
+# modelos: se carga una sola vez por proceso y solo al primer uso
+from app.services.biometrics.model_registry import get_landmark_predictor
 
 # Puntos clave
 NOSE_TIP = 30
@@ -28,9 +16,11 @@ MOUTH_TOP = 51
 
 def get_face_metrics(gray, rect):
     """Extrae métricas geométricas clave para determinar pose."""
+    predictor = get_landmark_predictor()
     if predictor is None:
         return None
 
+    import dlib
     dlib_rect = dlib.rectangle(int(rect[3]), int(rect[0]), int(rect[1]), int(rect[2]))
     shape = predictor(gray, dlib_rect)
     coords = np.zeros((68, 2), dtype="int")
@@ -132,7 +122,7 @@ def analyze_face_structure(gray_image, rect, img_width, img_height):
     Retorna: (EsValido, Mensaje)
     Valida: Liveness (Ojos), Proximidad, Yaw y Pitch (pose neutra).
     """
-    if predictor is None:
+    if get_landmark_predictor() is None:
         return True, "Modo Dev (Sin Modelo)"
 
     try:
@@ -1,6 +1,8 @@
-from flask import render_template
+from flask import Response, abort, render_template
 from flask_login import login_required, current_user
 
+from app.extensions import limiter
+from app.metrics import registry
 from . import main
 
 
@@ -15,3 +17,12 @@ def home():
 def dashboard():
     estado_2fa = "ACTIVADO" if current_user.otp_secret else "DESACTIVADO"
     return render_template('main/dashboard.html', usuario=current_user.username, estado_2fa=estado_2fa)
+
+
+@main.route("/metrics")
+@limiter.exempt
+def metrics():
+    """Métricas de la aplicación (biometría, contraseñas) en formato de texto de Prometheus."""
+    if not registry.enabled:
+        abort(404)
+    return Response(registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
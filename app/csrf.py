@@ -0,0 +1,72 @@
+"""
+Token CSRF para las peticiones que no pasan por un formulario WTForms.
+
+Las rutas biométricas aceptan cuerpos image/jpeg y multipart/form-data, que
+un formulario de otro sitio puede enviar sin preflight CORS: el token de la
+sesión debe llegar en la cabecera X-CSRFToken (o en el campo csrf_token).
+
+Si Flask-WTF está instalado se usan su token y su validación (el mismo token
+que renderizan las plantillas); si no, un token aleatorio guardado en la
+sesión firmada de Flask. `WTF_CSRF_ENABLED = False` desactiva la verificación.
+"""
+
+import hmac
+import secrets
+
+from flask import current_app, request, session
+
+CSRF_HEADER = 'X-CSRFToken'
+CSRF_FIELD = 'csrf_token'
+SESSION_KEY = '_csrf_token'
+
+
+def generate_csrf_token():
+    """
+    Retorna el token CSRF de la sesión actual, creándolo si no existe.
+
+    Returns:
+        str: Token a enviar en la cabecera X-CSRFToken
+    """
+    try:
+        from flask_wtf.csrf import generate_csrf
+    except ImportError:
+        if SESSION_KEY not in session:
+            session[SESSION_KEY] = secrets.token_urlsafe(32)
+        return session[SESSION_KEY]
+    return generate_csrf()
+
+
+def validate_csrf_token(token):
+    """
+    Verifica un token CSRF contra el de la sesión.
+
+    Args:
+        token (str): Token recibido en la petición
+
+    Returns:
+        bool: True si el token es válido
+    """
+    if not token:
+        return False
+    try:
+        from flask_wtf.csrf import validate_csrf
+        from wtforms import ValidationError
+    except ImportError:
+        expected = session.get(SESSION_KEY)
+        return bool(expected) and hmac.compare_digest(expected, token)
+    try:
+        validate_csrf(token)
+    except ValidationError:
+        return False
+    return True
+
+
+def csrf_request_is_valid():
+    """
+    True si la petición actual trae un token CSRF válido (o la verificación
+    está desactivada por configuración).
+    """
+    if not current_app.config.get('WTF_CSRF_ENABLED', True):
+        return True
+    token = request.headers.get(CSRF_HEADER) or request.form.get(CSRF_FIELD)
+    return validate_csrf_token(token)
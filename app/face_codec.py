@@ -0,0 +1,77 @@
+"""
+Formato binario de los encodings faciales almacenados en BD.
+
+Formato v1 (513 bytes):
+  - 1 byte de cabecera con la versión del formato (0x01)
+  - 128 valores float32 little-endian (512 bytes)
+
+Los blobs heredados (pickle de un ndarray float64) se siguen leyendo
+mientras dura la migración (ver repository.migrate_face_encodings).
+"""
+
+import pickle
+
+import numpy as np
+
+ENCODING_DIM = 128
+FORMAT_LEGACY = 0x00  # Pickle heredado
+FORMAT_V1 = 0x01
+ENCODING_DTYPE = np.dtype('<f4')
+V1_SIZE = 1 + ENCODING_DIM * ENCODING_DTYPE.itemsize
+
+_PICKLE_PROTO = 0x80
+
+# Modelo que produce los encodings (ResNet de dlib vía face_recognition).
+# Encodings de modelos distintos no son comparables entre sí.
+MODEL_VERSION = 'dlib_resnet_v1'
+
+
+def encode_face_encoding(encoding):
+    """
+    Serializa un encoding facial al formato v1.
+
+    Args:
+        encoding (ndarray): Vector de 128 características
+
+    Returns:
+        bytes: Cabecera + 128 float32 little-endian
+    """
+    vector = np.asarray(encoding, dtype=ENCODING_DTYPE).reshape(ENCODING_DIM)
+    return bytes((FORMAT_V1,)) + vector.tobytes()
+
+
+def decode_face_encoding(blob):
+    """
+    Deserializa un encoding facial aceptando el formato v1 y el pickle heredado.
+    En v1 la lectura es zero-copy: el array retornado es una vista de solo
+    lectura sobre `blob`.
+
+    Args:
+        blob (bytes): Contenido de la columna FaceTemplate.encoding
+
+    Returns:
+        ndarray: Vector (128,) o None si el blob está vacío
+
+    Raises:
+        ValueError: Si el blob no corresponde a ningún formato conocido
+    """
+    if not blob:
+        return None
+
+    if len(blob) == V1_SIZE and blob[0] == FORMAT_V1:
+        return np.frombuffer(blob, dtype=ENCODING_DTYPE, count=ENCODING_DIM, offset=1)
+
+    if blob[0] == _PICKLE_PROTO:
+        return np.asarray(pickle.loads(blob))
+
+    raise ValueError(f"Formato de encoding desconocido (cabecera 0x{blob[0]:02x})")
+
+
+def is_legacy_blob(blob):
+    """True si el blob aún no está en el formato v1 y debe migrarse."""
+    return bool(blob) and not (len(blob) == V1_SIZE and blob[0] == FORMAT_V1)
+
+
+def blob_format(blob):
+    """Versión de formato de un blob: FORMAT_V1 o FORMAT_LEGACY."""
+    return FORMAT_LEGACY if is_legacy_blob(blob) else FORMAT_V1
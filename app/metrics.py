@@ -0,0 +1,116 @@
+"""
+Registro de métricas de la aplicación.
+Responsabilidades:
+  - Acumular histogramas de duración indexados por nombre y etiquetas
+  - Exponer el registro en formato de texto de Prometheus (/metrics)
+
+Es un módulo sin dependencias pesadas: lo comparten los servicios biométricos
+y el de contraseñas sin que uno cargue al otro (OpenCV, dlib).
+"""
+
+import threading
+from bisect import bisect_left
+
+# Límites superiores (segundos) de los buckets de los histogramas
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos (no thread-safe por sí solo)."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # El último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Registro en memoria de histogramas indexados por nombre y etiquetas."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.enabled = False
+        self.buckets = buckets
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        """Registra el texto HELP de una métrica para la exposición."""
+        self._help[name] = help_text
+
+    def observe(self, name, labels, value):
+        """
+        Registra una observación.
+
+        Args:
+            name (str): Nombre de la métrica
+            labels (tuple): Pares (etiqueta, valor) en orden fijo
+            value (float): Duración en segundos
+        """
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def get(self, name, **labels):
+        """Retorna el histograma de una serie, o None si no tiene observaciones."""
+        return self._histograms.get((name, tuple(labels.items())))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render_prometheus(self):
+        """
+        Serializa el registro en formato de texto de Prometheus (v0.0.4).
+
+        Returns:
+            str: Exposición con HELP/TYPE y las series _bucket, _sum y _count
+        """
+        with self._lock:
+            series = sorted(
+                (name, labels, list(h.counts), h.sum, h.count)
+                for (name, labels), h in self._histograms.items()
+            )
+
+        lines = []
+        current = None
+        for name, labels, counts, total, count in series:
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            base = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            prefix = f"{base}," if base else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f"{{{base}}}" if base else ''
+            lines.append(f"{name}_sum{suffix} {total}")
+            lines.append(f"{name}_count{suffix} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Registro del proceso
+registry = MetricsRegistry()
+
+
+def configure_metrics(app_config):
+    """Activa o desactiva el registro según BIOMETRIC_METRICS_ENABLED."""
+    registry.enabled = bool(app_config.get('BIOMETRIC_METRICS_ENABLED', False))
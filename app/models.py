@@ -3,18 +3,47 @@ from flask import current_app
 from flask_login import UserMixin
 from itsdangerous import URLSafeTimedSerializer as Serializer
 from datetime import datetime
-import pickle # <--- NECESARIO PARA SERIALIZAR LA HUELLA FACIAL
+from app.face_codec import FORMAT_V1, MODEL_VERSION, encode_face_encoding, decode_face_encoding
+from app.user_cache import get_user_cache, invalidate_user, request_users
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """
+    Resuelve el usuario de la sesión: primero en el request, luego en la caché
+    entre requests y solo si falla en la BD.
+    """
+    user_id = int(user_id)
+    users = request_users()
+    if user_id in users:
+        return users[user_id]
+
+    # Una instancia ya presente en la sesión (quizá modificada) manda sobre la caché
+    user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+    if user is None:
+        cache = get_user_cache()
+        row = cache.get(user_id)
+        if row is not None:
+            # Instancia desconectada y sin cambios: merge(load=False) la adjunta sin SELECT.
+            # Las columnas de seguridad no se cachean: se leen de la BD al usarlas
+            user = User(**row)
+            make_transient_to_detached(user)
+            user = db.session.merge(user, load=False)
+        else:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                cache.put(user_id, {key: getattr(user, key) for key in CACHED_USER_COLUMNS})
+
+    users[user_id] = user
+    return user
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(20), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     phone_number = db.Column(db.String(20), unique=True, nullable=True)
-    password = db.Column(db.String(60), nullable=False)
+    password = db.Column(db.String(255), nullable=False)  # Hash con prefijo del algoritmo (ver services/passwords)
     
     # Estados
     confirmed = db.Column(db.Boolean, nullable=False, default=False)
@@ -25,9 +54,10 @@ class User(db.Model, UserMixin):
     otp_secret = db.Column(db.String(32), nullable=True)
     backup_codes = db.Column(db.String(250), nullable=True)
 
-    # BIOMETRÍA FACIAL (NUEVO)
-    # Guardamos los 128 números como un objeto binario (LargeBinary)
-    face_encoding = db.Column(db.LargeBinary, nullable=True)
+    # BIOMETRÍA FACIAL: el encoding vive en FaceTemplate, fuera de esta fila
+    face_template = db.relationship(
+        'FaceTemplate', uselist=False, lazy='select', cascade='all, delete-orphan',
+    )
 
     def get_token(self, salt='default-salt'):
         s = Serializer(current_app.config['SECRET_KEY'])
@@ -42,17 +72,146 @@ class User(db.Model, UserMixin):
             return None
         return User.query.get(user_id)
 
-    # Métodos auxiliares para manejar la biometría
+    # Métodos auxiliares para manejar la biometría (fachada sobre FaceTemplate)
     def set_face_encoding(self, encoding_array):
-        """Convierte el array de numpy a bytes para guardarlo en BD"""
-        if encoding_array is not None:
-            self.face_encoding = pickle.dumps(encoding_array)
-    
+        """Convierte el array de numpy a bytes y lo guarda en la plantilla del usuario"""
+        if encoding_array is None:
+            return
+        if self.face_template is None:
+            self.face_template = FaceTemplate()
+        self.face_template.set_encoding(encoding_array)
+
     def get_face_encoding(self):
-        """Recupera los bytes de la BD y los convierte a array de numpy"""
-        if self.face_encoding:
-            return pickle.loads(self.face_encoding)
-        return None
+        """Recupera el encoding de la plantilla como array de numpy (acepta pickle heredado)"""
+        if self.face_template is None:
+            return None
+        return decode_face_encoding(self.face_template.encoding)
+
+    def clear_face_encoding(self):
+        """Elimina la plantilla facial del usuario (delete-orphan borra la fila)"""
+        self.face_template = None
+
+    @property
+    def has_face_template(self):
+        """True si el usuario está enrolado (consulta por clave primaria, sin leer el blob)"""
+        if 'face_template' in self.__dict__:
+            return self.face_template is not None
+        return db.session.query(
+            FaceTemplate.query.filter_by(user_id=self.id).exists()
+        ).scalar()
+
+    def __repr__(self):
+        return f"User('{self.username}', '{self.email}')"
+
+
+class FaceTemplate(db.Model):
+    """
+    Encoding facial principal del usuario, separado de la fila User para que
+    las consultas de autenticación no arrastren el blob y la galería no
+    recorra la tabla de usuarios. Con enrolamiento multi-plantilla guarda el
+    centroide de las plantillas (ver FaceSample).
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    encoding = db.Column(db.LargeBinary, nullable=False)  # Formato v1 (app/face_codec.py)
+    format_version = db.Column(db.SmallInteger, nullable=False, default=FORMAT_V1)
+    model_version = db.Column(db.String(40), nullable=False, default=MODEL_VERSION)
+    enrolled_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def set_encoding(self, encoding_array):
+        """Guarda un encoding nuevo (formato v1, modelo actual) y renueva la fecha de enrolamiento"""
+        self.encoding = encode_face_encoding(encoding_array)
+        self.format_version = FORMAT_V1
+        self.model_version = MODEL_VERSION
+        self.enrolled_at = datetime.utcnow()
+
+    def __repr__(self):
+        return f"FaceTemplate(user={self.user_id}, model='{self.model_version}')"
+
+
+# Columnas que deciden el acceso: nunca se sirven desde la caché entre requests
+SECURITY_USER_COLUMNS = ('password', 'confirmed', 'otp_secret', 'backup_codes')
+
+# Columnas que guarda la caché del user_loader
+CACHED_USER_COLUMNS = tuple(
+    attr.key for attr in User.__mapper__.column_attrs if attr.key not in SECURITY_USER_COLUMNS
+)
+
+# Clave de Session.info con los usuarios escritos en la transacción en curso
+_DIRTY_USERS = 'dirty_user_ids'
+
+
+def _mark_user_dirty(session, user_id):
+    """Anota un usuario a invalidar cuando la transacción confirme (None = todos)."""
+    session.info.setdefault(_DIRTY_USERS, set()).add(user_id)
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    # El flush no es visible para otros requests hasta el commit: invalidar
+    # ahora dejaría que uno concurrente volviera a cachear la fila anterior
+    _mark_user_dirty(object_session(target), target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed_users(session):
+    dirty = session.info.pop(_DIRTY_USERS, ())
+    if None in dirty:
+        invalidate_user()
+        return
+    for user_id in dirty:
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_users(session):
+    session.info.pop(_DIRTY_USERS, None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _invalidate_cached_users_on_bulk(orm_execute_state):
+    """UPDATE/DELETE masivos sobre User (no disparan los eventos del mapper)."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if not any(mapper.class_ is User for mapper in orm_execute_state.all_mappers):
+        return
+    params = orm_execute_state.parameters
+    if isinstance(params, list) and all('id' in row for row in params):
+        # executemany por clave primaria: solo esos usuarios
+        for row in params:
+            _mark_user_dirty(orm_execute_state.session, row['id'])
+    else:
+        _mark_user_dirty(orm_execute_state.session, None)
+
+
+class FaceSample(db.Model):
+    """
+    Plantilla facial individual (enrolamiento multi-plantilla).
+    El encoding principal del usuario (FaceTemplate) guarda el centroide
+    de sus plantillas, usado en la primera pasada de la búsqueda 1:N.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    pose = db.Column(db.String(10), nullable=False, default='CENTER')
+    encoding = db.Column(db.LargeBinary, nullable=False)  # Formato v1 (app/face_codec.py)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"FaceSample(user={self.user_id}, pose='{self.pose}')"
+
+
+class BiometricChange(db.Model):
+    """
+    Bitácora de escrituras biométricas.
+    El id autoincremental es la generación de la galería: cada worker compara
+    su última generación aplicada con MAX(id) y recarga solo los user_id nuevos.
+    """
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     def __repr__(self):
-        return f"User('{self.username}', '{self.email}')"
\ No newline at end of file
+        return f"BiometricChange({self.id}, user={self.user_id})"
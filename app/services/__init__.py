@@ -3,6 +3,14 @@ Paquete de servicios de la aplicación.
 Agrupa la lógica de negocio separada de las rutas (blueprints).
 """
 
-from . import biometrics
+import importlib
 
-__all__ = ['biometrics']
+__all__ = ['biometrics', 'passwords']
+
+
+def __getattr__(name):
+    # Cada servicio se importa en su primer uso: el de contraseñas no debe
+    # cargar OpenCV ni dlib a través del paquete biométrico
+    if name in __all__:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,55 +3,188 @@ Paquete de servicios biométricos.
 Expone las funciones principales de manera limpia.
 """
 
+from .frame import FrameContext
+
+from .model_registry import (
+    ModelRegistry,
+    get_landmark_predictor,
+    get_face_recognition,
+    warm_up as warm_up_models,
+)
+
 from .encoders import (
+    decode_frame,
+    decode_pose_frame,
     decode_base64_image,
     detect_faces,
+    detect_faces_in_frame,
+    detect_faces_in_region,
+    detection_scale,
     extract_face_encodings,
+    encode_faces,
     prepare_image_for_encoding,
 )
 
 from .pose_checks import (
     validate_pose,
     analyze_face_structure,
+    box_within_reach,
+    box_too_far,
     get_face_metrics,
+    get_frame_metrics,
+    compute_face_metrics,
+    shape_to_array,
     eye_aspect_ratio,
+    FaceMetrics,
 )
 
 from .repository import (
     save_face_encoding,
+    save_face_templates,
+    save_face_templates_bulk,
     load_face_encoding,
     get_all_face_encodings,
     compare_faces,
     find_matching_user,
     clear_face_encoding,
+    get_gallery,
+    load_gallery,
+    migrate_face_encodings,
+    move_face_encodings_to_templates,
+    sync_gallery,
+    prune_biometric_changes,
+    get_claimed_user,
+    verify_user_face,
+)
+
+from .gallery import FaceGallery, TemplateStore
+
+from .ann_index import (
+    FaceIndex,
+    IVFIndex,
+    create_face_index,
+)
+
+from .engine import (
+    BiometricEngine,
+    InlineEngine,
+    ProcessPoolEngine,
+    EngineError,
+    EngineBusyError,
+    EngineTimeoutError,
+    create_engine,
+    get_engine,
+)
+
+from .admission import (
+    AdmissionController,
+    OverloadedError,
+    get_admission_controller,
+)
+
+from .metrics import (
+    MetricsRegistry,
+    registry as metrics_registry,
+    pipeline_timer,
+    configure_metrics,
+)
+
+from .tracking import (
+    PoseSession,
+    PoseSessionStore,
+    get_session_store,
 )
 
 from .pipelines import (
     enroll_biometric_pipeline,
     login_biometric_pipeline,
     validate_pose_challenge,
+    extract_pose_templates,
+    encode_face_batch,
+    enroll_images_bulk,
 )
 
 __all__ = [
+    # Frame
+    'FrameContext',
+    # Model registry
+    'ModelRegistry',
+    'get_landmark_predictor',
+    'get_face_recognition',
+    'warm_up_models',
     # Encoders
+    'decode_frame',
+    'decode_pose_frame',
     'decode_base64_image',
     'detect_faces',
+    'detect_faces_in_frame',
+    'detect_faces_in_region',
+    'detection_scale',
     'extract_face_encodings',
+    'encode_faces',
     'prepare_image_for_encoding',
     # Pose checks
     'validate_pose',
     'analyze_face_structure',
+    'box_within_reach',
+    'box_too_far',
     'get_face_metrics',
+    'get_frame_metrics',
+    'compute_face_metrics',
+    'shape_to_array',
     'eye_aspect_ratio',
+    'FaceMetrics',
     # Repository
     'save_face_encoding',
+    'save_face_templates',
+    'save_face_templates_bulk',
     'load_face_encoding',
     'get_all_face_encodings',
     'compare_faces',
     'find_matching_user',
     'clear_face_encoding',
+    'get_gallery',
+    'load_gallery',
+    'migrate_face_encodings',
+    'move_face_encodings_to_templates',
+    'sync_gallery',
+    'prune_biometric_changes',
+    'get_claimed_user',
+    'verify_user_face',
+    # Gallery
+    'FaceGallery',
+    'TemplateStore',
+    # ANN index
+    'FaceIndex',
+    'IVFIndex',
+    'create_face_index',
+    # Engine
+    'BiometricEngine',
+    'InlineEngine',
+    'ProcessPoolEngine',
+    'EngineError',
+    'EngineBusyError',
+    'EngineTimeoutError',
+    'create_engine',
+    'get_engine',
+    # Admission
+    'AdmissionController',
+    'OverloadedError',
+    'get_admission_controller',
+    # Metrics
+    'MetricsRegistry',
+    'metrics_registry',
+    'pipeline_timer',
+    'configure_metrics',
+    # Tracking
+    'PoseSession',
+    'PoseSessionStore',
+    'get_session_store',
     # Pipelines
     'enroll_biometric_pipeline',
     'login_biometric_pipeline',
     'validate_pose_challenge',
+    'extract_pose_templates',
+    'encode_face_batch',
+    'enroll_images_bulk',
 ]
@@ -0,0 +1,155 @@
+"""
+Control de admisión de trabajos biométricos (back-pressure).
+Responsabilidades:
+  - Contar los trabajos biométricos en curso y estimar la espera en cola
+  - Rechazar de inmediato (503 + Retry-After) cuando la espera estimada
+    supera el presupuesto, antes de que los clientes agoten su timeout
+  - Priorizar flujos: se descarta primero /check-pose, luego /face-login
+    y por último /face-enroll
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+
+from app.logging_config import get_logger
+from app.services.biometrics.engine import EngineError, ProcessPoolEngine, get_engine
+
+logger = get_logger('biometrics.admission')
+
+FLOW_POSE = 'check_pose'
+FLOW_LOGIN = 'login'
+FLOW_ENROLL = 'enroll'
+
+# Fracción del presupuesto de espera que tolera cada flujo: al crecer la
+# cola los flujos de menor prioridad se descartan antes
+FLOW_BUDGET_SHARE = {
+    FLOW_POSE: 0.5,
+    FLOW_LOGIN: 0.8,
+    FLOW_ENROLL: 1.0,
+}
+
+DEFAULT_QUEUE_BUDGET = 2.0
+# Duración inicial estimada de un trabajo, hasta tener mediciones
+_INITIAL_SERVICE_TIME = 0.5
+_EWMA_ALPHA = 0.2
+
+
+class OverloadedError(EngineError):
+    """El trabajo se rechazó para mantener acotada la latencia."""
+
+    def __init__(self, flow, retry_after):
+        super().__init__(f"Carga biométrica excedida ({flow}), reintentar en {retry_after}s")
+        self.flow = flow
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Estima la espera en cola como (trabajos en curso / capacidad) x duración
+    media de un trabajo (promedio móvil exponencial) y la compara con el
+    presupuesto asignado a cada flujo.
+    """
+
+    def __init__(self, capacity, budget=DEFAULT_QUEUE_BUDGET,
+                 initial_service_time=_INITIAL_SERVICE_TIME):
+        self.capacity = max(1, capacity)
+        self.budget = budget
+        self._service_time = initial_service_time
+        self._in_flight = {flow: 0 for flow in FLOW_BUDGET_SHARE}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        """Trabajos biométricos en curso (todos los flujos)."""
+        return sum(self._in_flight.values())
+
+    @property
+    def service_time(self):
+        """Duración media estimada de un trabajo (segundos)."""
+        return self._service_time
+
+    def estimated_wait(self):
+        """Espera estimada (segundos) para un trabajo que llega ahora."""
+        return self.in_flight / self.capacity * self._service_time
+
+    @contextmanager
+    def admit(self, flow):
+        """
+        Admite un trabajo del flujo dado o lo rechaza de inmediato.
+
+        Raises:
+            OverloadedError: Si la espera estimada supera el presupuesto del flujo
+        """
+        allowed = self.budget * FLOW_BUDGET_SHARE[flow]
+        with self._lock:
+            wait = self.estimated_wait()
+            if wait > allowed:
+                retry_after = max(1, math.ceil(wait - allowed))
+                logger.warning(
+                    f"Rechazado {flow}: espera estimada {wait:.2f}s > {allowed:.2f}s "
+                    f"({self.in_flight} en curso)"
+                )
+                raise OverloadedError(flow, retry_after)
+            self._in_flight[flow] += 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight[flow] -= 1
+                self._service_time += _EWMA_ALPHA * (elapsed - self._service_time)
+
+
+def create_admission_controller(app_config):
+    """
+    Factory que retorna el controlador según configuración.
+    Con el motor inline no hay cola propia que acotar: cada request procesa en
+    su propio hilo, así que la admisión solo se activa si se configura
+    BIOMETRIC_ADMISSION_CAPACITY (p. ej. con los hilos del servidor).
+
+    Args:
+        app_config: Objeto de configuración Flask (current_app.config)
+
+    Returns:
+        AdmissionController: Controlador, o None si la admisión está desactivada
+    """
+    if not app_config.get('BIOMETRIC_ADMISSION_ENABLED', True):
+        return None
+
+    capacity = app_config.get('BIOMETRIC_ADMISSION_CAPACITY')
+    if not capacity:
+        engine = get_engine()
+        if not isinstance(engine, ProcessPoolEngine):
+            return None
+        capacity = engine.workers
+    return AdmissionController(
+        capacity=capacity,
+        budget=app_config.get('BIOMETRIC_QUEUE_BUDGET', DEFAULT_QUEUE_BUDGET),
+    )
+
+
+_controller = None
+_controller_lock = threading.Lock()
+_controller_ready = False
+
+
+def get_admission_controller():
+    """
+    Retorna el controlador del proceso, creándolo en el primer uso.
+    Fuera de un contexto de aplicación no hay control de admisión.
+    """
+    global _controller, _controller_ready
+    if not has_app_context():
+        return None
+    if not _controller_ready:
+        with _controller_lock:
+            if not _controller_ready:
+                _controller = create_admission_controller(current_app.config)
+                _controller_ready = True
+    return _controller
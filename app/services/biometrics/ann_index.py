@@ -0,0 +1,216 @@
+"""
+Módulo de índices de vecinos aproximados (ANN) para identificación 1:N.
+Responsabilidades:
+  - Definir la interfaz de índices enchufables detrás de la galería
+  - Implementar un índice IVF (inverted file) en NumPy con re-ranking exacto
+  - Seleccionar el índice según configuración
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from app.logging_config import get_logger
+from app.services.biometrics.gallery import ENCODING_DIM, FaceGallery
+
+logger = get_logger('biometrics.ann_index')
+
+
+class FaceIndex(ABC):
+    """Interfaz abstracta para índices de búsqueda sobre la galería."""
+
+    @property
+    @abstractmethod
+    def ready(self) -> bool:
+        """True si el índice puede responder consultas (si no, la galería hace scan exacto)."""
+        pass
+
+    @abstractmethod
+    def build(self, encodings, user_ids):
+        """Reconstruye el índice a partir de la galería completa."""
+        pass
+
+    @abstractmethod
+    def add(self, user_id, encoding):
+        """Inserta o reemplaza un encoding."""
+        pass
+
+    @abstractmethod
+    def remove(self, user_id):
+        """Elimina el encoding de un usuario."""
+        pass
+
+    @abstractmethod
+    def search(self, query, k=1):
+        """
+        Busca los `k` vecinos más cercanos a `query`.
+
+        Returns:
+            tuple: (user_ids, distancias exactas) ordenados por distancia
+        """
+        pass
+
+    def needs_rebuild(self, gallery_size) -> bool:
+        """Indica si la galería debe llamar a `build` tras cambiar de tamaño."""
+        return False
+
+
+class IVFIndex(FaceIndex):
+    """
+    Índice IVF-Flat: particiona la galería con k-means en `nlist` listas
+    invertidas y en cada consulta solo explora las `nprobe` listas cuyos
+    centroides están más cerca. Los candidatos se re-rankean con la distancia
+    euclidiana exacta, por lo que la tolerancia conserva su semántica.
+
+    Mientras la galería tenga menos de `min_train_size` encodings el índice
+    no está entrenado y la galería responde con el scan exacto.
+    """
+
+    def __init__(self, nlist=256, nprobe=8, min_train_size=2048,
+                 train_sample_per_list=64, kmeans_iters=8, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.train_sample_per_list = train_sample_per_list
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+
+        self._centroids = None
+        self._lists = []
+        self._assignment = {}
+        self._trained_size = 0
+
+    @property
+    def ready(self):
+        return self._centroids is not None
+
+    def needs_rebuild(self, gallery_size):
+        if self._centroids is None:
+            return gallery_size >= self.min_train_size
+        # Re-entrenar cuando la galería duplica el tamaño del último entrenamiento
+        return gallery_size >= 2 * self._trained_size
+
+    def build(self, encodings, user_ids):
+        encodings = np.asarray(encodings, dtype=np.float32)
+        size = encodings.shape[0]
+        if size < self.min_train_size:
+            self._reset()
+            return
+
+        rng = np.random.default_rng(self.seed)
+        nlist = min(self.nlist, size)
+        sample_size = min(size, nlist * self.train_sample_per_list)
+        sample = encodings[rng.choice(size, sample_size, replace=False)]
+        centroids = _kmeans(sample, nlist, self.kmeans_iters, rng)
+
+        assigned = _nearest_centroid(encodings, centroids)
+        order = np.argsort(assigned, kind='stable')
+        bounds = np.searchsorted(assigned[order], np.arange(nlist + 1))
+        lists = []
+        for list_no in range(nlist):
+            members = order[bounds[list_no]:bounds[list_no + 1]]
+            inverted = FaceGallery()
+            inverted.load_arrays(encodings[members], user_ids[members])
+            lists.append(inverted)
+        assignment = dict(zip(np.asarray(user_ids).tolist(), assigned.tolist()))
+
+        self._centroids = centroids
+        self._lists = lists
+        self._assignment = assignment
+        self._trained_size = size
+        logger.info(f"Índice IVF entrenado: {size} encodings en {nlist} listas")
+
+    def add(self, user_id, encoding):
+        if self._centroids is None:
+            return
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM)
+        list_no = int(_nearest_centroid(encoding, self._centroids)[0])
+        previous = self._assignment.get(user_id)
+        if previous is not None and previous != list_no:
+            self._lists[previous].remove(user_id)
+        self._lists[list_no].upsert(user_id, encoding[0])
+        self._assignment[user_id] = list_no
+
+    def remove(self, user_id):
+        list_no = self._assignment.pop(user_id, None)
+        if list_no is not None:
+            self._lists[list_no].remove(user_id)
+
+    def search(self, query, k=1):
+        if self._centroids is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32).reshape(ENCODING_DIM)
+
+        centroid_dist = _squared_distances(query[None, :], self._centroids)[0]
+        nprobe = min(self.nprobe, len(self._lists))
+        probe = np.argpartition(centroid_dist, nprobe - 1)[:nprobe]
+
+        # Re-ranking exacto: cada lista devuelve sus k mejores con distancia real
+        results = [self._lists[list_no].search(query, k) for list_no in probe]
+        user_ids = np.concatenate([ids for ids, _ in results])
+        distances = np.concatenate([dist for _, dist in results])
+        order = np.argsort(distances)[:k]
+        return user_ids[order], distances[order]
+
+    def _reset(self):
+        self._centroids = None
+        self._lists = []
+        self._assignment = {}
+        self._trained_size = 0
+
+
+def _squared_distances(points, centroids):
+    """Distancias euclidianas al cuadrado (P, K) vía ||x||² - 2x·c + ||c||²."""
+    p_norm = np.einsum('ij,ij->i', points, points)[:, None]
+    c_norm = np.einsum('ij,ij->i', centroids, centroids)[None, :]
+    return np.maximum(p_norm - 2.0 * points @ centroids.T + c_norm, 0.0)
+
+
+def _nearest_centroid(points, centroids, chunk=65536):
+    """Asigna cada punto a su centroide más cercano, procesando por bloques."""
+    assigned = np.empty(points.shape[0], dtype=np.int64)
+    for start in range(0, points.shape[0], chunk):
+        block = points[start:start + chunk]
+        assigned[start:start + chunk] = np.argmin(_squared_distances(block, centroids), axis=1)
+    return assigned
+
+
+def _kmeans(data, k, iters, rng):
+    """K-means (Lloyd) sobre `data`; los clusters vacíos se re-siembran al azar."""
+    centroids = data[rng.choice(data.shape[0], k, replace=False)].copy()
+    for _ in range(iters):
+        assigned = _nearest_centroid(data, centroids)
+        counts = np.bincount(assigned, minlength=k)
+        one_hot = np.zeros((data.shape[0], k), dtype=np.float32)
+        one_hot[np.arange(data.shape[0]), assigned] = 1.0
+        sums = one_hot.T @ data
+
+        empty = counts == 0
+        counts[empty] = 1
+        centroids = sums / counts[:, None]
+        if empty.any():
+            centroids[empty] = data[rng.choice(data.shape[0], int(empty.sum()), replace=False)]
+    return centroids.astype(np.float32)
+
+
+def create_face_index(app_config):
+    """
+    Factory que retorna el índice ANN según configuración.
+
+    Args:
+        app_config: Objeto de configuración Flask (current_app.config)
+
+    Returns:
+        FaceIndex: Índice configurado, o None para scan exacto ('flat')
+    """
+    index_name = app_config.get('BIOMETRIC_INDEX', 'flat')
+
+    if index_name == 'ivf':
+        return IVFIndex(
+            nlist=app_config.get('BIOMETRIC_IVF_NLIST', 256),
+            nprobe=app_config.get('BIOMETRIC_IVF_NPROBE', 8),
+            min_train_size=app_config.get('BIOMETRIC_IVF_MIN_TRAIN_SIZE', 2048),
+        )
+
+    # Default: búsqueda exacta sobre la galería completa
+    return None
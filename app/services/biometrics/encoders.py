@@ -1,69 +1,160 @@
 """
 Módulo de codificación facial (Extractores de características biométricas).
 Responsabilidades:
-  - Decodificación de imágenes Base64
-  - Detección de rostros usando face_recognition
+  - Decodificación de imágenes Base64 o binarias (opcionalmente reducida y solo en gris)
+  - Detección de rostros usando face_recognition (opcionalmente sobre una copia reducida
+    o solo en la región alrededor de un rostro seguido)
   - Generación de vectores de características faciales (face encodings)
 """
 
 import base64
 import cv2
 import numpy as np
-import face_recognition
+from flask import current_app, has_app_context
 
 from app.logging_config import get_logger
+from app.services.biometrics.frame import FrameContext
+from app.services.biometrics.model_registry import get_face_recognition
 
 logger = get_logger('biometrics.encoders')
 
+# Ancho (px) que debe conservar el rostro más pequeño aceptable tras reducir
+# la imagen. La ventana HOG de dlib es de 80 px; el margen cubre que la caja
+# detectada es algo más estrecha que el ancho mandibular usado en proximidad.
+DEFAULT_DETECT_MIN_FACE_PX = 100
 
-def decode_base64_image(image_data):
+# Factor de reducción al decodificar frames de desafíos de pose
+DEFAULT_POSE_DECODE_REDUCTION = 2
+
+# Margen de la región de seguimiento alrededor de la última caja (fracción del rostro)
+DEFAULT_TRACK_PADDING = 0.5
+
+# Flags de OpenCV para decodificar directamente a 1/2, 1/4 o 1/8 de resolución
+# (en JPEG la reducción se hace en el dominio DCT, sin decodificar a tamaño completo)
+_IMREAD_FLAGS = {
+    (1, False): cv2.IMREAD_COLOR,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+    (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def _setting(name, default):
+    """Lee un ajuste de la app Flask activa, o `default` fuera de contexto."""
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def _image_buffer(image_data):
     """
-    Decodifica una imagen Base64 a formato OpenCV.
+    Retorna los bytes comprimidos de la imagen como buffer uint8.
+    Los bytes crudos (cuerpo image/jpeg o archivo multipart) se envuelven sin
+    copia; las cadenas se tratan como Base64 con prefijo data URI opcional.
+    """
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return np.frombuffer(image_data, np.uint8)
+    
+    # Remover prefijo data URI si existe
+    if ',' in image_data:
+        encoded = image_data.split(',')[1]
+    else:
+        encoded = image_data
+    
+    # Decodificar Base64
+    return np.frombuffer(base64.b64decode(encoded), np.uint8)
+
+
+def decode_frame(image_data, reduction=1, gray_only=False):
+    """
+    Decodifica una imagen (Base64 o bytes crudos) a un FrameContext.
+    Solo se decodifica una imagen (BGR, o gris si gray_only); las vistas
+    derivadas se calculan bajo demanda la primera vez que alguna etapa las pide.
     
     Args:
-        image_data (str): Datos de imagen en Base64 (con o sin prefijo 'data:image/jpeg;base64,')
+        image_data (str | bytes): Imagen en Base64 (con o sin prefijo
+            'data:image/jpeg;base64,') o bytes JPEG/PNG sin codificar
+        reduction (int): Decodificar a 1/reduction de resolución (1, 2, 4 u 8)
+        gray_only (bool): Decodificar directamente a un canal gris (sin vista BGR/RGB)
     
     Returns:
-        tuple: (imagen_BGR, imagen_gris) o (None, None) si hay error
+        FrameContext: Frame decodificado, o None si hay error
     """
     try:
-        # Remover prefijo data URI si existe
-        if ',' in image_data:
-            encoded = image_data.split(',')[1]
-        else:
-            encoded = image_data
+        nparr = _image_buffer(image_data)
+        if nparr.size == 0:
+            logger.warning("Imagen vacía")
+            return None
         
-        # Decodificar Base64
-        nparr = np.frombuffer(base64.b64decode(encoded), np.uint8)
-        img_bgr = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = cv2.imdecode(nparr, _IMREAD_FLAGS[(reduction, gray_only)])
         
-        if img_bgr is None:
+        if image is None:
             logger.warning("cv2.imdecode retornó None - imagen corrupta")
-            return None, None
-        
-        # Convertir a escala de grises
-        img_gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+            return None
         
-        return img_bgr, img_gray
+        if gray_only:
+            return FrameContext(gray=image, reduction=reduction)
+        return FrameContext(bgr=image, reduction=reduction)
     
     except Exception as e:
-        logger.error(f"Error decodificando imagen Base64: {e}", exc_info=True)
+        logger.error(f"Error decodificando imagen: {e}", exc_info=True)
+        return None
+
+
+def decode_pose_frame(image_data):
+    """
+    Decodificación para desafíos de pose: solo gris y a resolución reducida
+    (BIOMETRIC_POSE_DECODE_REDUCTION). Las métricas de pose son proporciones,
+    por lo que no dependen de la resolución.
+    
+    Args:
+        image_data (str | bytes): Imagen en Base64 o bytes sin codificar
+    
+    Returns:
+        FrameContext: Frame gris reducido, o None si hay error
+    """
+    reduction = _setting('BIOMETRIC_POSE_DECODE_REDUCTION', DEFAULT_POSE_DECODE_REDUCTION)
+    return decode_frame(image_data, reduction=reduction, gray_only=True)
+
+
+def decode_base64_image(image_data, reduction=1, gray_only=False):
+    """
+    Decodifica una imagen Base64 a formato OpenCV.
+    
+    Args:
+        image_data (str): Datos de imagen en Base64 (con o sin prefijo 'data:image/jpeg;base64,')
+        reduction (int): Decodificar a 1/reduction de resolución (1, 2, 4 u 8)
+        gray_only (bool): Decodificar solo en gris (la imagen BGR retornada es None)
+    
+    Returns:
+        tuple: (imagen_BGR, imagen_gris) o (None, None) si hay error
+    """
+    frame = decode_frame(image_data, reduction=reduction, gray_only=gray_only)
+    if frame is None:
         return None, None
+    return frame.bgr, frame.gray
 
 
-def detect_faces(image_gray, model="hog"):
+def detect_faces(image_gray, model="hog", upsample=1):
     """
     Detecta rostros en una imagen usando face_recognition.
     
     Args:
         image_gray (ndarray): Imagen en escala de grises
         model (str): Modelo de detección ('hog' o 'cnn'). HOG es rápido, CNN es más preciso.
+        upsample (int): Veces que se amplía la imagen antes de detectar (rostros pequeños)
     
     Returns:
         list: Lista de rectanglos (top, right, bottom, left) de rostros detectados
     """
     try:
-        boxes = face_recognition.face_locations(image_gray, model=model)
+        boxes = get_face_recognition().face_locations(
+            image_gray, number_of_times_to_upsample=upsample, model=model
+        )
         logger.debug(f"Rostros detectados: {len(boxes)}")
         return boxes
     except Exception as e:
@@ -71,6 +162,112 @@ def detect_faces(image_gray, model="hog"):
         return []
 
 
+def detection_scale(image_width, min_face_ratio, min_face_px=None):
+    """
+    Calcula la escala de reducción para detectar rostros.
+    Se elige la menor escala en la que el rostro más pequeño que aún pasaría
+    el chequeo de proximidad (min_face_ratio * ancho) conserva `min_face_px`.
+    
+    Args:
+        image_width (int): Ancho de la imagen completa
+        min_face_ratio (float): Proximidad mínima exigida (ancho rostro / ancho imagen)
+        min_face_px (int): Ancho mínimo del rostro tras reducir (default: configuración)
+    
+    Returns:
+        float: Escala en (0, 1]; 1.0 significa detectar a resolución completa
+    """
+    if min_face_px is None:
+        min_face_px = _setting('BIOMETRIC_DETECT_MIN_FACE_PX', DEFAULT_DETECT_MIN_FACE_PX)
+    
+    if not min_face_px or min_face_ratio <= 0:
+        return 1.0
+    return min(1.0, min_face_px / (image_width * min_face_ratio))
+
+
+def detect_faces_in_frame(frame, min_face_ratio, model="hog"):
+    """
+    Detecta rostros sobre una copia reducida del frame y remapea las cajas a
+    coordenadas de resolución completa (para landmarks y encoding).
+    
+    Args:
+        frame (FrameContext): Frame decodificado
+        min_face_ratio (float): Proximidad mínima que exigirá la validación posterior
+        model (str): Modelo de detección ('hog' o 'cnn')
+    
+    Returns:
+        list: Rectángulos (top, right, bottom, left) en coordenadas de la imagen completa
+    """
+    scale = detection_scale(frame.width, min_face_ratio)
+    if scale >= 1.0:
+        return detect_faces(frame.gray, model=model)
+    
+    # A esta escala el rostro mínimo ya supera la ventana HOG: no hace falta ampliar
+    boxes = detect_faces(frame.downscaled_gray(scale), model=model, upsample=0)
+    return [_remap_box(box, scale, frame.width, frame.height) for box in boxes]
+
+
+def detect_faces_in_region(frame, box, padding=None, min_face_px=None, model="hog"):
+    """
+    Busca rostros solo en una región de interés alrededor de una caja previa
+    (seguimiento entre frames consecutivos). El recorte se reduce para que el
+    rostro conserve `min_face_px` de ancho y las cajas se remapean al frame.
+
+    Args:
+        frame (FrameContext): Frame decodificado
+        box (tuple): Última caja conocida (top, right, bottom, left)
+        padding (float): Margen del recorte en fracciones del tamaño de la caja
+            (default: configuración)
+        min_face_px (int): Ancho del rostro tras reducir (default: configuración)
+        model (str): Modelo de detección ('hog' o 'cnn')
+
+    Returns:
+        list: Rectángulos (top, right, bottom, left) en coordenadas del frame
+    """
+    if padding is None:
+        padding = _setting('BIOMETRIC_TRACK_PADDING', DEFAULT_TRACK_PADDING)
+    if min_face_px is None:
+        min_face_px = _setting('BIOMETRIC_DETECT_MIN_FACE_PX', DEFAULT_DETECT_MIN_FACE_PX)
+
+    top, right, bottom, left = box
+    pad_x = int((right - left) * padding)
+    pad_y = int((bottom - top) * padding)
+    x0, y0 = max(0, left - pad_x), max(0, top - pad_y)
+    x1, y1 = min(frame.width, right + pad_x), min(frame.height, bottom + pad_y)
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return []
+
+    crop = frame.gray[y0:y1, x0:x1]
+    scale = min(1.0, min_face_px / max(1, right - left)) if min_face_px else 1.0
+    if scale < 1.0:
+        size = (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale)))
+        crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+    else:
+        crop = np.ascontiguousarray(crop)
+
+    # El rostro ocupa buena parte del recorte: no hace falta ampliar
+    boxes = detect_faces(crop, model=model, upsample=0)
+    return [
+        _offset_box(_remap_box(found, scale, x1 - x0, y1 - y0), x0, y0)
+        for found in boxes
+    ]
+
+
+def _offset_box(box, dx, dy):
+    top, right, bottom, left = box
+    return (top + dy, right + dx, bottom + dy, left + dx)
+
+
+def _remap_box(box, scale, width, height):
+    """Lleva una caja (top, right, bottom, left) de la imagen reducida a la completa."""
+    top, right, bottom, left = box
+    return (
+        max(0, int(round(top / scale))),
+        min(width, int(round(right / scale))),
+        min(height, int(round(bottom / scale))),
+        max(0, int(round(left / scale))),
+    )
+
+
 def extract_face_encodings(image_bgr, face_boxes):
     """
     Extrae vectores de características faciales (embeddings) de los rostros detectados.
@@ -83,14 +280,33 @@ def extract_face_encodings(image_bgr, face_boxes):
         list: Lista de arrays NumPy con las características faciales (128D vectors)
     """
     try:
-        # Convertir BGR a RGB (face_recognition requiere RGB)
+        # Convertir BGR a RGB (face_recognition requiere RGB); cvtColor ya
+        # retorna un buffer nuevo C-contiguous
         img_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-        
-        # Asegurar que el array es continuo en memoria (C-contiguous)
-        img_rgb = np.array(img_rgb, copy=True, order='C')
-        
-        # Generar encodings
-        encodings = face_recognition.face_encodings(img_rgb, face_boxes)
+    except Exception as e:
+        logger.error(f"Error extrayendo encodings: {e}", exc_info=True)
+        return []
+    return encode_faces(img_rgb, face_boxes)
+
+
+def encode_faces(image_rgb, face_boxes):
+    """
+    Extrae encodings de una imagen que ya está en RGB (p. ej. FrameContext.rgb).
+    El encoder se alinea siempre con el predictor de 5 puntos de
+    face_recognition, como las plantillas ya guardadas (MODEL_VERSION): los
+    landmarks de 68 puntos de la app darían otra alineación y desplazarían
+    las distancias respecto de la tolerancia.
+    
+    Args:
+        image_rgb (ndarray): Imagen RGB C-contiguous
+        face_boxes (list): Lista de rectángulos (top, right, bottom, left)
+    
+    Returns:
+        list: Lista de arrays NumPy con las características faciales (128D vectors)
+    """
+    try:
+        face_recognition = get_face_recognition()
+        encodings = face_recognition.face_encodings(image_rgb, face_boxes, model='small')
         logger.debug(f"Encodings extraídos: {len(encodings)}")
         return encodings
     
@@ -0,0 +1,311 @@
+"""
+Motor de ejecución de tareas biométricas.
+Responsabilidades:
+  - Ejecutar las tareas de `tasks` en el hilo del request (InlineEngine) o en
+    un pool de procesos de larga vida que esquiva el GIL (ProcessPoolEngine)
+  - Pasar los frames decodificados a los workers por memoria compartida
+  - Acotar la cola de trabajos pendientes y el tiempo de espera por trabajo
+
+Selección vía BIOMETRIC_ENGINE: 'inline' (default) | 'process'.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing import get_context, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from flask import current_app, has_app_context
+
+from app.logging_config import get_logger
+from app.services.biometrics.frame import FrameContext
+from app.workers import default_workers
+
+logger = get_logger('biometrics.engine')
+
+DEFAULT_JOB_TIMEOUT = 10.0
+
+
+class EngineError(RuntimeError):
+    """Error base del motor biométrico."""
+
+
+class EngineBusyError(EngineError):
+    """La cola de trabajos del motor está llena."""
+
+
+class EngineTimeoutError(EngineError):
+    """Un trabajo superó su tiempo máximo."""
+
+
+class BiometricEngine(ABC):
+    """Interfaz de los motores que ejecutan tareas biométricas."""
+
+    @abstractmethod
+    def run(self, task, frame, *args, timeout=None):
+        """
+        Ejecuta `task(frame, *args)` y retorna su resultado.
+
+        Args:
+            task (callable): Función de nivel de módulo de `tasks`
+            frame (FrameContext): Frame decodificado
+            *args: Argumentos adicionales (serializables)
+            timeout (float): Segundos máximos de espera (default del motor)
+
+        Raises:
+            EngineBusyError: Si la cola está llena
+            EngineTimeoutError: Si el trabajo no terminó a tiempo
+        """
+
+    def map(self, task, jobs, timeout=None):
+        """
+        Ejecuta `task(frame, *args)` para cada par (frame, args) de `jobs`.
+
+        Args:
+            task (callable): Función de nivel de módulo de `tasks`
+            jobs (list): Pares (FrameContext, tuple de argumentos adicionales)
+            timeout (float): Segundos máximos de espera por trabajo
+
+        Returns:
+            list: Resultados en el mismo orden que `jobs`
+        """
+        return [self.run(task, frame, *args, timeout=timeout) for frame, args in jobs]
+
+    def shutdown(self):
+        """Libera los recursos del motor."""
+
+
+class InlineEngine(BiometricEngine):
+    """Ejecuta las tareas en el hilo del request (desarrollo y tests)."""
+
+    def run(self, task, frame, *args, timeout=None):
+        return task(frame, *args)
+
+
+class ProcessPoolEngine(BiometricEngine):
+    """
+    Pool de procesos de larga vida. Cada worker carga el predictor y el
+    encoder una sola vez al arrancar; los frames viajan por memoria
+    compartida en lugar de serializarse con pickle.
+    """
+
+    def __init__(self, workers=None, max_pending=None, job_timeout=DEFAULT_JOB_TIMEOUT,
+                 start_method='spawn'):
+        self.workers = workers or default_workers()
+        self.max_pending = max_pending or 2 * self.workers
+        self.job_timeout = job_timeout
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context(start_method),
+            initializer=_init_worker,
+        )
+        logger.info(
+            f"Motor biométrico: {self.workers} procesos, "
+            f"cola máxima {self.max_pending}, timeout {self.job_timeout}s"
+        )
+
+    @property
+    def pending(self):
+        """Trabajos encolados o en ejecución."""
+        return self._pending
+
+    def run(self, task, frame, *args, timeout=None):
+        timeout = timeout or self.job_timeout
+        future, slot = self._submit(task, frame, args)
+
+        timed_out = False
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            timed_out = True
+            future.cancel()
+            raise EngineTimeoutError(f"{task.__name__} superó {timeout}s")
+        finally:
+            if not timed_out:
+                slot.release()
+
+    def map(self, task, jobs, timeout=None):
+        """
+        Reparte un lote entre los workers manteniendo como máximo un trabajo
+        por proceso en vuelo, para no acaparar la cola de los requests.
+        """
+        timeout = timeout or self.job_timeout
+        jobs = list(jobs)
+        results = [None] * len(jobs)
+        in_flight = {}
+        next_job = 0
+        try:
+            while next_job < len(jobs) or in_flight:
+                while next_job < len(jobs) and len(in_flight) < self.workers:
+                    frame, args = jobs[next_job]
+                    future, slot = self._submit(task, frame, args)
+                    in_flight[future] = (next_job, slot)
+                    next_job += 1
+
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    raise EngineTimeoutError(f"{task.__name__} superó {timeout}s")
+                for future in done:
+                    index, slot = in_flight.pop(future)
+                    slot.release()
+                    results[index] = future.result()
+        finally:
+            # Los trabajos que queden liberan su cupo al terminar (done-callback)
+            for future in in_flight:
+                future.cancel()
+        return results
+
+    def _submit(self, task, frame, args):
+        """Reserva un cupo, comparte el frame y encola el trabajo."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise EngineBusyError("Cola del motor biométrico llena")
+            self._pending += 1
+
+        slot = _JobSlot(self)
+        try:
+            slot.shm, spec = _share_frame(frame)
+            future = self._executor.submit(_run_shared, task, spec, args)
+        except Exception:
+            slot.release()
+            raise
+
+        # Si el request abandona la espera por timeout, el cupo y la memoria se
+        # liberan cuando el trabajo termina de verdad en el worker
+        future.add_done_callback(lambda _: slot.release())
+        return future, slot
+
+    def _free_slot(self):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _JobSlot:
+    """Cupo de un trabajo en la cola del motor; se libera una sola vez."""
+
+    def __init__(self, engine):
+        self.shm = None
+        self._engine = engine
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        # Todo bajo el lock: quien llegue segundo espera a que el cupo quede libre
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+            if self.shm is not None:
+                self.shm.close()
+                try:
+                    self.shm.unlink()
+                except FileNotFoundError:
+                    pass
+            self._engine._free_slot()
+
+
+def _share_frame(frame):
+    """Copia la imagen fuente del frame a un bloque de memoria compartida."""
+    color = frame.bgr is not None
+    image = frame.bgr if color else frame.gray
+    shm = SharedMemory(create=True, size=max(image.nbytes, 1))
+    np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+    spec = (shm.name, image.shape, image.dtype.str, color, frame.reduction)
+    return shm, spec
+
+
+def _init_worker():
+    """Carga los modelos una sola vez por worker, antes de su primer trabajo."""
+    from app.services.biometrics.model_registry import warm_up
+    warm_up()
+
+
+def _attach_shared(name):
+    """
+    Se adjunta a un bloque de memoria compartida sin registrarlo en el
+    resource_tracker del worker (bpo-39959). El dueño del bloque es el proceso
+    que lo creó; si el worker lo registrara, su tracker podría destruirlo al
+    salir o reportarlo como fuga.
+    """
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # Versiones anteriores registran siempre al adjuntarse. Quitar el registro
+    # después (unregister) falla cuando el worker comparte el tracker del padre
+    # (spawn/fork): el padre ya lo retira al hacer unlink. Se evita el registro
+    # mientras dura la llamada; el worker ejecuta un trabajo a la vez.
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _run_shared(task, spec, args):
+    """Reconstruye el frame desde memoria compartida y ejecuta la tarea (en el worker)."""
+    name, shape, dtype, color, reduction = spec
+    shm = _attach_shared(name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        if color:
+            frame = FrameContext(bgr=image, reduction=reduction)
+        else:
+            frame = FrameContext(gray=image, reduction=reduction)
+        result = task(frame, *args)
+        # Soltar las vistas sobre el buffer antes de cerrarlo
+        del frame, image
+        return result
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # Aún hay vistas vivas (p. ej. en un traceback): se cierra al recolectarlas
+            pass
+
+
+def create_engine(app_config):
+    """
+    Factory que retorna el motor según configuración.
+
+    Args:
+        app_config: Objeto de configuración Flask (current_app.config)
+
+    Returns:
+        BiometricEngine: Motor configurado
+    """
+    if app_config.get('BIOMETRIC_ENGINE', 'inline') == 'process':
+        return ProcessPoolEngine(
+            workers=app_config.get('BIOMETRIC_ENGINE_WORKERS') or None,
+            max_pending=app_config.get('BIOMETRIC_ENGINE_MAX_PENDING') or None,
+            job_timeout=app_config.get('BIOMETRIC_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT),
+        )
+    return InlineEngine()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_inline_engine = InlineEngine()
+
+
+def get_engine():
+    """
+    Retorna el motor del proceso, creándolo en el primer uso.
+    Fuera de un contexto de aplicación (scripts, tests) se ejecuta en línea.
+    """
+    global _engine
+    if not has_app_context():
+        return _inline_engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(current_app.config)
+    return _engine
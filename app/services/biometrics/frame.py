@@ -0,0 +1,85 @@
+"""
+Módulo de contexto de frame (una imagen por request).
+Responsabilidades:
+  - Conservar la imagen decodificada una sola vez por request
+  - Calcular bajo demanda y memorizar las vistas gris, RGB y reducidas
+  - Guardar los landmarks de cada rostro para que todas las etapas los compartan
+"""
+
+import cv2
+
+
+class FrameContext:
+    """
+    Frame decodificado con vistas derivadas perezosas.
+
+    Cada conversión (BGR→gris, BGR→RGB, reducción de escala) se ejecuta como
+    máximo una vez por frame y solo si alguna etapa la necesita. Las vistas
+    son arrays C-contiguous listos para dlib/face_recognition.
+    """
+
+    def __init__(self, bgr=None, gray=None, reduction=1):
+        if bgr is None and gray is None:
+            raise ValueError("FrameContext requiere una imagen BGR o gris")
+        # Factor con el que se decodificó respecto al archivo original (1, 2, 4, 8)
+        self.reduction = reduction
+        self._bgr = bgr
+        self._gray = gray
+        self._rgb = None
+        self._scaled = {}
+        # Etapa de landmarks: métricas por caja y veces que corrió el predictor
+        self.landmarks = {}
+        self.predictor_calls = 0
+
+    @property
+    def bgr(self):
+        """Imagen original BGR (None si el frame se decodificó solo en gris)."""
+        return self._bgr
+
+    @property
+    def gray(self):
+        """Vista en escala de grises (memorizada)."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def rgb(self):
+        """Vista RGB C-contiguous para face_recognition (memorizada)."""
+        if self._rgb is None:
+            if self._bgr is None:
+                raise ValueError("El frame se decodificó solo en escala de grises")
+            # cvtColor ya retorna un buffer nuevo y contiguo: no hace falta copiar
+            self._rgb = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    @property
+    def height(self):
+        return self._source.shape[0]
+
+    @property
+    def width(self):
+        return self._source.shape[1]
+
+    def downscaled_gray(self, scale):
+        """
+        Vista gris reducida por `scale` (0 < scale <= 1), memorizada por escala.
+
+        Args:
+            scale (float): Factor de escala respecto a la resolución completa
+
+        Returns:
+            ndarray: Imagen gris reducida (o la vista completa si scale >= 1)
+        """
+        if scale >= 1.0:
+            return self.gray
+        scaled = self._scaled.get(scale)
+        if scaled is None:
+            size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+            scaled = cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA)
+            self._scaled[scale] = scaled
+        return scaled
+
+    @property
+    def _source(self):
+        return self._bgr if self._bgr is not None else self._gray
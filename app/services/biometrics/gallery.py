@@ -0,0 +1,388 @@
+"""
+Módulo de galería biométrica en memoria.
+Responsabilidades:
+  - Mantener todos los encodings faciales en una matriz contigua float32 (N, 128)
+  - Resolver búsquedas 1:N con un único cálculo vectorizado de distancias
+  - Aplicar altas, actualizaciones y bajas incrementales sin recargar la BD
+  - Delegar las búsquedas en un índice ANN opcional (ver ann_index)
+  - Re-rankear candidatos con plantillas múltiples por usuario (best-of-k)
+"""
+
+import threading
+
+import numpy as np
+
+from app.logging_config import get_logger
+
+logger = get_logger('biometrics.gallery')
+
+ENCODING_DIM = 128
+_INITIAL_CAPACITY = 64
+
+
+class FaceGallery:
+    """
+    Galería de encodings faciales con layout contiguo.
+
+    Las filas válidas ocupan siempre el rango [0, len(galería)): las bajas
+    mueven la última fila al hueco, de modo que la búsqueda opera sobre un
+    único bloque de memoria sin máscaras ni huecos.
+
+    Si se asigna un índice (`set_index`), la galería le reenvía cada alta y
+    baja y le delega las búsquedas una vez que está entrenado.
+
+    Cada fila guarda el encoding principal (centroide) del usuario; las
+    plantillas individuales viven aparte en `templates`.
+    """
+
+    def __init__(self, index=None, rerank_k=8):
+        self._lock = threading.RLock()
+        self._index = index
+        self.rerank_k = rerank_k
+        self.templates = TemplateStore()
+        self._encodings = np.empty((_INITIAL_CAPACITY, ENCODING_DIM), dtype=np.float32)
+        self._user_ids = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+        self._rows = {}
+        self._size = 0
+        self.loaded = False
+        # Última generación de la bitácora aplicada (ver repository.sync_gallery)
+        self.generation = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    @property
+    def encodings(self):
+        """Vista (N, 128) float32 de los encodings válidos."""
+        return self._encodings[:self._size]
+
+    @property
+    def user_ids(self):
+        """Vista (N,) int64 de los ids de usuario, paralela a `encodings`."""
+        return self._user_ids[:self._size]
+
+    def set_index(self, index):
+        """Asigna (o quita, con None) el índice ANN y lo construye si corresponde."""
+        with self._lock:
+            self._index = index
+            if index is not None:
+                index.build(self.encodings, self.user_ids)
+
+    def load(self, items):
+        """
+        Reemplaza el contenido completo de la galería.
+
+        Args:
+            items (iterable): Pares (user_id, encoding)
+        """
+        latest = {}
+        for user_id, encoding in items:
+            latest[user_id] = encoding
+
+        encodings = np.empty((len(latest), ENCODING_DIM), dtype=np.float32)
+        for row, encoding in enumerate(latest.values()):
+            encodings[row] = encoding
+        self.load_arrays(encodings, np.fromiter(latest.keys(), dtype=np.int64, count=len(latest)))
+
+    def load_arrays(self, encodings, user_ids):
+        """
+        Reemplaza el contenido completo de la galería a partir de arrays ya armados.
+
+        Args:
+            encodings (ndarray): Matriz (N, 128)
+            user_ids (ndarray): Ids (N,) sin duplicados, paralelos a `encodings`
+        """
+        size = len(user_ids)
+        capacity = max(_INITIAL_CAPACITY, size)
+        new_encodings = np.empty((capacity, ENCODING_DIM), dtype=np.float32)
+        new_user_ids = np.empty(capacity, dtype=np.int64)
+        new_encodings[:size] = encodings
+        new_user_ids[:size] = user_ids
+        rows = {user_id: row for row, user_id in enumerate(new_user_ids[:size].tolist())}
+
+        with self._lock:
+            self._encodings = new_encodings
+            self._user_ids = new_user_ids
+            self._rows = rows
+            self._size = size
+            self.loaded = True
+            if self._index is not None:
+                self._index.build(self.encodings, self.user_ids)
+
+        logger.debug(f"Galería cargada: {size} encodings")
+
+    def upsert(self, user_id, encoding):
+        """Inserta o reemplaza el encoding de un usuario."""
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                self._ensure_capacity(self._size + 1)
+                row = self._size
+                self._user_ids[row] = user_id
+                self._rows[user_id] = row
+                self._size += 1
+            self._encodings[row] = encoding
+
+            if self._index is not None:
+                if self._index.needs_rebuild(self._size):
+                    self._index.build(self.encodings, self.user_ids)
+                else:
+                    self._index.add(user_id, self._encodings[row])
+
+    def remove(self, user_id):
+        """
+        Elimina el encoding de un usuario (si existe).
+
+        Returns:
+            bool: True si el usuario estaba en la galería
+        """
+        with self._lock:
+            self.templates.remove(user_id)
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return False
+            if self._index is not None:
+                self._index.remove(user_id)
+
+            last = self._size - 1
+            if row != last:
+                moved_id = int(self._user_ids[last])
+                self._encodings[row] = self._encodings[last]
+                self._user_ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._size = last
+            return True
+
+    def distances(self, query):
+        """
+        Calcula la distancia euclidiana de `query` contra toda la galería.
+
+        Args:
+            query (ndarray): Encoding (128,) a comparar
+
+        Returns:
+            ndarray: Distancias (N,) en el mismo orden que `user_ids`
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(ENCODING_DIM)
+        with self._lock:
+            diff = self._encodings[:self._size] - query
+        return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    def search(self, query, k=1):
+        """
+        Busca los `k` usuarios más cercanos a `query` (sin aplicar tolerancia).
+
+        Returns:
+            tuple: (user_ids, distancias) ordenados de menor a mayor distancia
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(ENCODING_DIM)
+        with self._lock:
+            if self._index is not None and self._index.ready:
+                return self._index.search(query, k)
+            size = self._size
+            if size == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            diff = self._encodings[:size] - query
+            sq_dist = np.einsum('ij,ij->i', diff, diff)
+            k = min(k, size)
+            top = np.argpartition(sq_dist, k - 1)[:k] if k < size else np.arange(size)
+            top = top[np.argsort(sq_dist[top])]
+            user_ids = self._user_ids[top].copy()
+
+        return user_ids, np.sqrt(sq_dist[top])
+
+    def nearest(self, query):
+        """
+        Busca el usuario más cercano a `query` (sin aplicar tolerancia).
+
+        Returns:
+            tuple: (user_id, distancia) o (None, None) si la galería está vacía
+        """
+        user_ids, distances = self.search(query, k=1)
+        if len(user_ids) == 0:
+            return None, None
+        return int(user_ids[0]), float(distances[0])
+
+    def set_templates(self, user_id, templates):
+        """Asigna las plantillas individuales (k, 128) de un usuario."""
+        with self._lock:
+            self.templates.set(user_id, templates)
+
+    def load_templates(self, items):
+        """Reemplaza todas las plantillas individuales (pares user_id, (k, 128))."""
+        with self._lock:
+            self.templates.load(items)
+
+    def best_match(self, query, tolerance=0.45):
+        """
+        Busca el usuario más cercano a `query` dentro de la tolerancia.
+
+        Si hay plantillas múltiples, la primera pasada usa los centroides y
+        solo los `rerank_k` mejores candidatos se re-puntúan con la menor
+        distancia a sus plantillas individuales (best-of-k).
+
+        Args:
+            query (ndarray): Encoding facial capturado
+            tolerance (float): Distancia máxima aceptada (misma semántica que
+                face_recognition.compare_faces)
+
+        Returns:
+            tuple: (user_id, distancia) o (None, None) si no hay coincidencia
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(ENCODING_DIM)
+        if len(self.templates) == 0:
+            user_id, distance = self.nearest(query)
+        else:
+            user_ids, distances = self.search(query, k=self.rerank_k)
+            if len(user_ids) == 0:
+                return None, None
+            with self._lock:
+                template_dist = self.templates.min_distances(query, user_ids)
+            scores = np.where(np.isfinite(template_dist), template_dist, distances)
+            best = int(np.argmin(scores))
+            user_id, distance = int(user_ids[best]), float(scores[best])
+
+        if user_id is not None and distance <= tolerance:
+            return user_id, distance
+        return None, None
+
+    def _ensure_capacity(self, needed):
+        capacity = self._encodings.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        encodings = np.empty((new_capacity, ENCODING_DIM), dtype=np.float32)
+        user_ids = np.empty(new_capacity, dtype=np.int64)
+        encodings[:self._size] = self._encodings[:self._size]
+        user_ids[:self._size] = self._user_ids[:self._size]
+        self._encodings = encodings
+        self._user_ids = user_ids
+
+
+class TemplateStore:
+    """
+    Plantillas individuales por usuario (enrolamiento multi-plantilla).
+
+    Todas las plantillas viven en una sola matriz float32 y las de cada
+    usuario ocupan un bloque contiguo de filas, de modo que el re-ranking de
+    varios candidatos se resuelve con un único cálculo de distancias. Los
+    reemplazos con distinto número de plantillas se agregan al final y la
+    matriz se compacta cuando los huecos superan a las filas vivas.
+    """
+
+    def __init__(self):
+        self._matrix = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self._ranges = {}
+        self._used = 0
+        self._live = 0
+
+    def __len__(self):
+        return self._live
+
+    def __contains__(self, user_id):
+        return user_id in self._ranges
+
+    def get(self, user_id):
+        """Retorna la vista (k, 128) de las plantillas del usuario, o None."""
+        bounds = self._ranges.get(user_id)
+        if bounds is None:
+            return None
+        start, count = bounds
+        return self._matrix[start:start + count]
+
+    def load(self, items):
+        """
+        Reemplaza todas las plantillas.
+
+        Args:
+            items (iterable): Pares (user_id, plantillas (k, 128))
+        """
+        self._matrix = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self._ranges = {}
+        self._used = 0
+        self._live = 0
+        for user_id, templates in items:
+            self.set(user_id, templates)
+
+    def set(self, user_id, templates):
+        """Inserta o reemplaza las plantillas de un usuario."""
+        templates = np.asarray(templates, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        count = templates.shape[0]
+        bounds = self._ranges.get(user_id)
+
+        if bounds is not None and bounds[1] == count:
+            self._matrix[bounds[0]:bounds[0] + count] = templates
+            return
+
+        self.remove(user_id)
+        if count == 0:
+            return
+        self._ensure_capacity(self._used + count)
+        start = self._used
+        self._matrix[start:start + count] = templates
+        self._ranges[user_id] = (start, count)
+        self._used += count
+        self._live += count
+
+    def remove(self, user_id):
+        """Elimina las plantillas de un usuario (si existen)."""
+        bounds = self._ranges.pop(user_id, None)
+        if bounds is None:
+            return
+        self._live -= bounds[1]
+        if self._used > 2 * self._live + _INITIAL_CAPACITY:
+            self._compact()
+
+    def min_distances(self, query, user_ids):
+        """
+        Menor distancia de `query` a las plantillas de cada usuario.
+
+        Args:
+            query (ndarray): Encoding (128,) float32
+            user_ids (ndarray): Candidatos a re-puntuar
+
+        Returns:
+            ndarray: Distancias (len(user_ids),); inf para usuarios sin plantillas
+        """
+        result = np.full(len(user_ids), np.inf, dtype=np.float32)
+        positions, blocks, counts = [], [], []
+        for position, user_id in enumerate(np.asarray(user_ids).tolist()):
+            bounds = self._ranges.get(user_id)
+            if bounds is None:
+                continue
+            start, count = bounds
+            positions.append(position)
+            blocks.append(self._matrix[start:start + count])
+            counts.append(count)
+
+        if not blocks:
+            return result
+
+        diff = np.concatenate(blocks) - query
+        distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        offsets = np.concatenate(([0], np.cumsum(counts[:-1]))).astype(np.int64)
+        result[positions] = np.minimum.reduceat(distances, offsets)
+        return result
+
+    def _ensure_capacity(self, needed):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        matrix = np.empty((max(needed, capacity * 2, _INITIAL_CAPACITY), ENCODING_DIM), dtype=np.float32)
+        matrix[:self._used] = self._matrix[:self._used]
+        self._matrix = matrix
+
+    def _compact(self):
+        matrix = np.empty((max(_INITIAL_CAPACITY, self._live * 2), ENCODING_DIM), dtype=np.float32)
+        ranges = {}
+        used = 0
+        for user_id, (start, count) in self._ranges.items():
+            matrix[used:used + count] = self._matrix[start:start + count]
+            ranges[user_id] = (used, count)
+            used += count
+        self._matrix = matrix
+        self._ranges = ranges
+        self._used = used
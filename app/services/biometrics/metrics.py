@@ -0,0 +1,122 @@
+"""
+Métricas de rendimiento de los flujos biométricos.
+Responsabilidades:
+  - Medir la duración de cada etapa (decode, detect, landmarks, encode, match)
+  - Acumular histogramas por etapa y por resultado/motivo de rechazo en el
+    registro de la aplicación (app.metrics)
+
+Con las métricas desactivadas (BIOMETRIC_METRICS_ENABLED) los pipelines
+reciben un temporizador nulo cuyas operaciones no hacen nada.
+"""
+
+import time
+
+# El registro vive en app.metrics; se reexporta por compatibilidad
+from app.metrics import (  # noqa: F401
+    DEFAULT_BUCKETS,
+    Histogram,
+    MetricsRegistry,
+    configure_metrics,
+    registry,
+)
+
+STAGE_METRIC = 'biometric_stage_seconds'
+PIPELINE_METRIC = 'biometric_pipeline_seconds'
+REJECTION_METRIC = 'biometric_rejection_seconds'
+
+registry.describe(STAGE_METRIC, 'Duración de cada etapa de los pipelines biométricos')
+registry.describe(PIPELINE_METRIC, 'Duración total de los pipelines biométricos por resultado')
+registry.describe(REJECTION_METRIC, 'Duración de los pipelines rechazados por etapa de la cascada y motivo')
+
+
+class StageClock:
+    """
+    Cronómetro por vueltas para medir etapas consecutivas. Las tareas del
+    motor lo usan en el worker y retornan sus `timings` con el resultado.
+    """
+
+    __slots__ = ('timings', '_mark')
+
+    def __init__(self):
+        self.timings = []
+        self._mark = time.perf_counter()
+
+    def lap(self, stage):
+        """Registra la duración desde la vuelta anterior bajo `stage`."""
+        now = time.perf_counter()
+        self.timings.append((stage, now - self._mark))
+        self._mark = now
+
+
+class PipelineTimer:
+    """Temporizador de un pipeline: etapas locales, etapas del motor y total."""
+
+    __slots__ = ('flow', '_registry', '_start', '_mark')
+
+    def __init__(self, flow, metrics_registry):
+        self.flow = flow
+        self._registry = metrics_registry
+        self._start = self._mark = time.perf_counter()
+
+    def lap(self, stage):
+        """Registra la etapa local que terminó ahora."""
+        now = time.perf_counter()
+        self._observe_stage(stage, now - self._mark)
+        self._mark = now
+
+    def merge(self, timings):
+        """
+        Registra las etapas medidas por una tarea del motor. El tiempo de pared
+        no cubierto por ellas (cola, IPC, memoria compartida) se registra como
+        etapa 'engine'.
+        """
+        now = time.perf_counter()
+        worked = 0.0
+        for stage, seconds in timings:
+            self._observe_stage(stage, seconds)
+            worked += seconds
+        self._observe_stage('engine', max(0.0, now - self._mark - worked))
+        self._mark = now
+
+    def finish(self, outcome, stage=''):
+        """
+        Registra la duración total del pipeline con su resultado. Si el frame
+        se rechazó (`stage` = etapa de la cascada que lo descartó) también se
+        registra bajo esa etapa.
+        """
+        elapsed = time.perf_counter() - self._start
+        self._registry.observe(PIPELINE_METRIC, (('flow', self.flow), ('outcome', outcome)), elapsed)
+        if stage:
+            self._registry.observe(
+                REJECTION_METRIC,
+                (('flow', self.flow), ('stage', stage), ('reason', outcome)),
+                elapsed,
+            )
+
+    def _observe_stage(self, stage, seconds):
+        self._registry.observe(STAGE_METRIC, (('flow', self.flow), ('stage', stage)), seconds)
+
+
+class _NullTimer:
+    """Temporizador que no mide nada (métricas desactivadas)."""
+
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+    def merge(self, timings):
+        pass
+
+    def finish(self, outcome, stage=''):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def pipeline_timer(flow):
+    """Retorna un temporizador para el flujo, o uno nulo si las métricas están desactivadas."""
+    if not registry.enabled:
+        return _NULL_TIMER
+    return PipelineTimer(flow, registry)
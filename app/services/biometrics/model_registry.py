@@ -0,0 +1,131 @@
+"""
+Registro de modelos biométricos del proceso.
+Responsabilidades:
+  - Cargar cada modelo (predictor de landmarks de 68 puntos, detector y
+    encoder de face_recognition) una sola vez por proceso y solo en su primer uso
+  - Compartir la misma instancia entre todos los módulos que la usan
+  - Ofrecer un warm-up explícito para los procesos que atienden biometría
+
+Importar este módulo no importa dlib ni face_recognition: los procesos que
+nunca tocan biometría (scripts, workers sin motor biométrico) no pagan la
+carga de los modelos ni su memoria.
+"""
+
+import threading
+import time
+
+from app.logging_config import get_logger
+
+logger = get_logger('biometrics.models')
+
+# Nombres de los modelos registrados
+LANDMARKS_68 = 'landmarks_68'
+FACE_RECOGNITION = 'face_recognition'
+
+
+def _load_landmark_predictor():
+    # face_recognition ya carga el mismo modelo de 68 puntos al importarse:
+    # se comparte esa instancia en lugar de cargar una segunda copia (~95 MB)
+    face_recognition = registry.get(FACE_RECOGNITION)
+    if face_recognition is None:
+        return None
+    return face_recognition.api.pose_predictor_68_point
+
+
+def _load_face_recognition():
+    # face_recognition carga al importarse su detector HOG y el encoder ResNet
+    import face_recognition
+    return face_recognition
+
+
+class ModelRegistry:
+    """
+    Modelos indexados por nombre, cargados perezosamente y una sola vez.
+    Un modelo que no pudo cargarse queda registrado como None (no se reintenta).
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        # Reentrante: un loader puede pedir otro modelo
+        self._lock = threading.RLock()
+
+    def register(self, name, loader):
+        """Registra la función que carga el modelo `name`."""
+        self._loaders[name] = loader
+
+    def get(self, name):
+        """
+        Retorna el modelo, cargándolo en el primer uso.
+
+        Args:
+            name (str): Nombre del modelo registrado
+
+        Returns:
+            object: Modelo cargado, o None si no está disponible
+        """
+        try:
+            return self._models[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def set(self, name, model):
+        """Fija un modelo ya construido (tests, benchmarks, modelos alternativos)."""
+        with self._lock:
+            self._models[name] = model
+
+    def reset(self, name=None):
+        """Olvida un modelo (o todos) para que el próximo uso lo vuelva a cargar."""
+        with self._lock:
+            if name is None:
+                self._models.clear()
+            else:
+                self._models.pop(name, None)
+
+    def warm_up(self, names=None):
+        """
+        Carga por adelantado los modelos indicados (default: todos).
+
+        Returns:
+            dict: Nombre -> True si el modelo quedó disponible
+        """
+        return {name: self.get(name) is not None for name in (names or list(self._loaders))}
+
+    def _load(self, name):
+        start = time.perf_counter()
+        try:
+            model = self._loaders[name]()
+        except Exception as e:
+            logger.error(f"Error cargando el modelo {name}: {e}", exc_info=True)
+            return None
+        if model is not None:
+            logger.info(f"Modelo {name} cargado en {time.perf_counter() - start:.2f}s")
+        return model
+
+
+# Registro del proceso
+registry = ModelRegistry()
+registry.register(LANDMARKS_68, _load_landmark_predictor)
+registry.register(FACE_RECOGNITION, _load_face_recognition)
+
+
+def get_landmark_predictor():
+    """Predictor de 68 puntos de face_recognition (None si no está disponible)."""
+    return registry.get(LANDMARKS_68)
+
+
+def get_face_recognition():
+    """Módulo face_recognition con sus modelos ya cargados."""
+    return registry.get(FACE_RECOGNITION)
+
+
+def warm_up():
+    """Hook de arranque: carga todos los modelos biométricos del proceso."""
+    return registry.warm_up()
@@ -4,109 +4,316 @@ Responsabilidades:
   - Orquestar el flujo de enrolamiento (captura, validación, almacenamiento)
   - Orquestar el flujo de login (captura, reconocimiento, autenticación)
   - Orquestar flujos de desafío de pose (liveness challenge-response)
+
+Cada flujo decodifica la imagen una sola vez en un FrameContext; las vistas
+gris y RGB se calculan como máximo una vez y solo si alguna etapa las usa.
+Los landmarks también se calculan una sola vez por rostro y alimentan la
+validación de pose, la proximidad y el chequeo de ojos (EAR).
+
+Las etapas intensivas en CPU (detección, landmarks, encoding) se ejecutan
+como tareas en el motor biométrico (ver engine.py); la comparación contra
+la galería y la BD permanece en el proceso del request. Cada pipeline pasa
+antes por el control de admisión (ver admission.py).
 """
 
-import cv2
-from app.services.biometrics import encoders, pose_checks, repository
+from functools import wraps
+
+import numpy as np
+from flask import g, has_request_context
+
+from app.logging_config import get_logger
+from app.services.biometrics import encoders, metrics, repository, tasks
+from app.services.biometrics.admission import (
+    FLOW_ENROLL,
+    FLOW_LOGIN,
+    FLOW_POSE,
+    get_admission_controller,
+)
+from app.services.biometrics.engine import get_engine
+from app.services.biometrics.frame import FrameContext
+from app.services.biometrics.gallery import ENCODING_DIM
+
+logger = get_logger('biometrics.pipelines')
+
+# Flujo (etiqueta de métricas) de las plantillas de pose del enrolamiento
+FLOW_ENROLL_TEMPLATES = 'enroll_templates'
+# Resultado de un frame de pose cuyo rostro no continúa el de la sesión
+REASON_DISCONTINUOUS = 'discontinuous'
+# Resultado de un frame de pose cuyo rostro no es el del frame CENTER
+REASON_DIFFERENT_FACE = 'different_face'
+
+# Poses adicionales aceptadas como plantillas en el enrolamiento
+TEMPLATE_POSES = ('CENTER', 'LEFT', 'RIGHT')
+MAX_POSE_TEMPLATES = 4
+# Distancia máxima de una plantilla de pose al encoding CENTER del enrolamiento
+ENROLL_TEMPLATE_TOLERANCE = 0.45
+
 
+def _admitted(flow):
+    """Somete el pipeline al control de admisión con la prioridad del flujo."""
+    def decorator(pipeline):
+        @wraps(pipeline)
+        def wrapper(*args, **kwargs):
+            controller = get_admission_controller()
+            if controller is None:
+                return pipeline(*args, **kwargs)
+            with controller.admit(flow):
+                return pipeline(*args, **kwargs)
+        return wrapper
+    return decorator
 
+
+def _report_predictor_calls(flow, calls):
+    """Registra cuántas veces corrió el predictor de landmarks en la petición."""
+    logger.debug(f"{flow}: {calls} invocaciones del predictor de landmarks")
+    if has_request_context():
+        g.predictor_calls = g.get('predictor_calls', 0) + calls
+    return calls
+
+
+@_admitted(FLOW_ENROLL)
 def enroll_biometric_pipeline(image_data):
     """
     Orquesta el proceso completo de enrolamiento biométrico.
     Pasos:
-      1. Decodificar imagen Base64
+      1. Decodificar imagen (Base64 o binaria)
       2. Detectar rostros
       3. Validar estructura facial (anti-spoofing, liveness)
       4. Generar encoding facial
     
     Args:
-        image_data (str): Datos de imagen Base64
+        image_data (str | bytes): Imagen Base64 o bytes JPEG/PNG
     
     Returns:
         tuple: (éxito: bool, mensaje: str, encoding: ndarray o None)
     """
+    timer = metrics.pipeline_timer(FLOW_ENROLL)
+    
     # Paso 1: Decodificar imagen
-    img_bgr, img_gray = encoders.decode_base64_image(image_data)
-    if img_bgr is None:
+    frame = encoders.decode_frame(image_data)
+    timer.lap('decode')
+    if frame is None:
+        timer.finish('bad_image')
         return False, "Imagen corrupta", None
     
-    # Paso 2: Detectar rostros
-    height, width = img_gray.shape
-    boxes = encoders.detect_faces(img_gray, model="hog")
+    # Pasos 2-4: Detección, estructura facial y encoding (en el motor)
+    analysis = get_engine().run(tasks.analyze_face_task, frame, False)
+    timer.merge(analysis.timings)
+    timer.finish(analysis.reason or 'ok', analysis.stage)
+    _report_predictor_calls('enroll', analysis.predictor_calls)
     
-    if not boxes:
+    if analysis.status == tasks.FACE_NOT_FOUND:
         return False, "Rostro no detectado.", None
-    if len(boxes) > 1:
+    if analysis.status == tasks.FACE_MULTIPLE:
         return False, "Multiples rostros detectados.", None
+    if analysis.status == tasks.FACE_REJECTED:
+        return False, f"Rechazado: {analysis.message}", None
+    if analysis.status == tasks.FACE_NO_ENCODING:
+        return False, "No se pudo generar huella.", None
+    
+    return True, "Registro Biométrico Exitoso", analysis.encoding
+
+
+@_admitted(FLOW_ENROLL)
+def extract_pose_templates(pose_frames, reference, tolerance=ENROLL_TEMPLATE_TOLERANCE):
+    """
+    Genera plantillas adicionales a partir de los frames de pose del enrolamiento.
+    Cada frame debe contener un único rostro que cumpla la pose declarada y
+    que esté a `tolerance` o menos del encoding CENTER; los frames que no
+    cumplen se descartan sin abortar el enrolamiento.
+    
+    Args:
+        pose_frames (list): Dicts {'pose': str, 'image': str Base64 o bytes}
+        reference (np.ndarray): Encoding CENTER del enrolamiento
+        tolerance (float): Distancia máxima de una plantilla a `reference`
+    
+    Returns:
+        list: Pares (pose, encoding) de los frames válidos
+    """
+    pending = []
+    jobs = []
+    for frame in (pose_frames or [])[:MAX_POSE_TEMPLATES]:
+        pose = frame.get('pose')
+        if pose not in TEMPLATE_POSES:
+            continue
+        
+        timer = metrics.pipeline_timer(FLOW_ENROLL_TEMPLATES)
+        decoded = encoders.decode_frame(frame.get('image') or '')
+        timer.lap('decode')
+        if decoded is None:
+            timer.finish('bad_image')
+            continue
+        pending.append((pose, timer))
+        jobs.append((decoded, (pose,)))
+    
+    # Todos los frames en un solo lote: el motor los reparte entre sus workers
+    templates = []
+    calls = 0
+    for (pose, timer), analysis in zip(pending, get_engine().map(tasks.pose_template_task, jobs)):
+        timer.merge(analysis.timings)
+        calls += analysis.predictor_calls
+        if analysis.status != tasks.FACE_OK:
+            timer.finish(analysis.reason or 'ok', analysis.stage)
+            continue
+        # Otra persona en los frames de pose no debe quedar asociada a la cuenta
+        distance = float(np.linalg.norm(np.asarray(analysis.encoding) - reference))
+        if distance > tolerance:
+            logger.warning(f"Plantilla {pose} descartada: distancia {distance:.3f} al rostro CENTER")
+            timer.finish(REASON_DIFFERENT_FACE)
+            continue
+        timer.finish('ok')
+        templates.append((pose, analysis.encoding))
+    
+    _report_predictor_calls('pose templates', calls)
+    return templates
+
+
+def encode_face_batch(pairs, engine=None):
+    """
+    Genera encodings por lotes (enrolamientos con varios frames, importaciones
+    administrativas). Los frames se reparten entre los workers del motor, que
+    ya tienen los modelos cargados; no hay validaciones de estructura.
+    
+    Args:
+        pairs (list): Pares (imagen, cajas). La imagen puede ser un FrameContext,
+            un ndarray BGR, Base64 o bytes JPEG/PNG; cajas es una lista de
+            (top, right, bottom, left) o None para detectarlas
+        engine (BiometricEngine): Motor a usar (default: el del proceso)
+    
+    Returns:
+        tuple: (encodings (K, 128) float32, índice del par de cada fila (K,) int64)
+    """
+    jobs = []
+    owners = []
+    for index, (image, boxes) in enumerate(pairs):
+        frame = _as_frame(image)
+        if frame is None:
+            logger.warning(f"Lote de encodings: imagen {index} ilegible, se omite")
+            continue
+        if boxes is not None:
+            boxes = [tuple(int(v) for v in box) for box in boxes]
+        jobs.append((frame, (boxes,)))
+        owners.append(index)
     
-    # Paso 3: Validar estructura facial
-    is_valid, validation_msg = pose_checks.analyze_face_structure(
-        img_gray, boxes[0], width, height
+    results = (engine or get_engine()).map(tasks.encode_boxes_task, jobs) if jobs else []
+    if not results:
+        return np.empty((0, ENCODING_DIM), dtype=np.float32), np.empty(0, dtype=np.int64)
+    
+    counts = [len(result) for result in results]
+    return (
+        np.concatenate(results).astype(np.float32, copy=False),
+        np.repeat(np.asarray(owners, dtype=np.int64), counts),
     )
-    if not is_valid:
-        return False, f"Rechazado: {validation_msg}", None
+
+
+def enroll_images_bulk(user_images, engine=None):
+    """
+    Enrolamiento masivo: codifica en un solo lote las imágenes de todos los
+    usuarios y guarda sus plantillas en una sola transacción. Solo se usan
+    las imágenes con exactamente un rostro.
     
-    # Paso 4: Generar encoding
-    img_rgb = encoders.prepare_image_for_encoding(img_bgr)
-    if img_rgb is None:
-        return False, "No se pudo procesar la imagen", None
+    Args:
+        user_images (dict): user_id -> lista de imágenes (bytes, Base64 o ndarray BGR)
+        engine (BiometricEngine): Motor a usar (default: el del proceso)
     
-    encodings = encoders.extract_face_encodings(img_bgr, boxes)
-    if not encodings:
-        return False, "No se pudo generar huella.", None
+    Returns:
+        tuple: (usuarios enrolados: int, imágenes descartadas: int)
+    """
+    pairs = []
+    image_owner = []
+    for user_id, images in user_images.items():
+        for image in images:
+            pairs.append((image, None))
+            image_owner.append(user_id)
+    if not pairs:
+        return 0, 0
+    
+    encodings, rows = encode_face_batch(pairs, engine)
+    faces = np.bincount(rows, minlength=len(pairs))
+    single = faces[rows] == 1
+    
+    per_user = {}
+    for encoding, row in zip(encodings[single], rows[single]):
+        per_user.setdefault(image_owner[row], []).append(encoding)
     
-    return True, "Registro Biométrico Exitoso", encodings[0]
+    enrolled = repository.save_face_templates_bulk(
+        [(user_id, np.stack(user_encodings)) for user_id, user_encodings in per_user.items()]
+    )
+    return enrolled, int(np.count_nonzero(faces != 1))
+
+
+def _as_frame(image):
+    if isinstance(image, FrameContext):
+        return image
+    if isinstance(image, np.ndarray):
+        return FrameContext(bgr=image)
+    return encoders.decode_frame(image)
 
 
-def login_biometric_pipeline(image_data, tolerance=0.45):
+@_admitted(FLOW_LOGIN)
+def login_biometric_pipeline(image_data, tolerance=0.45, username=None, user_id=None):
     """
     Orquesta el proceso completo de login biométrico.
     Pasos:
-      1. Decodificar imagen Base64
+      1. Decodificar imagen (Base64 o binaria)
       2. Detectar rostros
       3. Validar estructura facial (anti-spoofing, liveness)
       4. Generar encoding facial
       5. Comparar con encodings almacenados en BD
     
+    Si se declara una identidad (username o user_id) el paso 5 es una
+    verificación 1:1 contra ese único usuario; si no, se identifica 1:N
+    contra toda la galería.
+    
     Args:
-        image_data (str): Datos de imagen Base64
+        image_data (str | bytes): Imagen Base64 o bytes JPEG/PNG
         tolerance (float): Umbral para comparación de rostros (0.0-1.0)
+        username (str): Identidad declarada (opcional)
+        user_id (int): Id de usuario declarado (opcional, alternativa a username)
     
     Returns:
         tuple: (éxito: bool, mensaje: str, usuario: User o None)
     """
+    timer = metrics.pipeline_timer(FLOW_LOGIN)
+    
     # Paso 1: Decodificar imagen
-    img_bgr, img_gray = encoders.decode_base64_image(image_data)
-    if img_bgr is None:
+    frame = encoders.decode_frame(image_data)
+    timer.lap('decode')
+    if frame is None:
+        timer.finish('bad_image')
         return False, "Sin datos de imagen", None
     
-    # Paso 2: Detectar rostros
-    boxes = encoders.detect_faces(img_gray, model="hog")
-    if not boxes:
-        return False, "Rostro no visible", None
-    
-    height, width = img_gray.shape
+    # Pasos 2-4: Detección, estructura facial y encoding (en el motor)
+    analysis = get_engine().run(tasks.analyze_face_task, frame, True)
+    timer.merge(analysis.timings)
+    _report_predictor_calls('login', analysis.predictor_calls)
+    if analysis.status != tasks.FACE_OK:
+        timer.finish(analysis.reason, analysis.stage)
     
-    # Paso 3: Validar estructura facial
-    is_valid, validation_msg = pose_checks.analyze_face_structure(
-        img_gray, boxes[0], width, height
-    )
-    if not is_valid:
-        return False, f"Seguridad: {validation_msg}", None
-    
-    # Paso 4: Generar encoding
-    img_rgb = encoders.prepare_image_for_encoding(img_bgr)
-    if img_rgb is None:
-        return False, "Error procesando imagen", None
-    
-    encodings = encoders.extract_face_encodings(img_bgr, boxes)
-    if not encodings:
+    if analysis.status == tasks.FACE_NOT_FOUND:
+        return False, "Rostro no visible", None
+    if analysis.status == tasks.FACE_REJECTED:
+        return False, f"Seguridad: {analysis.message}", None
+    if analysis.status != tasks.FACE_OK:
         return False, "Error extrayendo características", None
     
-    unknown_enc = encodings[0]
+    unknown_enc = analysis.encoding
+    
+    # Paso 5: Verificación 1:1 con identidad declarada, o identificación 1:N
+    if username or user_id is not None:
+        claimed_user = repository.get_claimed_user(username=username, user_id=user_id)
+        verified = bool(claimed_user) and repository.verify_user_face(
+            claimed_user, unknown_enc, tolerance=tolerance
+        )
+        timer.lap('match')
+        timer.finish('ok' if verified else 'denied')
+        if verified:
+            return True, "Acceso Permitido", claimed_user
+        return False, "Acceso Denegado", None
     
-    # Paso 5: Comparar con usuarios registrados
     matching_user = repository.find_matching_user(unknown_enc, tolerance=tolerance)
+    timer.lap('match')
+    timer.finish('ok' if matching_user else 'denied')
     
     if matching_user:
         return True, "Acceso Permitido", matching_user
@@ -114,36 +321,47 @@ def login_biometric_pipeline(image_data, tolerance=0.45):
         return False, "Acceso Denegado", None
 
 
-def validate_pose_challenge(image_data, target_pose):
+@_admitted(FLOW_POSE)
+def validate_pose_challenge(image_data, target_pose, session=None):
     """
     Orquesta un desafío de pose (challenge-response liveness).
     Pasos:
-      1. Decodificar imagen Base64
-      2. Detectar rostros
+      1. Decodificar imagen (Base64 o binaria)
+      2. Detectar rostros (en la región de seguimiento si hay sesión)
       3. Validar que el rostro cumple la pose requerida
+      4. Verificar que el rostro continúa el de los frames anteriores (sesión)
     
     Args:
-        image_data (str): Datos de imagen Base64
+        image_data (str | bytes): Imagen Base64 o bytes JPEG/PNG
         target_pose (str): Pose requerida ('CENTER', 'LEFT', 'RIGHT', 'UP', 'DOWN')
+        session (PoseSession): Sesión de seguimiento del desafío (opcional)
     
     Returns:
         tuple: (válido: bool, mensaje: str)
     """
-    # Paso 1: Decodificar imagen
-    img_bgr, img_gray = encoders.decode_base64_image(image_data)
-    if img_bgr is None:
-        return False, "Imagen inválida"
+    timer = metrics.pipeline_timer(FLOW_POSE)
     
-    # Paso 2: Detectar rostros
-    height, width = img_gray.shape
-    boxes = encoders.detect_faces(img_gray, model="hog")
+    # Paso 1: Decodificar imagen (solo gris y a resolución reducida)
+    frame = encoders.decode_pose_frame(image_data)
+    timer.lap('decode')
+    if frame is None:
+        timer.finish('bad_image')
+        return False, "Imagen inválida"
     
-    if not boxes:
-        return False, "Rostro no encontrado"
+    # Pasos 2-3: Detección y validación de pose (en el motor)
+    frame_size = (frame.width, frame.height)
+    last_box = session.tracking_box(frame_size) if session is not None else None
+    analysis = get_engine().run(tasks.pose_challenge_task, frame, target_pose, last_box)
+    timer.merge(analysis.timings)
+    _report_predictor_calls('check pose', analysis.predictor_calls)
     
-    # Paso 3: Validar pose
-    is_valid, msg = pose_checks.validate_pose(
-        img_gray, boxes[0], width, target_pose
-    )
+    # Paso 4: Continuidad del rostro a lo largo del desafío
+    if session is not None and analysis.box is not None:
+        if not session.observe(analysis.box, frame_size, analysis.tracked):
+            timer.finish(REASON_DISCONTINUOUS)
+            return False, "Se perdió el rostro, reinicia el desafío"
+        if analysis.valid:
+            session.passed_poses.append(target_pose)
     
-    return is_valid, msg
+    timer.finish(analysis.reason or 'ok', analysis.stage)
+    return analysis.valid, analysis.message
@@ -5,32 +5,19 @@ Responsabilidades:
   - Validación de desafíos de pose (CENTER, LEFT, RIGHT, UP, DOWN)
   - Análisis de liveness (detección de ojos abiertos)
   - Validación de estructura facial para anti-spoofing
+
+El predictor de landmarks se obtiene del registro de modelos (model_registry)
+en su primer uso; importar este módulo no carga ningún modelo.
 """
 
-import cv2
 import numpy as np
-import dlib
-import os
-from scipy.spatial import distance as dist
+from dataclasses import dataclass
 
 from app.logging_config import get_logger
+from app.services.biometrics.model_registry import get_landmark_predictor
 
 logger = get_logger('biometrics.pose_checks')
 
-# --- CONFIGURACIÓN ---
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-MODEL_PATH = os.path.join(BASE_DIR, 'static', 'models', 'shape_predictor_68_face_landmarks.dat')
-
-predictor = None
-try:
-    if os.path.exists(MODEL_PATH):
-        predictor = dlib.shape_predictor(MODEL_PATH)
-        logger.info("Modelo de landmarks cargado correctamente")
-    else:
-        logger.warning(f"Modelo de landmarks no encontrado en: {MODEL_PATH}")
-except Exception as e:
-    logger.error(f"Error cargando Dlib: {e}", exc_info=True)
-
 # Puntos clave
 NOSE_TIP = 30
 LEFT_EYE = 36  # Ojo derecho en espejo
@@ -39,64 +26,195 @@ MOUTH_TOP = 51
 (lStart, lEnd) = (42, 48)
 (rStart, rEnd) = (36, 42)
 
+# Proximidad mínima (ancho del rostro / ancho de imagen)
+MIN_PROXIMITY_POSE = 0.22       # Desafíos de pose
+MIN_PROXIMITY_STRUCTURE = 0.28  # Enrolamiento y login
+
+# Cota superior estimada del ancho mandibular (landmarks 0 a 16) respecto del
+# ancho de la caja de detección. Es un margen empírico (el predictor suele dar
+# 0.8-1.0), no una garantía: un rostro atípico podría descartarse por su caja
+# aunque el chequeo por landmarks lo aceptara.
+BOX_TO_JAW_MAX = 1.3
+
+# Código estable (etiqueta de métricas) de cada mensaje de rechazo
+REJECTION_REASONS = {
+    "Error IA": 'model_error',
+    "ACÉRCATE MÁS": 'too_far',
+    "MIRA AL CENTRO (Vas derecha)": 'yaw',
+    "MIRA AL CENTRO (Vas izquierda)": 'yaw',
+    "BAJA LA CABEZA": 'pitch',
+    "SUBE LA CABEZA": 'pitch',
+    "GIRA A TU IZQUIERDA": 'pose_not_reached',
+    "GIRA A TU DERECHA": 'pose_not_reached',
+    "MIRA HACIA ARRIBA": 'pose_not_reached',
+    "MIRA HACIA ABAJO": 'pose_not_reached',
+    "Pose desconocida": 'unknown_pose',
+    "Error de análisis biométrico.": 'model_error',
+    "OJOS CERRADOS. Ábrelos bien.": 'eyes_closed',
+    "DEMASIADO LEJOS. Acércate más a la cámara.": 'too_far',
+    "GIRA AL CENTRO (Miras a derecha).": 'yaw',
+    "GIRA AL CENTRO (Miras a izquierda).": 'yaw',
+    "BAJA LA CABEZA (Miras arriba).": 'pitch',
+    "SUBE LA CABEZA (Miras abajo).": 'pitch',
+}
+
+
+def rejection_reason(message):
+    """Código de rechazo para métricas a partir del mensaje de validación."""
+    return REJECTION_REASONS.get(message, 'rejected')
+
+
+# Índices (p1..p6) de cada ojo en el layout de 68 puntos: ojo izquierdo y derecho
+_EYE_INDICES = np.array([np.arange(lStart, lEnd), np.arange(rStart, rEnd)])
+_EPSILON = 0.001
+
+
+@dataclass(frozen=True, slots=True)
+class FaceMetrics:
+    """Métricas geométricas de un rostro (inmutables)."""
+    yaw: float          # < 0.6 Derecha, > 1.6 Izquierda
+    pitch: float        # < 0.5 Arriba, > 1.8 Abajo
+    width: float        # Distancia mandibular (punto 0 a 16) en px
+    left_ear: float
+    right_ear: float
+    coords: np.ndarray  # Landmarks (68, 2) de solo lectura
+
+    @property
+    def ear(self):
+        """EAR promedio de ambos ojos."""
+        return (self.left_ear + self.right_ear) / 2.0
+
+
+def shape_to_array(shape):
+    """Convierte un full_object_detection de dlib en un array (68, 2) en una pasada."""
+    return np.array([(p.x, p.y) for p in shape.parts()], dtype=np.float64)
+
+
+def compute_face_metrics(coords):
+    """
+    Calcula yaw, pitch, ancho y EAR de ambos ojos con aritmética vectorizada.
+
+    Args:
+        coords (ndarray): Landmarks (68, 2)
+
+    Returns:
+        FaceMetrics: Métricas del rostro
+    """
+    coords = np.array(coords, dtype=np.float64)
+    nose = coords[NOSE_TIP]
+    left_eye = coords[LEFT_EYE]
+    right_eye = coords[RIGHT_EYE]
+
+    # 1. Yaw (Lados) y 2. Pitch (Vertical)
+    d_left = nose[0] - left_eye[0]
+    d_right = (right_eye[0] - nose[0]) or _EPSILON
+    d_up = nose[1] - (left_eye[1] + right_eye[1]) / 2
+    d_down = (coords[MOUTH_TOP][1] - nose[1]) or _EPSILON
+
+    # 3. Proximidad
+    face_width = np.hypot(*(coords[16] - coords[0]))
+
+    # 4. EAR de ambos ojos a la vez: (|p2-p6| + |p3-p5|) / (2 |p1-p4|)
+    eyes = coords[_EYE_INDICES]
+    vertical = np.linalg.norm(eyes[:, [1, 2]] - eyes[:, [5, 4]], axis=2).sum(axis=1)
+    horizontal = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=1)
+    ears = vertical / (2.0 * horizontal)
+
+    coords.flags.writeable = False
+    return FaceMetrics(
+        yaw=float(d_left / d_right),
+        pitch=float(d_up / d_down),
+        width=float(face_width),
+        left_ear=float(ears[0]),
+        right_ear=float(ears[1]),
+        coords=coords,
+    )
+
 
 def get_face_metrics(gray, rect):
     """Extrae métricas geométricas clave para determinar pose."""
+    predictor = get_landmark_predictor()
     if predictor is None:
         return None
 
+    import dlib  # Ya importado por el registro al cargar el predictor
     dlib_rect = dlib.rectangle(int(rect[3]), int(rect[0]), int(rect[1]), int(rect[2]))
     shape = predictor(gray, dlib_rect)
-    coords = np.zeros((68, 2), dtype="int")
-    for i in range(0, 68):
-        coords[i] = (shape.part(i).x, shape.part(i).y)
-
-    # 1. Yaw (Lados)
-    nose_x = coords[NOSE_TIP][0]
-    left_eye_x = coords[LEFT_EYE][0]
-    right_eye_x = coords[RIGHT_EYE][0]
-    d_left = nose_x - left_eye_x
-    d_right = right_eye_x - nose_x
-    if d_right == 0:
-        d_right = 0.001
-    yaw_ratio = d_left / d_right  # < 0.6 Derecha, > 1.6 Izquierda
-
-    # 2. Pitch (Vertical)
-    eyes_y = (coords[LEFT_EYE][1] + coords[RIGHT_EYE][1]) / 2
-    nose_y = coords[NOSE_TIP][1]
-    mouth_y = coords[MOUTH_TOP][1]
-    d_up = nose_y - eyes_y
-    d_down = mouth_y - nose_y
-    if d_down == 0:
-        d_down = 0.001
-    pitch_ratio = d_up / d_down  # < 0.5 Arriba, > 1.8 Abajo
+    return compute_face_metrics(shape_to_array(shape))
 
-    # 3. Proximidad
-    face_width = dist.euclidean((coords[0][0], coords[0][1]), (coords[16][0], coords[16][1]))
 
-    return {
-        "yaw": yaw_ratio,
-        "pitch": pitch_ratio,
-        "width": face_width,
-        "coords": coords,
-    }
+def get_frame_metrics(frame, rect):
+    """
+    Etapa de landmarks compartida: corre el predictor como máximo una vez por
+    rostro del frame. Pose, liveness (EAR) y proximidad reutilizan el resultado.
+
+    Args:
+        frame (FrameContext): Frame decodificado
+        rect (tuple): Caja (top, right, bottom, left)
+
+    Returns:
+        FaceMetrics: Métricas del rostro, o None si no hay modelo de landmarks
+    """
+    key = tuple(int(v) for v in rect)
+    if key not in frame.landmarks:
+        metrics = get_face_metrics(frame.gray, key)
+        if metrics is not None:
+            frame.predictor_calls += 1
+        frame.landmarks[key] = metrics
+    return frame.landmarks[key]
+
+
+def box_within_reach(rect, img_width, min_proximity):
+    """
+    Chequeo de proximidad usando solo la caja de detección (sin landmarks).
+    Descarta los rostros que quedarían lejos aun con un ancho mandibular de
+    BOX_TO_JAW_MAX veces la caja.
+
+    Args:
+        rect (tuple): Caja (top, right, bottom, left)
+        img_width (int): Ancho de la imagen
+        min_proximity (float): Proximidad mínima que exigirá la validación por landmarks
+
+    Returns:
+        bool: False si el rostro está con certeza demasiado lejos
+    """
+    return (rect[1] - rect[3]) * BOX_TO_JAW_MAX >= min_proximity * img_width
 
 
-def validate_pose(gray, rect, img_width, target_pose):
+def box_too_far(rect, img_width, min_proximity):
+    """
+    Pre-chequeo por caja previo al predictor de landmarks. Sin el modelo de
+    landmarks (modo dev) no se aplica: ahí no hay chequeo por landmarks que
+    adelantar y la cota empírica rechazaría rostros que hoy se aceptan.
+
+    Returns:
+        bool: True si el rostro debe descartarse sin correr el predictor
+    """
+    if get_landmark_predictor() is None:
+        return False
+    return not box_within_reach(rect, img_width, min_proximity)
+
+
+def validate_pose(gray, rect, img_width, target_pose, metrics=None):
     """
     Verifica si el rostro cumple con la pose solicitada por la IA.
     Target Poses: 'CENTER', 'LEFT', 'RIGHT', 'UP', 'DOWN'
+    Si se pasan `metrics` (etapa de landmarks ya ejecutada) no se corre el predictor;
+    si no, un rostro lejano se descarta por su caja antes de correrlo.
     """
-    metrics = get_face_metrics(gray, rect)
-    if not metrics:
+    if metrics is None:
+        if box_too_far(rect, img_width, MIN_PROXIMITY_POSE):
+            return False, "ACÉRCATE MÁS"
+        metrics = get_face_metrics(gray, rect)
+    if metrics is None:
         return False, "Error IA"
 
-    yaw = metrics["yaw"]
-    pitch = metrics["pitch"]
-    proximity = metrics["width"] / img_width
+    yaw = metrics.yaw
+    pitch = metrics.pitch
+    proximity = metrics.width / img_width
 
     # Validación de Proximidad base (para cualquier pose)
-    if proximity < 0.22:
+    if proximity < MIN_PROXIMITY_POSE:
         return False, "ACÉRCATE MÁS"
 
     if target_pose == 'CENTER':
@@ -135,47 +253,49 @@ def validate_pose(gray, rect, img_width, target_pose):
 
 def eye_aspect_ratio(eye):
     """Calcula si el ojo está abierto (EAR)"""
-    A = dist.euclidean(eye[1], eye[5])
-    B = dist.euclidean(eye[2], eye[4])
-    C = dist.euclidean(eye[0], eye[3])
+    eye = np.asarray(eye, dtype=np.float64)
+    A, B = np.linalg.norm(eye[[1, 2]] - eye[[5, 4]], axis=1)
+    C = np.linalg.norm(eye[0] - eye[3])
     return (A + B) / (2.0 * C)
 
 
-def analyze_face_structure(gray_image, rect, img_width, img_height):
+def analyze_face_structure(gray_image, rect, img_width, img_height, metrics=None):
     """
     Retorna: (EsValido, Mensaje)
     Valida: Liveness (Ojos), Proximidad, Yaw y Pitch (pose neutra).
+    Si se pasan `metrics` (etapa de landmarks ya ejecutada) no se corre el predictor;
+    si no, un rostro lejano se descarta por su caja antes de correrlo.
     """
-    if predictor is None:
+    if get_landmark_predictor() is None:
         return True, "Modo Dev (Sin Modelo)"
 
+    # Rostro lejano: se descarta por su caja antes de correr el predictor
+    if metrics is None and box_too_far(rect, img_width, MIN_PROXIMITY_STRUCTURE):
+        return False, "DEMASIADO LEJOS. Acércate más a la cámara."
+
     try:
-        metrics = get_face_metrics(gray_image, rect)
-        if not metrics:
+        if metrics is None:
+            metrics = get_face_metrics(gray_image, rect)
+        if metrics is None:
             return False, "Error de análisis biométrico."
 
-        coords = metrics["coords"]
-
         # --- Liveness (ojos) ---
-        leftEye = coords[lStart:lEnd]
-        rightEye = coords[rStart:rEnd]
-        avgEAR = (eye_aspect_ratio(leftEye) + eye_aspect_ratio(rightEye)) / 2.0
-        if avgEAR < 0.18:
+        if metrics.ear < 0.18:
             return False, "OJOS CERRADOS. Ábrelos bien."
 
         # --- Proximidad ---
-        proximity = metrics["width"] / img_width
-        if proximity < 0.28:
+        proximity = metrics.width / img_width
+        if proximity < MIN_PROXIMITY_STRUCTURE:
             return False, "DEMASIADO LEJOS. Acércate más a la cámara."
 
         # --- Orientaciones ---
-        yaw_ratio = metrics["yaw"]
+        yaw_ratio = metrics.yaw
         if yaw_ratio < 0.7:
             return False, "GIRA AL CENTRO (Miras a derecha)."
         if yaw_ratio > 1.4:
             return False, "GIRA AL CENTRO (Miras a izquierda)."
 
-        pitch_ratio = metrics["pitch"]
+        pitch_ratio = metrics.pitch
         if pitch_ratio < 0.5:
             return False, "BAJA LA CABEZA (Miras arriba)."
         if pitch_ratio > 1.8:
@@ -3,17 +3,300 @@ Módulo de repositorio biométrico (CRUD de face encodings).
 Responsabilidades:
   - Almacenamiento y recuperación de encodings faciales
   - Persistencia en base de datos vía SQLAlchemy
-  - Comparación de rostros usando face_recognition
+  - Comparación de rostros (misma regla de distancia que face_recognition)
+  - Mantenimiento de la galería en memoria usada para búsquedas 1:N
+  - Coherencia de la galería entre workers vía bitácora de generaciones
+  - Plantillas múltiples por usuario con centroide precalculado
+  - Migración de los encodings de la fila User a la tabla FaceTemplate
 """
 
-import pickle
-import face_recognition
+import threading
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import LargeBinary, column, func, insert, inspect, select, table, update
 from app import db
-from app.models import User
+from app.face_codec import FORMAT_V1, MODEL_VERSION, decode_face_encoding, encode_face_encoding, is_legacy_blob
+from app.models import BiometricChange, FaceSample, FaceTemplate, User
 from app.logging_config import get_logger
+from app.services.biometrics.ann_index import create_face_index
+from app.services.biometrics.gallery import FaceGallery
 
 logger = get_logger('biometrics.repository')
 
+# Galería compartida por todos los requests del proceso
+_gallery = FaceGallery()
+# Serializa cargas y sincronizaciones: dos hilos que aplican deltas de
+# generaciones distintas podrían dejar la galería (o su generación) atrás.
+# Reentrante: sync_gallery puede recurrir a load_gallery
+_gallery_lock = threading.RLock()
+
+# Generaciones previas que se vuelven a revisar en cada delta: cubre escrituras
+# concurrentes que obtuvieron un id menor pero hicieron commit más tarde.
+_DELTA_OVERLAP = 32
+# A partir de este número de usuarios cambiados conviene una recarga completa
+_MAX_DELTA_USERS = 1000
+
+_NO_TEMPLATES = np.empty((0, 128), dtype=np.float32)
+
+
+def get_gallery():
+    """
+    Retorna la galería en memoria, cargándola desde la BD en el primer uso
+    y sincronizándola con la bitácora de cambios en los siguientes.
+    
+    Returns:
+        FaceGallery: Galería con todos los encodings registrados
+    """
+    if not _gallery.loaded:
+        with _gallery_lock:
+            if not _gallery.loaded:
+                load_gallery()
+                return _gallery
+    sync_gallery()
+    return _gallery
+
+
+def current_generation():
+    """Retorna la última generación de la bitácora biométrica (0 si está vacía)."""
+    return db.session.query(func.max(BiometricChange.id)).scalar() or 0
+
+
+def sync_gallery():
+    """
+    Aplica a la galería local los cambios hechos por otros workers.
+    El chequeo habitual cuesta un solo SELECT MAX(id); si hubo escrituras se
+    recargan únicamente los usuarios afectados.
+    
+    Returns:
+        int: Número de usuarios actualizados en la galería
+    """
+    if current_generation() == _gallery.generation:
+        return 0
+    with _gallery_lock:
+        return _apply_changes()
+
+
+def _apply_changes():
+    """Aplica los cambios pendientes de la bitácora (con _gallery_lock tomado)."""
+    # Se relee bajo el lock: otro hilo pudo sincronizar mientras se esperaba
+    generation = current_generation()
+    if generation == _gallery.generation:
+        return 0
+    
+    since = max(_gallery.generation - _DELTA_OVERLAP, 0)
+    oldest = db.session.query(func.min(BiometricChange.id)).scalar() or 0
+    if oldest > _gallery.generation + 1:
+        # La bitácora fue podada más allá de lo que este worker conoce
+        load_gallery()
+        return len(_gallery)
+    
+    changed_ids = [
+        user_id for (user_id,) in (
+            db.session.query(BiometricChange.user_id)
+            .filter(BiometricChange.id > since, BiometricChange.id <= generation)
+            .distinct()
+        )
+    ]
+    if len(changed_ids) > _MAX_DELTA_USERS:
+        load_gallery()
+        return len(_gallery)
+    
+    blobs = dict(
+        db.session.query(FaceTemplate.user_id, FaceTemplate.encoding)
+        .filter(FaceTemplate.user_id.in_(changed_ids))
+        .all()
+    )
+    templates = _load_templates(changed_ids)
+    for user_id in changed_ids:
+        blob = blobs.get(user_id)
+        try:
+            encoding = decode_face_encoding(blob)
+        except Exception as e:
+            logger.error(f"Encoding ilegible para usuario {user_id}: {e}")
+            encoding = None
+        
+        if encoding is None:
+            _gallery.remove(user_id)
+        else:
+            _gallery.upsert(user_id, encoding)
+            _gallery.set_templates(user_id, templates.get(user_id, _NO_TEMPLATES))
+    
+    _gallery.generation = generation
+    logger.debug(f"Galería sincronizada a generación {generation}: {len(changed_ids)} usuarios")
+    return len(changed_ids)
+
+
+def prune_biometric_changes(keep=10000):
+    """
+    Elimina las entradas antiguas de la bitácora biométrica.
+    Los workers que queden por detrás de lo podado harán una recarga completa.
+    
+    Args:
+        keep (int): Número de generaciones recientes a conservar
+    
+    Returns:
+        int: Filas eliminadas
+    """
+    cutoff = current_generation() - keep
+    if cutoff <= 0:
+        return 0
+    deleted = BiometricChange.query.filter(BiometricChange.id <= cutoff).delete()
+    db.session.commit()
+    return deleted
+
+
+def load_gallery():
+    """
+    Recarga la galería completa desde la base de datos.
+    Solo se lee la tabla FaceTemplate (user_id, encoding), sin tocar la de usuarios.
+    En la primera carga se asigna el índice ANN configurado (BIOMETRIC_INDEX).
+    
+    Returns:
+        FaceGallery: Galería recargada
+    """
+    with _gallery_lock:
+        return _load_gallery()
+
+
+def _load_gallery():
+    # La generación se lee antes que las filas: lo escrito durante la carga
+    # se vuelve a aplicar en la siguiente sincronización.
+    generation = current_generation()
+    rows = db.session.query(FaceTemplate.user_id, FaceTemplate.encoding).all()
+    
+    items = []
+    for user_id, blob in rows:
+        try:
+            items.append((user_id, decode_face_encoding(blob)))
+        except Exception as e:
+            logger.error(f"Encoding ilegible para usuario {user_id}: {e}")
+    
+    if not _gallery.loaded:
+        _gallery.rerank_k = current_app.config.get('BIOMETRIC_RERANK_K', 8)
+        _gallery.set_index(create_face_index(current_app.config))
+    _gallery.load(items)
+    _gallery.load_templates(_load_templates().items())
+    _gallery.generation = generation
+    logger.info(f"Galería biométrica cargada: {len(_gallery)} encodings")
+    return _gallery
+
+
+def _load_templates(user_ids=None):
+    """
+    Lee las plantillas individuales agrupadas por usuario.
+    
+    Args:
+        user_ids (list): Limitar a estos usuarios (None = todos)
+    
+    Returns:
+        dict: user_id -> ndarray (k, 128) float32
+    """
+    query = db.session.query(FaceSample.user_id, FaceSample.encoding)
+    if user_ids is not None:
+        query = query.filter(FaceSample.user_id.in_(user_ids))
+    
+    grouped = {}
+    for user_id, blob in query.order_by(FaceSample.user_id, FaceSample.id):
+        try:
+            grouped.setdefault(user_id, []).append(decode_face_encoding(blob))
+        except Exception as e:
+            logger.error(f"Plantilla ilegible para usuario {user_id}: {e}")
+    return {user_id: np.stack(encodings) for user_id, encodings in grouped.items()}
+
+
+def save_face_templates(user, templates):
+    """
+    Guarda varias plantillas faciales de un usuario (p. ej. poses CENTER/LEFT/RIGHT).
+    Reemplaza las anteriores y guarda su centroide como encoding principal.
+    
+    Args:
+        user (User): Objeto de usuario
+        templates (list): Pares (pose, encoding)
+    
+    Returns:
+        bool: True si se guardó exitosamente, False si hubo error
+    """
+    try:
+        encodings = np.stack([np.asarray(encoding, dtype=np.float32) for _, encoding in templates])
+        centroid = encodings.mean(axis=0)
+        
+        FaceSample.query.filter_by(user_id=user.id).delete()
+        for pose, encoding in templates:
+            db.session.add(FaceSample(user_id=user.id, pose=pose, encoding=encode_face_encoding(encoding)))
+        user.set_face_encoding(centroid)
+        db.session.add(BiometricChange(user_id=user.id))
+        db.session.commit()
+        
+        if _gallery.loaded:
+            _gallery.upsert(user.id, centroid)
+            _gallery.set_templates(user.id, encodings)
+        logger.info(f"{len(templates)} plantillas guardadas para usuario {user.id}")
+        return True
+    except Exception as e:
+        logger.error(f"Error guardando plantillas para usuario {user.id}: {e}", exc_info=True)
+        db.session.rollback()
+        return False
+
+
+def save_face_templates_bulk(entries):
+    """
+    Guarda las plantillas de muchos usuarios en una sola transacción
+    (importaciones administrativas). Para cada usuario reemplaza sus
+    plantillas anteriores y guarda su centroide como encoding principal;
+    con una sola plantilla no se guardan muestras, como save_face_encoding.
+    
+    Args:
+        entries (list): Pares (user_id, encodings (k, 128))
+    
+    Returns:
+        int: Número de usuarios actualizados
+    """
+    entries = [
+        (user_id, np.asarray(encodings, dtype=np.float32).reshape(-1, 128))
+        for user_id, encodings in entries
+    ]
+    entries = [(user_id, encodings) for user_id, encodings in entries if len(encodings)]
+    if not entries:
+        return 0
+    
+    user_ids = [user_id for user_id, _ in entries]
+    enrolled_at = datetime.utcnow()
+    try:
+        FaceSample.query.filter(FaceSample.user_id.in_(user_ids)).delete(synchronize_session=False)
+        FaceTemplate.query.filter(FaceTemplate.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.session.execute(insert(FaceTemplate), [
+            {
+                'user_id': user_id,
+                'encoding': encode_face_encoding(encodings.mean(axis=0)),
+                'format_version': FORMAT_V1,
+                'model_version': MODEL_VERSION,
+                'enrolled_at': enrolled_at,
+            }
+            for user_id, encodings in entries
+        ])
+        samples = [
+            {'user_id': user_id, 'pose': 'CENTER', 'encoding': encode_face_encoding(encoding)}
+            for user_id, encodings in entries if len(encodings) > 1
+            for encoding in encodings
+        ]
+        if samples:
+            db.session.execute(insert(FaceSample), samples)
+        db.session.execute(insert(BiometricChange), [{'user_id': user_id} for user_id in user_ids])
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"Error guardando plantillas de {len(entries)} usuarios: {e}", exc_info=True)
+        db.session.rollback()
+        raise
+    
+    if _gallery.loaded:
+        for user_id, encodings in entries:
+            _gallery.upsert(user_id, encodings.mean(axis=0))
+            _gallery.set_templates(user_id, encodings if len(encodings) > 1 else _NO_TEMPLATES)
+    logger.info(f"Plantillas guardadas para {len(entries)} usuarios ({len(samples)} muestras)")
+    return len(entries)
+
 
 def save_face_encoding(user, encoding):
     """
@@ -27,8 +310,13 @@ def save_face_encoding(user, encoding):
         bool: True si se guardó exitosamente, False si hubo error
     """
     try:
-        user.face_encoding = pickle.dumps(encoding)
+        FaceSample.query.filter_by(user_id=user.id).delete()
+        user.set_face_encoding(encoding)
+        db.session.add(BiometricChange(user_id=user.id))
         db.session.commit()
+        if _gallery.loaded:
+            _gallery.upsert(user.id, encoding)
+            _gallery.set_templates(user.id, _NO_TEMPLATES)
         logger.info(f"Encoding guardado para usuario {user.id}")
         return True
     except Exception as e:
@@ -48,10 +336,7 @@ def load_face_encoding(user):
         ndarray: Array NumPy con el vector de características, o None si no existe
     """
     try:
-        if not user.face_encoding:
-            return None
-        encoding = pickle.loads(user.face_encoding)
-        return encoding
+        return user.get_face_encoding()
     except Exception as e:
         logger.error(f"Error cargando encoding para usuario {user.id}: {e}", exc_info=True)
         return None
@@ -62,10 +347,10 @@ def get_all_face_encodings():
     Obtiene todos los usuarios con encodings guardados.
     
     Returns:
-        list: Lista de objetos User que tienen face_encoding registrado
+        list: Lista de objetos User que tienen FaceTemplate registrada
     """
     try:
-        users = User.query.filter(User.face_encoding.isnot(None)).all()
+        users = User.query.join(FaceTemplate).all()
         logger.debug(f"Usuarios con encoding: {len(users)}")
         return users
     except Exception as e:
@@ -86,12 +371,9 @@ def compare_faces(known_encoding, unknown_encoding, tolerance=0.45):
         bool: True si los rostros coinciden, False en caso contrario
     """
     try:
-        matches = face_recognition.compare_faces(
-            [known_encoding],
-            unknown_encoding,
-            tolerance=tolerance
-        )
-        return matches[0] if matches else False
+        # Misma regla que face_recognition.compare_faces, sin importar sus modelos
+        distance = np.linalg.norm(np.asarray(known_encoding) - np.asarray(unknown_encoding))
+        return bool(distance <= tolerance)
     except Exception as e:
         logger.error(f"Error comparando encodings: {e}", exc_info=True)
         return False
@@ -99,7 +381,9 @@ def compare_faces(known_encoding, unknown_encoding, tolerance=0.45):
 
 def find_matching_user(unknown_encoding, tolerance=0.45):
     """
-    Busca un usuario que coincida con el encoding desconocido.
+    Busca el usuario más cercano al encoding desconocido.
+    La comparación se hace contra toda la galería en una sola operación
+    vectorizada y se retorna la mejor coincidencia, no la primera.
     
     Args:
         unknown_encoding (ndarray): Encoding facial capturado
@@ -109,24 +393,71 @@ def find_matching_user(unknown_encoding, tolerance=0.45):
         User: Objeto User si se encuentra coincidencia, None en caso contrario
     """
     try:
-        users = get_all_face_encodings()
+        user_id, distance = get_gallery().best_match(unknown_encoding, tolerance=tolerance)
         
-        for user in users:
-            known_encoding = load_face_encoding(user)
-            if known_encoding is None:
-                continue
-            
-            if compare_faces(known_encoding, unknown_encoding, tolerance):
-                logger.info(f"Match encontrado: usuario {user.id}")
-                return user
+        if user_id is None:
+            logger.debug("No se encontró match")
+            return None
         
-        logger.debug("No se encontró match")
-        return None
+        logger.info(f"Match encontrado: usuario {user_id} (distancia {distance:.3f})")
+        return db.session.get(User, user_id)
     except Exception as e:
         logger.error(f"Error buscando usuario coincidente: {e}", exc_info=True)
         return None
 
 
+def get_claimed_user(username=None, user_id=None):
+    """
+    Obtiene el usuario cuya identidad se declara en un login 1:1.
+    
+    Args:
+        username (str): Nombre de usuario declarado
+        user_id (int): Id de usuario declarado (alternativa a username)
+    
+    Returns:
+        User: Usuario con encoding registrado, o None si no existe o no está enrolado
+    """
+    try:
+        if user_id is not None:
+            user = db.session.get(User, int(user_id))
+        elif username:
+            user = User.query.filter_by(username=username).first()
+        else:
+            return None
+        
+        if user is None or not user.has_face_template:
+            return None
+        return user
+    except Exception as e:
+        logger.error(f"Error obteniendo usuario declarado: {e}", exc_info=True)
+        return None
+
+
+def verify_user_face(user, unknown_encoding, tolerance=0.45):
+    """
+    Verificación 1:1: compara el encoding capturado solo contra el del usuario declarado.
+    Si el usuario tiene plantillas múltiples se usa la menor distancia (best-of-k).
+    
+    Args:
+        user (User): Usuario declarado
+        unknown_encoding (ndarray): Encoding facial capturado
+        tolerance (float): Umbral de tolerancia para comparación
+    
+    Returns:
+        bool: True si la distancia está dentro de la tolerancia
+    """
+    known = _load_templates([user.id]).get(user.id)
+    if known is None:
+        known_encoding = load_face_encoding(user)
+        if known_encoding is None:
+            return False
+        known = np.asarray(known_encoding, dtype=np.float32)[None, :]
+    
+    distance = float(np.min(np.linalg.norm(known - np.asarray(unknown_encoding, dtype=np.float32), axis=1)))
+    logger.debug(f"Verificación 1:1 usuario {user.id}: distancia {distance:.3f}")
+    return distance <= tolerance
+
+
 def clear_face_encoding(user):
     """
     Elimina el encoding facial de un usuario.
@@ -138,11 +469,158 @@ def clear_face_encoding(user):
         bool: True si se eliminó exitosamente, False si hubo error
     """
     try:
-        user.face_encoding = None
+        FaceSample.query.filter_by(user_id=user.id).delete()
+        user.clear_face_encoding()
+        db.session.add(BiometricChange(user_id=user.id))
         db.session.commit()
+        _gallery.remove(user.id)
         logger.info(f"Encoding eliminado para usuario {user.id}")
         return True
     except Exception as e:
         logger.error(f"Error eliminando encoding para usuario {user.id}: {e}", exc_info=True)
         db.session.rollback()
         return False
+
+
+def migrate_face_encodings(batch_size=500):
+    """
+    Reescribe los encodings heredados (pickle) de FaceTemplate al formato binario v1.
+    Recorre la tabla por bloques de ids con una transacción corta por bloque,
+    por lo que puede ejecutarse con la aplicación en línea: cada UPDATE exige
+    que la fila conserve el blob leído, así que un re-enrolamiento concurrente
+    nunca se pisa, y cada fila reescrita se anota en la bitácora para que los
+    demás workers la recarguen.
+    
+    Args:
+        batch_size (int): Filas leídas por transacción
+    
+    Returns:
+        int: Número de encodings migrados
+    """
+    templates = FaceTemplate.__table__
+    migrated = 0
+    last_id = 0
+    
+    while True:
+        rows = (
+            db.session.query(FaceTemplate.user_id, FaceTemplate.encoding)
+            .filter(FaceTemplate.user_id > last_id)
+            .order_by(FaceTemplate.user_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        converted = []
+        try:
+            for user_id, blob in rows:
+                if not is_legacy_blob(blob):
+                    continue
+                try:
+                    encoding = encode_face_encoding(decode_face_encoding(blob))
+                except Exception as e:
+                    logger.error(f"Encoding ilegible para usuario {user_id}, se omite: {e}")
+                    continue
+                result = db.session.execute(
+                    update(templates)
+                    .where(templates.c.user_id == user_id, templates.c.encoding == blob)
+                    .values(encoding=encoding, format_version=FORMAT_V1)
+                )
+                # 0 filas: el usuario se re-enroló entre la lectura y la escritura
+                if result.rowcount:
+                    converted.append(user_id)
+            if converted:
+                db.session.execute(insert(BiometricChange), [{'user_id': user_id} for user_id in converted])
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error migrando bloque hasta usuario {last_id}: {e}", exc_info=True)
+            db.session.rollback()
+            raise
+        
+        migrated += len(converted)
+        logger.info(f"Migración de encodings: {migrated} filas reescritas (último id {last_id})")
+    
+    return migrated
+
+
+def move_face_encodings_to_templates(batch_size=500):
+    """
+    Migración de datos: mueve los encodings de la columna heredada
+    user.face_encoding a la tabla FaceTemplate (formato v1, modelo actual).
+    Crea la tabla si no existe y recorre los usuarios por bloques de ids con
+    una transacción corta por bloque. Cada fila movida queda con la columna
+    heredada en NULL, así que la migración es idempotente y puede ejecutarse
+    con la aplicación en línea; la columna vacía puede eliminarse después.
+    
+    Args:
+        batch_size (int): Filas leídas por transacción
+    
+    Returns:
+        int: Número de encodings movidos
+    """
+    FaceTemplate.__table__.create(db.engine, checkfirst=True)
+    columns = {col['name'] for col in inspect(db.engine).get_columns(User.__tablename__)}
+    if 'face_encoding' not in columns:
+        return 0
+    
+    # La columna ya no está mapeada en User: se lee como tabla ligera
+    legacy = table(User.__tablename__, column('id'), column('face_encoding', LargeBinary))
+    moved = 0
+    last_id = 0
+    
+    while True:
+        rows = db.session.execute(
+            select(legacy.c.id, legacy.c.face_encoding)
+            .where(legacy.c.face_encoding.isnot(None), legacy.c.id > last_id)
+            .order_by(legacy.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        # Un enrolamiento nuevo (ya en FaceTemplate) prevalece sobre el heredado
+        enrolled = {
+            user_id for (user_id,) in
+            db.session.query(FaceTemplate.user_id).filter(FaceTemplate.user_id.in_([row[0] for row in rows]))
+        }
+        templates = []
+        cleared = []
+        now = datetime.utcnow()
+        for user_id, blob in rows:
+            if user_id not in enrolled:
+                try:
+                    encoding = encode_face_encoding(decode_face_encoding(blob))
+                except Exception as e:
+                    logger.error(f"Encoding ilegible para usuario {user_id}, se omite: {e}")
+                    continue
+                templates.append({
+                    'user_id': user_id,
+                    'encoding': encoding,
+                    'format_version': FORMAT_V1,
+                    'model_version': MODEL_VERSION,
+                    'enrolled_at': now,
+                })
+            cleared.append(user_id)
+        
+        try:
+            if templates:
+                db.session.execute(insert(FaceTemplate), templates)
+                # Los workers en línea aplican los usuarios movidos en su próxima sincronización
+                db.session.execute(insert(BiometricChange), [{'user_id': row['user_id']} for row in templates])
+            if cleared:
+                db.session.execute(
+                    update(legacy).where(legacy.c.id.in_(cleared)).values(face_encoding=None)
+                )
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error moviendo bloque hasta usuario {last_id}: {e}", exc_info=True)
+            db.session.rollback()
+            raise
+        
+        moved += len(templates)
+        logger.info(f"Migración a FaceTemplate: {moved} encodings movidos (último id {last_id})")
+    
+    return moved
@@ -0,0 +1,253 @@
+"""
+Módulo de tareas biométricas (cómputo puro sobre un frame).
+Responsabilidades:
+  - Agrupar las etapas intensivas en CPU (detección, landmarks, encoding)
+  - Ejecutarse igual en el hilo del request o en un worker del motor
+
+Las tareas no tocan Flask ni la BD: reciben un FrameContext y retornan
+resultados serializables, de modo que el motor pueda correrlas en otro proceso.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.services.biometrics import encoders, pose_checks
+from app.services.biometrics.gallery import ENCODING_DIM
+from app.services.biometrics.metrics import StageClock
+
+# Resultados de analyze_face_task
+FACE_OK = 'ok'
+FACE_NOT_FOUND = 'no_face'
+FACE_MULTIPLE = 'multiple_faces'
+FACE_REJECTED = 'rejected'
+FACE_NO_ENCODING = 'no_encoding'
+
+# Etapas de la cascada, de menor a mayor costo. Cada rechazo registra la
+# etapa en la que ocurrió: un frame malo se descarta en la más barata posible.
+STAGE_DETECT = 'detect'        # Sin rostro o rostros de más (solo detección)
+STAGE_BOX = 'box'              # Proximidad por caja (sin predictor)
+STAGE_LANDMARKS = 'landmarks'  # Liveness, proximidad y pose (predictor de 68 puntos)
+STAGE_ENCODE = 'encode'        # Encoder ResNet
+
+
+@dataclass(frozen=True)
+class FaceAnalysis:
+    """Resultado del análisis de un rostro (serializable entre procesos)."""
+    status: str
+    message: str = ''
+    encoding: np.ndarray = None
+    predictor_calls: int = 0
+    reason: str = ''      # Código de rechazo estable (etiqueta de métricas)
+    timings: tuple = ()   # Pares (etapa, segundos)
+    stage: str = ''       # Etapa de la cascada que rechazó el frame
+
+
+@dataclass(frozen=True)
+class PoseAnalysis:
+    """Resultado de un desafío de pose (serializable entre procesos)."""
+    valid: bool
+    message: str
+    predictor_calls: int = 0
+    reason: str = ''
+    timings: tuple = ()
+    stage: str = ''
+    box: tuple = None      # Caja del rostro evaluado (para el seguimiento)
+    tracked: bool = False  # Si se encontró en la región de seguimiento
+
+
+def encode_frame(frame, boxes):
+    """Encodings de las cajas, alineados con el predictor de 5 puntos."""
+    # face_recognition corre su predictor de 5 puntos por cada caja
+    frame.predictor_calls += len(boxes)
+    return encoders.encode_faces(frame.rgb, boxes)
+
+
+def encode_boxes_task(frame, boxes=None):
+    """
+    Genera los encodings de las cajas dadas, sin validaciones de estructura
+    (lotes de enrolamiento administrativo). Sin cajas se detectan en el frame.
+
+    Args:
+        frame (FrameContext): Frame decodificado en color
+        boxes (list): Rectángulos (top, right, bottom, left), o None para detectar
+
+    Returns:
+        ndarray: Matriz (n, 128) float32, una fila por rostro codificado
+    """
+    if boxes is None:
+        boxes = encoders.detect_faces_in_frame(frame, pose_checks.MIN_PROXIMITY_STRUCTURE)
+    if not boxes:
+        return np.empty((0, ENCODING_DIM), dtype=np.float32)
+
+    # Sin landmarks de 68 puntos: la alineación no depende de si el predictor está cargado
+    encodings = encode_frame(frame, boxes)
+    if len(encodings) != len(boxes):
+        return np.empty((0, ENCODING_DIM), dtype=np.float32)
+    return np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+
+def _rejected(status, stage, clock, frame=None, message='', reason=None):
+    """FaceAnalysis de un frame descartado en la etapa `stage` de la cascada."""
+    return FaceAnalysis(
+        status, message,
+        predictor_calls=frame.predictor_calls if frame is not None else 0,
+        reason=reason or status,
+        timings=tuple(clock.timings),
+        stage=stage,
+    )
+
+
+def analyze_face_task(frame, allow_multiple=False):
+    """
+    Detecta el rostro, valida su estructura (liveness, proximidad, pose
+    neutra) y genera su encoding.
+
+    Las etapas corren en orden de costo y la primera que falla corta la
+    cascada: detección (conteo de rostros), proximidad por caja, landmarks
+    y por último el encoder ResNet.
+
+    Args:
+        frame (FrameContext): Frame decodificado en color
+        allow_multiple (bool): Si es False, más de un rostro es un rechazo
+
+    Returns:
+        FaceAnalysis: Estado, mensaje de validación, encoding y tiempos por etapa
+    """
+    clock = StageClock()
+
+    # Detección sobre copia reducida, cajas en resolución completa
+    boxes = encoders.detect_faces_in_frame(frame, pose_checks.MIN_PROXIMITY_STRUCTURE)
+    clock.lap(STAGE_DETECT)
+    if not boxes:
+        return _rejected(FACE_NOT_FOUND, STAGE_DETECT, clock)
+    if len(boxes) > 1 and not allow_multiple:
+        return _rejected(FACE_MULTIPLE, STAGE_DETECT, clock)
+
+    # Rostro lejano: se descarta por su caja, sin correr el predictor
+    if pose_checks.box_too_far(boxes[0], frame.width, pose_checks.MIN_PROXIMITY_STRUCTURE):
+        clock.lap(STAGE_BOX)
+        message = "DEMASIADO LEJOS. Acércate más a la cámara."
+        return _rejected(FACE_REJECTED, STAGE_BOX, clock, frame, message,
+                         pose_checks.rejection_reason(message))
+
+    # Estructura facial (landmarks calculados una sola vez)
+    metrics = pose_checks.get_frame_metrics(frame, boxes[0])
+    is_valid, validation_msg = pose_checks.analyze_face_structure(
+        frame.gray, boxes[0], frame.width, frame.height, metrics
+    )
+    clock.lap(STAGE_LANDMARKS)
+    if not is_valid:
+        return _rejected(FACE_REJECTED, STAGE_LANDMARKS, clock, frame, validation_msg,
+                         pose_checks.rejection_reason(validation_msg))
+
+    encodings = encode_frame(frame, boxes)
+    clock.lap(STAGE_ENCODE)
+    if not encodings:
+        return _rejected(FACE_NO_ENCODING, STAGE_ENCODE, clock, frame)
+
+    return FaceAnalysis(
+        FACE_OK, encoding=encodings[0], predictor_calls=frame.predictor_calls,
+        timings=tuple(clock.timings),
+    )
+
+
+def pose_template_task(frame, pose):
+    """
+    Genera la plantilla de un frame de pose del enrolamiento.
+
+    Args:
+        frame (FrameContext): Frame decodificado en color
+        pose (str): Pose declarada para el frame
+
+    Returns:
+        FaceAnalysis: FACE_OK con el encoding si el frame cumple la pose
+    """
+    clock = StageClock()
+
+    boxes = encoders.detect_faces_in_frame(frame, pose_checks.MIN_PROXIMITY_POSE)
+    clock.lap(STAGE_DETECT)
+    if len(boxes) != 1:
+        return _rejected(FACE_MULTIPLE if boxes else FACE_NOT_FOUND, STAGE_DETECT, clock)
+
+    if pose_checks.box_too_far(boxes[0], frame.width, pose_checks.MIN_PROXIMITY_POSE):
+        clock.lap(STAGE_BOX)
+        message = "ACÉRCATE MÁS"
+        return _rejected(FACE_REJECTED, STAGE_BOX, clock, frame, message,
+                         pose_checks.rejection_reason(message))
+
+    metrics = pose_checks.get_frame_metrics(frame, boxes[0])
+    is_valid, msg = pose_checks.validate_pose(frame.gray, boxes[0], frame.width, pose, metrics)
+    clock.lap(STAGE_LANDMARKS)
+    if not is_valid:
+        return _rejected(FACE_REJECTED, STAGE_LANDMARKS, clock, frame, msg,
+                         pose_checks.rejection_reason(msg))
+
+    encodings = encode_frame(frame, boxes)
+    clock.lap(STAGE_ENCODE)
+    if not encodings:
+        return _rejected(FACE_NO_ENCODING, STAGE_ENCODE, clock, frame)
+
+    return FaceAnalysis(
+        FACE_OK, encoding=encodings[0], predictor_calls=frame.predictor_calls,
+        timings=tuple(clock.timings),
+    )
+
+
+def _closest_box(boxes, reference):
+    """Caja cuyo centro está más cerca del de `reference`."""
+    ref_x = (reference[1] + reference[3]) / 2
+    ref_y = (reference[0] + reference[2]) / 2
+    return min(boxes, key=lambda b: ((b[1] + b[3]) / 2 - ref_x) ** 2 + ((b[0] + b[2]) / 2 - ref_y) ** 2)
+
+
+def pose_challenge_task(frame, target_pose, last_box=None):
+    """
+    Valida que el rostro del frame cumpla la pose requerida.
+
+    Con `last_box` (sesión de seguimiento) se busca primero en la región
+    alrededor de esa caja y solo si no aparece se detecta en el frame completo.
+
+    Args:
+        frame (FrameContext): Frame decodificado (basta con gris)
+        target_pose (str): Pose requerida ('CENTER', 'LEFT', 'RIGHT', 'UP', 'DOWN')
+        last_box (tuple): Caja del rostro en el frame anterior (opcional)
+
+    Returns:
+        PoseAnalysis: Resultado de la validación, caja evaluada y tiempos por etapa
+    """
+    clock = StageClock()
+
+    boxes = []
+    if last_box is not None:
+        boxes = encoders.detect_faces_in_region(frame, last_box)
+        clock.lap('track')
+    tracked = bool(boxes)
+    if not boxes:
+        boxes = encoders.detect_faces_in_frame(frame, pose_checks.MIN_PROXIMITY_POSE)
+        clock.lap(STAGE_DETECT)
+    if not boxes:
+        return PoseAnalysis(False, "Rostro no encontrado", reason=FACE_NOT_FOUND,
+                            timings=tuple(clock.timings), stage=STAGE_DETECT)
+
+    box = tuple(int(v) for v in (_closest_box(boxes, last_box) if last_box is not None else boxes[0]))
+    if pose_checks.box_too_far(box, frame.width, pose_checks.MIN_PROXIMITY_POSE):
+        clock.lap(STAGE_BOX)
+        message = "ACÉRCATE MÁS"
+        return PoseAnalysis(False, message, reason=pose_checks.rejection_reason(message),
+                            timings=tuple(clock.timings), stage=STAGE_BOX,
+                            box=box, tracked=tracked)
+
+    metrics = pose_checks.get_frame_metrics(frame, box)
+    is_valid, msg = pose_checks.validate_pose(
+        frame.gray, box, frame.width, target_pose, metrics
+    )
+    clock.lap(STAGE_LANDMARKS)
+    return PoseAnalysis(
+        is_valid, msg, frame.predictor_calls,
+        reason='' if is_valid else pose_checks.rejection_reason(msg),
+        timings=tuple(clock.timings),
+        stage='' if is_valid else STAGE_LANDMARKS,
+        box=box,
+        tracked=tracked,
+    )
@@ -0,0 +1,174 @@
+"""
+Módulo de seguimiento del rostro en el desafío de pose.
+Responsabilidades:
+  - Mantener una sesión por desafío (token corto) con la última caja del rostro
+  - Decidir si la caja de un frame continúa la del frame anterior
+  - Verificar que todos los frames de pose provienen del mismo rostro continuo
+
+Con la última caja conocida la detección se limita a una región alrededor de
+ella (ver encoders.detect_faces_in_region) y solo se recurre al frame completo
+cuando se pierde el seguimiento.
+
+Las sesiones viven en memoria del proceso web: con varios procesos detrás de
+un balanceador el desafío requiere afinidad de sesión.
+"""
+
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+
+from flask import current_app, has_app_context
+
+from app.logging_config import get_logger
+
+logger = get_logger('biometrics.tracking')
+
+DEFAULT_SESSION_TTL = 120.0
+DEFAULT_MAX_SESSIONS = 10000
+
+# Máximo desplazamiento del centro entre frames consecutivos, en anchos de rostro
+MAX_CENTER_SHIFT = 1.0
+# Máximo cambio de tamaño de la caja entre frames consecutivos (razón)
+MAX_SCALE_CHANGE = 1.6
+# Máximo intervalo entre frames (segundos) para considerar el rostro continuo
+MAX_FRAME_GAP = 5.0
+
+
+@dataclass
+class PoseSession:
+    """Estado de un desafío de pose en curso."""
+    token: str
+    user_id: int
+    created_at: float
+    updated_at: float
+    last_box: tuple = None     # (top, right, bottom, left) en coordenadas del frame
+    frame_size: tuple = None   # (ancho, alto) de los frames del desafío
+    passed_poses: list = field(default_factory=list)
+    frames: int = 0
+    tracked_frames: int = 0
+    broken: bool = False
+
+    def tracking_box(self, frame_size):
+        """Caja de partida para la región de seguimiento (None si no aplica)."""
+        if self.broken or self.frame_size != frame_size:
+            return None
+        return self.last_box
+
+    def observe(self, box, frame_size, tracked, now=None):
+        """
+        Registra la caja del rostro de un frame y verifica su continuidad con
+        la anterior. Una discontinuidad invalida la sesión completa.
+
+        Args:
+            box (tuple): Caja (top, right, bottom, left) encontrada en el frame
+            frame_size (tuple): (ancho, alto) del frame
+            tracked (bool): Si la caja se encontró en la región de seguimiento
+            now (float): Marca de tiempo (default: time.monotonic())
+
+        Returns:
+            bool: True si el rostro continúa el seguido hasta ahora
+        """
+        now = time.monotonic() if now is None else now
+        if self.last_box is not None and not self.broken:
+            if (self.frame_size != frame_size
+                    or now - self.updated_at > MAX_FRAME_GAP
+                    or not is_continuous(self.last_box, box)):
+                self.broken = True
+                logger.info(f"Sesión de pose {self.token[:6]}…: rostro discontinuo")
+
+        self.last_box = box
+        self.frame_size = frame_size
+        self.updated_at = now
+        self.frames += 1
+        self.tracked_frames += int(tracked)
+        return not self.broken
+
+    def is_complete(self):
+        """Sesión utilizable para enrolar: continua y con al menos una pose válida."""
+        return not self.broken and bool(self.passed_poses)
+
+
+def is_continuous(previous, current):
+    """
+    Heurística de continuidad entre cajas de frames consecutivos: el centro
+    no se desplaza más de MAX_CENTER_SHIFT anchos de rostro y el tamaño no
+    cambia más de MAX_SCALE_CHANGE veces.
+    """
+    p_top, p_right, p_bottom, p_left = previous
+    c_top, c_right, c_bottom, c_left = current
+    p_w, c_w = max(1, p_right - p_left), max(1, c_right - c_left)
+
+    dx = (c_left + c_right - p_left - p_right) / 2
+    dy = (c_top + c_bottom - p_top - p_bottom) / 2
+    if (dx * dx + dy * dy) ** 0.5 > MAX_CENTER_SHIFT * max(p_w, c_w):
+        return False
+    return max(p_w, c_w) / min(p_w, c_w) <= MAX_SCALE_CHANGE
+
+
+class PoseSessionStore:
+    """Sesiones de desafío indexadas por token, con expiración por inactividad."""
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL, max_sessions=DEFAULT_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, user_id):
+        """Abre una sesión para el usuario y retorna su token."""
+        now = time.monotonic()
+        token = secrets.token_urlsafe(12)
+        with self._lock:
+            self._purge(now)
+            if len(self._sessions) >= self.max_sessions:
+                # Descartar la sesión más antigua (dict conserva el orden de inserción)
+                self._sessions.pop(next(iter(self._sessions)))
+            self._sessions[token] = PoseSession(token, user_id, now, now)
+        return token
+
+    def get(self, token, user_id):
+        """Retorna la sesión vigente del usuario, o None."""
+        if not token:
+            return None
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None or session.user_id != user_id:
+                return None
+            if time.monotonic() - session.updated_at > self.ttl:
+                del self._sessions[token]
+                return None
+            return session
+
+    def pop(self, token, user_id):
+        """Retira y retorna la sesión vigente del usuario (un solo uso), o None."""
+        session = self.get(token, user_id)
+        if session is not None:
+            with self._lock:
+                self._sessions.pop(token, None)
+        return session
+
+    def _purge(self, now):
+        expired = [t for t, s in self._sessions.items() if now - s.updated_at > self.ttl]
+        for token in expired:
+            del self._sessions[token]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Retorna el almacén de sesiones del proceso, creándolo en el primer uso."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                ttl = DEFAULT_SESSION_TTL
+                if has_app_context():
+                    ttl = current_app.config.get('BIOMETRIC_POSE_SESSION_TTL', DEFAULT_SESSION_TTL)
+                _store = PoseSessionStore(ttl=ttl)
+    return _store
@@ -0,0 +1,61 @@
+"""
+Servicio de contraseñas.
+Expone el hashing y la verificación aislados de los hilos de los requests,
+la política de hashing y la actualización transparente de hashes.
+"""
+
+from .policy import (
+    HashAlgorithm,
+    BcryptAlgorithm,
+    ScryptAlgorithm,
+    Argon2Algorithm,
+    PasswordPolicy,
+    calibrate,
+    create_password_policy,
+    get_algorithm,
+    identify,
+    verify_password,
+)
+
+from .hasher import (
+    PasswordHasher,
+    InlineHasher,
+    ProcessPoolHasher,
+    HasherError,
+    HasherBusyError,
+    HasherTimeoutError,
+    create_password_hasher,
+    get_password_hasher,
+    hash_password,
+    check_password,
+)
+
+from .upgrade import schedule_rehash, widen_password_column
+
+__all__ = [
+    # Policy
+    'HashAlgorithm',
+    'BcryptAlgorithm',
+    'ScryptAlgorithm',
+    'Argon2Algorithm',
+    'PasswordPolicy',
+    'calibrate',
+    'create_password_policy',
+    'get_algorithm',
+    'identify',
+    'verify_password',
+    # Hasher
+    'PasswordHasher',
+    'InlineHasher',
+    'ProcessPoolHasher',
+    'HasherError',
+    'HasherBusyError',
+    'HasherTimeoutError',
+    'create_password_hasher',
+    'get_password_hasher',
+    'hash_password',
+    'check_password',
+    # Upgrade
+    'schedule_rehash',
+    'widen_password_column',
+]
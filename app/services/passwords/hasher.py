@@ -0,0 +1,238 @@
+"""
+Hashing de contraseñas fuera de los hilos de los requests.
+Responsabilidades:
+  - Calcular y verificar hashes según la política vigente en el hilo del
+    request (InlineHasher) o en un pool de procesos dedicado con los núcleos
+    repartidos entre los workers web (ProcessPoolHasher)
+  - Acotar la cola de trabajos pendientes y el tiempo de espera por trabajo
+  - Medir la duración de cada operación en el registro de métricas
+
+Selección vía PASSWORD_HASHER: 'inline' (default) | 'process'.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing import get_context
+
+from flask import current_app, has_app_context
+
+from app.logging_config import get_logger
+from app.metrics import registry as metrics_registry
+from app.services.passwords.policy import (
+    PasswordPolicy,
+    create_password_policy,
+    get_algorithm,
+    verify_password,
+)
+from app.workers import default_workers
+
+logger = get_logger('passwords.hasher')
+
+DEFAULT_TIMEOUT = 5.0
+
+PASSWORD_METRIC = 'password_hash_seconds'
+metrics_registry.describe(PASSWORD_METRIC, 'Duración del hashing y la verificación de contraseñas')
+
+
+class HasherError(RuntimeError):
+    """Error base del servicio de hashing."""
+
+
+class HasherBusyError(HasherError):
+    """La cola del pool de hashing está llena."""
+
+
+class HasherTimeoutError(HasherError):
+    """Una operación de hashing superó su tiempo máximo."""
+
+
+def _hash(password, algorithm, params):
+    return get_algorithm(algorithm).hash(password, params)
+
+
+class PasswordHasher(ABC):
+    """Interfaz de los servicios que calculan y verifican hashes de contraseñas."""
+
+    def __init__(self, policy=None):
+        self.policy = policy or PasswordPolicy()
+
+    def hash(self, password):
+        """
+        Calcula el hash de una contraseña.
+
+        Args:
+            password (str): Contraseña en claro
+
+        Returns:
+            str: Hash con el algoritmo y el costo de la política
+
+        Raises:
+            HasherBusyError: Si la cola está llena
+            HasherTimeoutError: Si el hash no terminó a tiempo
+        """
+        return self._timed('hash', _hash, password, self.policy.algorithm, self.policy.params)
+
+    def verify(self, pw_hash, password):
+        """
+        Verifica una contraseña contra su hash.
+
+        Args:
+            pw_hash (str): Hash almacenado
+            password (str): Contraseña en claro
+
+        Returns:
+            bool: True si la contraseña coincide
+
+        Raises:
+            HasherBusyError: Si la cola está llena
+            HasherTimeoutError: Si la verificación no terminó a tiempo
+        """
+        if not pw_hash or password is None:
+            return False
+        return self._timed('verify', verify_password, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True si `pw_hash` está por debajo de la política (no calcula hashes)."""
+        return self.policy.needs_rehash(pw_hash)
+
+    def _timed(self, op, func, *args):
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return self._call(func, *args)
+        except HasherError as e:
+            outcome = 'busy' if isinstance(e, HasherBusyError) else 'timeout'
+            raise
+        finally:
+            if metrics_registry.enabled:
+                metrics_registry.observe(
+                    PASSWORD_METRIC, (('op', op), ('outcome', outcome)), time.perf_counter() - start
+                )
+
+    @abstractmethod
+    def _call(self, func, *args):
+        """Ejecuta `func(*args)` y retorna su resultado."""
+
+    def shutdown(self):
+        """Libera los recursos del servicio."""
+
+
+class InlineHasher(PasswordHasher):
+    """Calcula los hashes en el hilo del request (tests y scripts)."""
+
+    def _call(self, func, *args):
+        return func(*args)
+
+
+class ProcessPoolHasher(PasswordHasher):
+    """
+    Pool de procesos dedicado al hashing. Un pico de logins ocupa como mucho
+    `workers` núcleos y `max_pending` trabajos; el resto recibe HasherBusyError
+    en lugar de bloquear los hilos que sirven páginas y estáticos.
+    """
+
+    def __init__(self, policy=None, workers=None, max_pending=None,
+                 timeout=DEFAULT_TIMEOUT, start_method='spawn'):
+        super().__init__(policy)
+        self.workers = workers or default_workers()
+        self.max_pending = max_pending or 4 * self.workers
+        self.timeout = timeout
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=get_context(start_method),
+        )
+        logger.info(
+            f"Hashing de contraseñas ({self.policy.describe()}): {self.workers} procesos, "
+            f"cola máxima {self.max_pending}, timeout {self.timeout}s"
+        )
+
+    @property
+    def pending(self):
+        """Trabajos encolados o en ejecución."""
+        return self._pending
+
+    def _call(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HasherBusyError("Cola de hashing de contraseñas llena")
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        # El cupo se libera cuando el trabajo termina de verdad, aunque el
+        # request haya abandonado la espera por timeout
+        future.add_done_callback(lambda _: self._release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HasherTimeoutError(f"{func.__name__} superó {self.timeout}s")
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_password_hasher(app_config):
+    """
+    Factory que retorna el servicio de hashing según configuración.
+    Construye (y, si corresponde, calibra) la política de hashing; se llama
+    en el primer hash o verificación del proceso, no al crear la app.
+
+    Args:
+        app_config: Objeto de configuración Flask (current_app.config)
+
+    Returns:
+        PasswordHasher: Servicio configurado
+    """
+    policy = create_password_policy(app_config)
+    if app_config.get('PASSWORD_HASHER', 'inline') == 'process':
+        return ProcessPoolHasher(
+            policy=policy,
+            workers=app_config.get('PASSWORD_HASH_WORKERS') or None,
+            max_pending=app_config.get('PASSWORD_HASH_MAX_PENDING') or None,
+            timeout=app_config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT),
+        )
+    return InlineHasher(policy)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+_inline_hasher = InlineHasher()
+
+
+def get_password_hasher():
+    """
+    Retorna el servicio de hashing del proceso, creándolo en el primer uso.
+    Fuera de un contexto de aplicación (scripts, tests) se ejecuta en línea.
+    """
+    global _hasher
+    if not has_app_context():
+        return _inline_hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = create_password_hasher(current_app.config)
+    return _hasher
+
+
+def hash_password(password):
+    """Atajo: hash de `password` con el servicio del proceso."""
+    return get_password_hasher().hash(password)
+
+
+def check_password(pw_hash, password):
+    """Atajo: verifica `password` contra `pw_hash` con el servicio del proceso."""
+    return get_password_hasher().verify(pw_hash, password)
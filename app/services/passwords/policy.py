@@ -0,0 +1,359 @@
+"""
+Política de hashing de contraseñas.
+Responsabilidades:
+  - Algoritmos intercambiables identificados por el prefijo del hash:
+    bcrypt ($2b$), scrypt ($scrypt$, hashlib) y argon2id ($argon2id$, opcional)
+  - Calibrar el costo que cumple la latencia objetivo en el hardware actual,
+    sin bajar nunca del mínimo de seguridad del algoritmo (una vez, con
+    calibrate_passwords.py, para fijarlo en PASSWORD_HASH_COST)
+  - Detectar los hashes por debajo de la política para recalcularlos
+
+Los hashes guardan sus propios parámetros, así que la verificación no depende
+de la política vigente: un cambio de algoritmo o de costo solo afecta a los
+hashes nuevos y a los que se recalculan tras un login correcto.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+import bcrypt
+
+from app.logging_config import get_logger
+
+logger = get_logger('passwords.policy')
+
+CALIBRATION_PASSWORD = 'calibracion-Politica-1!'
+DEFAULT_MEMORY_KIB = 65536
+
+
+class HashAlgorithm(ABC):
+    """
+    Algoritmo de hashing con un parámetro de costo entero calibrable.
+    `min_cost` es el piso de seguridad: la calibración nunca baja de él.
+    """
+
+    name = ''
+    prefixes = ()
+    cost_param = ''
+    default_cost = 0
+    min_cost = 0
+    max_cost = 0
+
+    def identify(self, pw_hash):
+        return pw_hash.startswith(self.prefixes)
+
+    @abstractmethod
+    def params(self, cost, memory_kib=DEFAULT_MEMORY_KIB):
+        """Parámetros completos del algoritmo para un costo dado."""
+
+    @abstractmethod
+    def hash(self, password, params):
+        """Calcula el hash de `password` con `params`."""
+
+    @abstractmethod
+    def verify(self, pw_hash, password):
+        """Retorna True si `password` coincide con `pw_hash`."""
+
+    @abstractmethod
+    def params_of(self, pw_hash):
+        """Parámetros con los que se calculó `pw_hash`."""
+
+    def max_cost_for(self, memory_kib):
+        """Costo máximo que respeta el límite de memoria."""
+        return self.max_cost
+
+    def growth(self, cost):
+        """Factor en que crece la duración al subir el costo en uno."""
+        return 2.0
+
+    def needs_rehash(self, pw_hash, params):
+        """True si algún parámetro de `pw_hash` está por debajo de `params`."""
+        current = self.params_of(pw_hash)
+        return any(current.get(key, 0) < value for key, value in params.items())
+
+
+class BcryptAlgorithm(HashAlgorithm):
+    """bcrypt: el costo es log2 de las iteraciones."""
+
+    name = 'bcrypt'
+    prefixes = ('$2a$', '$2b$', '$2y$')
+    cost_param = 'rounds'
+    default_cost = 12
+    min_cost = 10
+    max_cost = 16
+
+    def params(self, cost, memory_kib=DEFAULT_MEMORY_KIB):
+        return {'rounds': cost}
+
+    def hash(self, password, params):
+        salt = bcrypt.gensalt(params['rounds'])
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, pw_hash, password):
+        return bcrypt.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+
+    def params_of(self, pw_hash):
+        return {'rounds': int(pw_hash.split('$')[2])}
+
+
+class ScryptAlgorithm(HashAlgorithm):
+    """
+    scrypt de hashlib. El costo es log2(N); la memoria usada es 128·r·N bytes,
+    por lo que el límite de memoria acota el costo máximo.
+    Formato: $scrypt$ln=<log2 N>,r=<r>,p=<p>$<sal b64>$<hash b64>
+    """
+
+    name = 'scrypt'
+    prefixes = ('$scrypt$',)
+    cost_param = 'ln'
+    default_cost = 15
+    min_cost = 14
+    max_cost = 22
+    block_size = 8
+    parallelism = 1
+    key_length = 32
+
+    def params(self, cost, memory_kib=DEFAULT_MEMORY_KIB):
+        return {'ln': cost, 'r': self.block_size, 'p': self.parallelism}
+
+    def max_cost_for(self, memory_kib):
+        cost = self.min_cost
+        while cost < self.max_cost and 128 * self.block_size * (2 ** (cost + 1)) <= memory_kib * 1024:
+            cost += 1
+        return cost
+
+    def hash(self, password, params):
+        salt = os.urandom(16)
+        digest = self._derive(password, salt, params)
+        settings = f"ln={params['ln']},r={params['r']},p={params['p']}"
+        return f"$scrypt${settings}${_b64(salt)}${_b64(digest)}"
+
+    def verify(self, pw_hash, password):
+        _, _, settings, salt, digest = pw_hash.split('$')
+        params = _parse_settings(settings)
+        expected = _unb64(digest)
+        return hmac.compare_digest(self._derive(password, _unb64(salt), params, len(expected)), expected)
+
+    def params_of(self, pw_hash):
+        return _parse_settings(pw_hash.split('$')[2])
+
+    def _derive(self, password, salt, params, length=None):
+        n, r, p = 2 ** params['ln'], params['r'], params['p']
+        return hashlib.scrypt(
+            password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+            # Margen sobre 128·r·N para que OpenSSL no rechace el costo
+            maxmem=2 * 128 * r * (n + p) + (1 << 20),
+            dklen=length or self.key_length,
+        )
+
+
+class Argon2Algorithm(HashAlgorithm):
+    """
+    argon2id (paquete opcional argon2-cffi, importado en el primer uso).
+    El costo es el número de pasadas (t); la memoria (m, en KiB) es fija.
+    """
+
+    name = 'argon2id'
+    prefixes = ('$argon2id$',)
+    cost_param = 't'
+    default_cost = 3
+    min_cost = 2
+    max_cost = 10
+    parallelism = 1
+
+    def params(self, cost, memory_kib=DEFAULT_MEMORY_KIB):
+        # Una política argon2id sin el paquete instalado falla al construirse
+        _import_argon2()
+        return {'t': cost, 'm': memory_kib, 'p': self.parallelism}
+
+    def growth(self, cost):
+        return (cost + 1) / cost
+
+    def hash(self, password, params):
+        argon2 = _import_argon2()
+        hasher = argon2.PasswordHasher(
+            time_cost=params['t'], memory_cost=params['m'], parallelism=params['p'],
+            type=argon2.Type.ID,
+        )
+        return hasher.hash(password)
+
+    def verify(self, pw_hash, password):
+        argon2 = _import_argon2()
+        try:
+            return argon2.PasswordHasher().verify(pw_hash, password)
+        except argon2.exceptions.VerificationError:
+            return False
+        except argon2.exceptions.InvalidHashError as e:
+            raise ValueError(str(e))
+
+    def params_of(self, pw_hash):
+        # $argon2id$v=19$m=65536,t=3,p=1$<sal>$<hash>
+        return _parse_settings(pw_hash.split('$')[3])
+
+
+def _import_argon2():
+    try:
+        import argon2
+    except ImportError:
+        raise RuntimeError("argon2id requiere el paquete argon2-cffi (pip install argon2-cffi)")
+    return argon2
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _parse_settings(settings):
+    return {key: int(value) for key, value in (item.split('=') for item in settings.split(','))}
+
+
+ALGORITHMS = {
+    algorithm.name: algorithm
+    for algorithm in (BcryptAlgorithm(), ScryptAlgorithm(), Argon2Algorithm())
+}
+
+
+def get_algorithm(name):
+    """
+    Retorna el algoritmo registrado con `name`.
+
+    Raises:
+        ValueError: Si el algoritmo no existe
+    """
+    try:
+        return ALGORITHMS[name]
+    except KeyError:
+        raise ValueError(f"Algoritmo de hashing desconocido: {name}")
+
+
+def identify(pw_hash):
+    """Retorna el algoritmo de un hash según su prefijo, o None si no se reconoce."""
+    for algorithm in ALGORITHMS.values():
+        if algorithm.identify(pw_hash):
+            return algorithm
+    return None
+
+
+def verify_password(pw_hash, password):
+    """
+    Verifica `password` contra un hash de cualquier algoritmo registrado.
+
+    Returns:
+        bool: True si coincide; False si no coincide o el hash no es válido
+    """
+    algorithm = identify(pw_hash)
+    if algorithm is None:
+        return False
+    try:
+        return algorithm.verify(pw_hash, password)
+    except (ValueError, IndexError):
+        # Hash corrupto o con formato desconocido
+        return False
+    except RuntimeError as e:
+        logger.error(f"No se puede verificar un hash {algorithm.name}: {e}")
+        return False
+
+
+@dataclass(frozen=True)
+class PasswordPolicy:
+    """Algoritmo y parámetros con los que se calculan los hashes nuevos."""
+    algorithm: str = 'bcrypt'
+    params: dict = field(default_factory=lambda: {'rounds': BcryptAlgorithm.default_cost})
+
+    def hash(self, password):
+        return get_algorithm(self.algorithm).hash(password, self.params)
+
+    def needs_rehash(self, pw_hash):
+        """
+        True si `pw_hash` usa otro algoritmo o un costo menor que la política.
+        Los hashes no reconocidos no se tocan (no se sabe recalcularlos).
+        """
+        algorithm = identify(pw_hash or '')
+        if algorithm is None:
+            return False
+        if algorithm.name != self.algorithm:
+            return True
+        try:
+            return algorithm.needs_rehash(pw_hash, self.params)
+        except (ValueError, IndexError):
+            return False
+
+    def describe(self):
+        settings = ','.join(f"{key}={value}" for key, value in self.params.items())
+        return f"{self.algorithm}({settings})"
+
+
+def calibrate(algorithm, target_seconds, memory_kib=DEFAULT_MEMORY_KIB, clock=time.perf_counter):
+    """
+    Busca el mayor costo cuya duración medida no supera `target_seconds`.
+    Sube el costo mientras la duración estimada del siguiente paso quepa en
+    el objetivo, así que la calibración tarda del orden de dos objetivos.
+
+    Args:
+        algorithm (HashAlgorithm): Algoritmo a calibrar
+        target_seconds (float): Latencia objetivo por hash
+        memory_kib (int): Memoria máxima por hash (algoritmos memory-hard)
+        clock (callable): Reloj en segundos (inyectable en tests)
+
+    Returns:
+        tuple: (costo elegido, segundos medidos con ese costo)
+    """
+    cost = algorithm.min_cost
+    max_cost = algorithm.max_cost_for(memory_kib)
+    elapsed = _measure(algorithm, cost, memory_kib, clock)
+
+    while cost < max_cost and elapsed * algorithm.growth(cost) <= target_seconds:
+        cost += 1
+        elapsed = _measure(algorithm, cost, memory_kib, clock)
+
+    if elapsed > target_seconds and cost == algorithm.min_cost:
+        logger.warning(
+            f"{algorithm.name}: el costo mínimo {cost} tarda {elapsed * 1000:.0f} ms, "
+            f"por encima del objetivo de {target_seconds * 1000:.0f} ms"
+        )
+    return cost, elapsed
+
+
+def _measure(algorithm, cost, memory_kib, clock):
+    params = algorithm.params(cost, memory_kib)
+    start = clock()
+    algorithm.hash(CALIBRATION_PASSWORD, params)
+    return clock() - start
+
+
+def create_password_policy(app_config):
+    """
+    Construye la política según configuración. Un PASSWORD_HASH_COST fijo
+    tiene prioridad; si no lo hay y PASSWORD_HASH_TARGET_MS > 0 el costo se
+    calibra en este proceso; si no, se usa BCRYPT_LOG_ROUNDS (bcrypt) o el
+    default del algoritmo.
+
+    Args:
+        app_config: Objeto de configuración Flask (current_app.config)
+
+    Returns:
+        PasswordPolicy: Política vigente del proceso
+    """
+    algorithm = get_algorithm(app_config.get('PASSWORD_HASH_ALGORITHM', 'bcrypt'))
+    memory_kib = app_config.get('PASSWORD_HASH_MEMORY_KIB') or DEFAULT_MEMORY_KIB
+    cost = app_config.get('PASSWORD_HASH_COST') or 0
+    target_ms = app_config.get('PASSWORD_HASH_TARGET_MS', 0)
+
+    if not cost and target_ms:
+        cost, elapsed = calibrate(algorithm, target_ms / 1000.0, memory_kib)
+        policy = PasswordPolicy(algorithm.name, algorithm.params(cost, memory_kib))
+        logger.info(f"Política de contraseñas calibrada: {policy.describe()} ({elapsed * 1000:.0f} ms por hash)")
+        return policy
+
+    if not cost and algorithm.name == 'bcrypt':
+        cost = app_config.get('BCRYPT_LOG_ROUNDS') or 0
+    return PasswordPolicy(algorithm.name, algorithm.params(cost or algorithm.default_cost, memory_kib))
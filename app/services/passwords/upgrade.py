@@ -0,0 +1,137 @@
+"""
+Actualización transparente de hashes de contraseñas.
+Tras un login correcto, si el hash guardado está por debajo de la política
+(otro algoritmo o menor costo) se recalcula en segundo plano con la
+contraseña recién verificada, sin alargar la respuesta del login.
+
+Incluye la migración de esquema que amplía user.password para los hashes
+scrypt y argon2id (migrate_passwords.py).
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from app import db
+from app.logging_config import get_logger
+from app.models import User
+from app.services.passwords.hasher import HasherError, get_password_hasher
+
+logger = get_logger('passwords.upgrade')
+
+# Actualizaciones en espera; las que no entren se reintentan en el próximo login
+MAX_PENDING_UPGRADES = 64
+
+# Longitud de user.password: los hashes scrypt/argon2id superan los 60 de bcrypt
+PASSWORD_COLUMN_LENGTH = 255
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='password-upgrade')
+_pending = 0
+_lock = threading.Lock()
+
+
+def schedule_rehash(user, password):
+    """
+    Programa el recálculo del hash de `user` si está por debajo de la política.
+
+    Args:
+        user (User): Usuario cuya contraseña acaba de verificarse
+        password (str): Contraseña en claro verificada
+
+    Returns:
+        Future: Trabajo programado, o None si no hace falta (o la cola está llena)
+    """
+    global _pending
+    hasher = get_password_hasher()
+    if not hasher.needs_rehash(user.password):
+        return None
+
+    with _lock:
+        if _pending >= MAX_PENDING_UPGRADES:
+            return None
+        _pending += 1
+
+    app = current_app._get_current_object()
+    future = _executor.submit(rehash_password, app, hasher, user.id, user.password, password)
+    future.add_done_callback(_release)
+    return future
+
+
+def _release(_):
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def rehash_password(app, hasher, user_id, old_hash, password):
+    """
+    Recalcula el hash y lo guarda solo si la fila conserva `old_hash`, para no
+    pisar un cambio de contraseña concurrente.
+
+    Returns:
+        bool: True si el hash se actualizó
+    """
+    try:
+        new_hash = hasher.hash(password)
+    except HasherError as e:
+        logger.warning(f"Recálculo del hash del usuario {user_id} pospuesto: {e}")
+        return False
+
+    with app.app_context():
+        try:
+            updated = (
+                User.query.filter_by(id=user_id, password=old_hash)
+                .update({'password': new_hash}, synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error actualizando el hash del usuario {user_id}: {e}", exc_info=True)
+            return False
+
+    if updated:
+        logger.info(f"Hash del usuario {user_id} actualizado a {hasher.policy.describe()}")
+    return bool(updated)
+
+
+def widen_password_column():
+    """
+    Amplía user.password a VARCHAR(255) en bases creadas con el esquema
+    anterior (VARCHAR(60), solo bcrypt). Es idempotente y debe correr antes de
+    activar scrypt o argon2id. SQLite no aplica longitudes: no hay nada que hacer.
+
+    Returns:
+        bool: True si se alteró la columna
+
+    Raises:
+        RuntimeError: Si el motor de base de datos no está soportado
+    """
+    engine = db.engine
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        return False
+
+    table = User.__table__.name
+    column = next(c for c in inspect(engine).get_columns(table) if c['name'] == 'password')
+    length = getattr(column['type'], 'length', None)
+    if length is None or length >= PASSWORD_COLUMN_LENGTH:
+        return False
+
+    quoted = engine.dialect.identifier_preparer.quote(table)
+    if dialect == 'postgresql':
+        ddl = f"ALTER TABLE {quoted} ALTER COLUMN password TYPE VARCHAR({PASSWORD_COLUMN_LENGTH})"
+    elif dialect in ('mysql', 'mariadb'):
+        ddl = f"ALTER TABLE {quoted} MODIFY password VARCHAR({PASSWORD_COLUMN_LENGTH}) NOT NULL"
+    else:
+        raise RuntimeError(f"Ampliación de user.password no soportada en {dialect}")
+
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(ddl))
+    except Exception as e:
+        logger.error(f"Error ampliando user.password: {e}", exc_info=True)
+        raise
+    logger.info(f"user.password ampliada de VARCHAR({length}) a VARCHAR({PASSWORD_COLUMN_LENGTH})")
+    return True
@@ -1,14 +1,23 @@
-export function finalizeEnrollment({ video, canvas, config, scanLine, instructionText }) {
+import { toJpegBlob } from './poseLoop.js';
+
+export function finalizeEnrollment({ video, canvas, config, scanLine, instructionText, poseFrames = [], poseSession = null }) {
     instructionText.innerText = 'GUARDANDO BIOMETRÍA...';
 
     const context = canvas.getContext('2d');
     context.drawImage(video, 0, 0);
-    const dataURL = canvas.toDataURL('image/jpeg', 0.9);
 
-    fetch(config.enrollUrl, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': config.csrfToken },
-        body: JSON.stringify({ image: dataURL })
+    // multipart: frame final + frames de pose como archivos JPEG
+    toJpegBlob(canvas, 0.9)
+    .then(blob => {
+        const form = new FormData();
+        form.append('image', blob, 'frame.jpg');
+        if (poseSession) form.append('pose_session', poseSession);
+        poseFrames.forEach(({ pose, image }) => form.append(`pose_frame_${pose}`, image, `${pose}.jpg`));
+        return fetch(config.enrollUrl, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': config.csrfToken },
+            body: form
+        });
     })
     .then(r => r.json())
     .then(data => {
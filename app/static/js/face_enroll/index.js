@@ -1,4 +1,4 @@
-import { runPoseChallenge } from './poseLoop.js';
+import { runPoseChallenge, startPoseSession } from './poseLoop.js';
 import { finalizeEnrollment } from './enrollRequest.js';
 import { getConfig } from './config.js';
 
@@ -15,6 +15,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     const CONFIG = getConfig();
     let challengeStep = 0;
+    let poseSession = null;
+    const poseFrames = [];
 
     const securityIcons = [
         { id: 'shield', char: '🛡️', valid: true },
@@ -66,19 +68,33 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    function startChallenge() {
+        challengeStep = 0;
+        poseFrames.length = 0;
+        startPoseSession(CONFIG)
+            .catch(() => null)  // Sin sesión el servidor usa detección completa
+            .then(session => {
+                poseSession = session;
+                runPoseChallenge({
+                    challengeStepRef: () => challengeStep,
+                    advanceStep: () => { challengeStep += 1; },
+                    canvas,
+                    video,
+                    instructionText,
+                    config: CONFIG,
+                    session,
+                    onComplete: () => finalizeEnrollment({ video, canvas, config: CONFIG, scanLine, instructionText, poseFrames, poseSession }),
+                    onRestart: () => setTimeout(startChallenge, 1500),
+                    onPoseCaptured: frame => poseFrames.push(frame)
+                });
+            });
+    }
+
     captureBtn.addEventListener('click', () => {
         if(challengeStep === 0) {
             captureBtn.disabled = true;
             scanLine.style.display = 'block';
-            runPoseChallenge({
-                challengeStepRef: () => challengeStep,
-                advanceStep: () => { challengeStep += 1; },
-                canvas,
-                video,
-                instructionText,
-                config: CONFIG,
-                onComplete: () => finalizeEnrollment({ video, canvas, config: CONFIG, scanLine, instructionText })
-            });
+            startChallenge();
         }
     });
 
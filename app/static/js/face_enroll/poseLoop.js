@@ -1,4 +1,6 @@
 const SEQUENCE = ['CENTER', 'LEFT', 'RIGHT', 'UP', 'CENTER'];
+// Poses cuyos frames válidos se envían como plantillas adicionales
+const TEMPLATE_POSES = ['LEFT', 'RIGHT'];
 const MESSAGES = {
     'CENTER': 'MIRA AL FRENTE',
     'LEFT': 'GIRA LENTAMENTE A LA IZQUIERDA ⬅️',
@@ -6,6 +8,23 @@ const MESSAGES = {
     'UP': 'MIRA HACIA EL TECHO ⬆️'
 };
 
+export function toJpegBlob(canvas, quality) {
+    return new Promise((resolve, reject) => {
+        canvas.toBlob(blob => (blob ? resolve(blob) : reject(new Error('No se pudo capturar el frame'))), 'image/jpeg', quality);
+    });
+}
+
+// Sesión de seguimiento: el servidor busca el rostro alrededor de su última
+// posición y verifica que todos los frames sean del mismo rostro continuo
+export function startPoseSession(config) {
+    return fetch('/check-pose/session', {
+        method: 'POST',
+        headers: { 'X-CSRFToken': config.csrfToken }
+    })
+        .then(r => r.json())
+        .then(data => data.session);
+}
+
 export function runPoseChallenge({
     challengeStepRef,
     advanceStep,
@@ -13,8 +32,15 @@ export function runPoseChallenge({
     video,
     instructionText,
     config,
+    session,
     onComplete,
+    onRestart = () => {},
+    onPoseCaptured = () => {},
 }) {
+    const next = delay => setTimeout(() => runPoseChallenge({
+        challengeStepRef, advanceStep, canvas, video, instructionText, config, session, onComplete, onRestart, onPoseCaptured
+    }), delay);
+
     const step = challengeStepRef();
     if (step >= SEQUENCE.length) {
         onComplete();
@@ -29,28 +55,34 @@ export function runPoseChallenge({
     canvas.width = video.videoWidth;
     canvas.height = video.videoHeight;
     context.drawImage(video, 0, 0);
-    const dataURL = canvas.toDataURL('image/jpeg', 0.8);
-
-    fetch('/check-pose', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': config.csrfToken },
-        body: JSON.stringify({ image: dataURL, pose: currentPose })
-    })
-        .then(r => r.json())
-        .then(data => {
+    // JPEG binario (sin Base64 ni JSON); la pose viaja en la query string
+    toJpegBlob(canvas, 0.8)
+        .then(blob => fetch(`/check-pose?pose=${encodeURIComponent(currentPose)}&session=${encodeURIComponent(session || '')}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'image/jpeg', 'X-CSRFToken': config.csrfToken },
+            body: blob
+        }).then(r => r.json().then(data => ({ data, blob, retryAfter: Number(r.headers.get('Retry-After')) || 0 }))))
+        .then(({ data, blob, retryAfter }) => {
             if (data.valid) {
+                if (TEMPLATE_POSES.includes(currentPose)) onPoseCaptured({ pose: currentPose, image: blob });
                 instructionText.innerText = '✅ CORRECTO';
                 instructionText.style.color = 'green';
                 advanceStep();
-                setTimeout(() => runPoseChallenge({ challengeStepRef, advanceStep, canvas, video, instructionText, config, onComplete }), 1000);
+                next(1000);
+            } else if (data.restart) {
+                // El servidor perdió la continuidad del rostro: el desafío empieza de nuevo
+                instructionText.innerText = `⚠️ ${data.message}`;
+                instructionText.style.color = '#d32f2f';
+                onRestart();
             } else {
                 instructionText.innerText = `⚠️ ${data.message}`;
                 instructionText.style.color = '#d32f2f';
-                setTimeout(() => runPoseChallenge({ challengeStepRef, advanceStep, canvas, video, instructionText, config, onComplete }), 500);
+                // 503 con Retry-After: el servidor está descartando carga
+                next(retryAfter ? retryAfter * 1000 : 500);
             }
         })
         .catch(err => {
             console.error(err);
-            setTimeout(() => runPoseChallenge({ challengeStepRef, advanceStep, canvas, video, instructionText, config, onComplete }), 1000);
+            next(1000);
         });
 }
@@ -1,11 +1,14 @@
-export async function sendLogin(imageData, csrfToken) {
-    const res = await fetch('/face-login', {
+export async function sendLogin(imageBlob, csrfToken, username) {
+    // JPEG binario; la identidad declarada (verificación 1:1) va en la query string
+    const query = username ? `?username=${encodeURIComponent(username)}` : '';
+
+    const res = await fetch(`/face-login${query}`, {
         method: 'POST',
         headers: {
-            'Content-Type': 'application/json',
+            'Content-Type': 'image/jpeg',
             'X-CSRFToken': csrfToken
         },
-        body: JSON.stringify({ image: imageData })
+        body: imageBlob
     });
     const payload = await res.json();
     payload.httpStatus = res.status;
@@ -10,6 +10,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const layer = document.getElementById('security-layer');
     const loginBtn = document.getElementById('btn-login');
     const scanFx = document.getElementById('scan-fx');
+    const usernameInput = document.getElementById('claimed-username');
 
     const CONFIG = getConfig();
 
@@ -23,7 +24,8 @@ document.addEventListener('DOMContentLoaded', () => {
             captureLogin({
                 videoEl,
                 statusEl,
-                csrfToken: CONFIG.csrfToken
+                csrfToken: CONFIG.csrfToken,
+                username: usernameInput ? usernameInput.value.trim() : ''
             });
         });
     }
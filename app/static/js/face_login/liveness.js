@@ -1,7 +1,7 @@
 import { getStream } from './hardware.js';
 import { sendLogin } from './apiClient.js';
 
-export async function captureLogin({ videoEl, statusEl, csrfToken }) {
+export async function captureLogin({ videoEl, statusEl, csrfToken, username }) {
     const streamReference = getStream();
     if (!videoEl || !statusEl) return;
 
@@ -15,11 +15,11 @@ export async function captureLogin({ videoEl, statusEl, csrfToken }) {
     canvas.height = videoEl.videoHeight;
     canvas.getContext('2d').drawImage(videoEl, 0, 0);
 
-    const imageData = canvas.toDataURL('image/jpeg');
     statusEl.innerText = 'ANALIZANDO BIOMETRÍA...';
 
     try {
-        const data = await sendLogin(imageData, csrfToken);
+        const imageBlob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.92));
+        const data = await sendLogin(imageBlob, csrfToken, username);
         if (data.status === 'success') {
             statusEl.innerText = 'IDENTIDAD CONFIRMADA.';
             statusEl.style.color = '#00ff00';
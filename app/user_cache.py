@@ -0,0 +1,114 @@
+"""
+Caché del usuario autenticado para `login_manager.user_loader`.
+
+Dos niveles:
+  - Por request (flask.g): el mismo id se resuelve una sola vez por request
+  - Entre requests: LRU acotado con TTL de las columnas del usuario, del que
+    se reconstruye la instancia sin consultar la BD
+
+Solo se guardan columnas escalares, nunca instancias ORM (están ligadas a la
+sesión de su request), y nunca las que deciden el acceso (contraseña, 2FA,
+confirmación): esas se leen de la BD cuando se usan. Las escrituras ORM sobre
+User invalidan la entrada en este proceso al confirmarse la transacción; el
+TTL (pocos segundos) acota lo que otro proceso puede servir desactualizado.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context
+
+DEFAULT_SIZE = 1024
+DEFAULT_TTL = 5.0
+
+
+class UserCache:
+    """LRU de filas de usuario (dict de columnas) con expiración por TTL."""
+
+    def __init__(self, max_size=DEFAULT_SIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """
+        Retorna las columnas cacheadas del usuario.
+
+        Args:
+            user_id (int): Id del usuario
+
+        Returns:
+            dict: Columnas del usuario, o None si no está o expiró
+        """
+        with self._lock:
+            entry = self._rows.get(user_id)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._rows[user_id]
+                self.misses += 1
+                return None
+            self._rows.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, row):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._rows[user_id] = (self._clock() + self.ttl, row)
+            self._rows.move_to_end(user_id)
+            while len(self._rows) > self.max_size:
+                self._rows.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """Olvida un usuario (o todos si `user_id` es None)."""
+        with self._lock:
+            if user_id is None:
+                self._rows.clear()
+            else:
+                self._rows.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+def get_user_cache():
+    """
+    Retorna la caché de la app actual, creándola en el primer uso
+    (USER_CACHE_SIZE, USER_CACHE_TTL). Cada app tiene la suya.
+    """
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('user_cache', UserCache(
+            max_size=current_app.config.get('USER_CACHE_SIZE', DEFAULT_SIZE),
+            ttl=current_app.config.get('USER_CACHE_TTL', DEFAULT_TTL),
+        ))
+    return cache
+
+
+def request_users():
+    """Usuarios ya resueltos en este request (id -> instancia)."""
+    users = g.get('_cached_users')
+    if users is None:
+        users = g._cached_users = {}
+    return users
+
+
+def invalidate_user(user_id=None):
+    """Invalida un usuario en la caché de la app y del request actuales."""
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get('user_cache')
+    if cache is not None:
+        cache.invalidate(user_id)
+    users = g.get('_cached_users')
+    if users:
+        if user_id is None:
+            users.clear()
+        else:
+            users.pop(user_id, None)
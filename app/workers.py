@@ -0,0 +1,24 @@
+"""
+Dimensionamiento de los pools de procesos de la aplicación.
+Cada worker web (gunicorn) crea sus propios pools (motor biométrico, hashing
+de contraseñas), así que un proceso por núcleo en cada uno sobresuscribiría
+CPU y memoria tantas veces como workers web haya.
+"""
+
+import os
+
+
+def default_workers(web_workers=None):
+    """
+    Procesos por defecto de un pool: los núcleos repartidos entre los workers
+    web (WEB_CONCURRENCY de gunicorn).
+
+    Args:
+        web_workers (int): Workers web del servidor (default: WEB_CONCURRENCY o 1)
+
+    Returns:
+        int: Procesos del pool (al menos 1)
+    """
+    if not web_workers:
+        web_workers = int(os.getenv('WEB_CONCURRENCY') or 1)
+    return max(1, (os.cpu_count() or 1) // max(1, web_workers))
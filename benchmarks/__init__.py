@@ -0,0 +1 @@
+"""Benchmarks reproducibles (offline) de los caminos críticos de la aplicación."""
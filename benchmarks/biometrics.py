@@ -0,0 +1,357 @@
+"""
+Benchmark del camino crítico biométrico con frames sintéticos.
+
+Mide por separado y de punta a punta las etapas decode, detect, landmarks,
+encode y match, sobre frames fijos a varias resoluciones y calidades JPEG,
+y la búsqueda 1:N con galerías sintéticas de 10 a 1M encodings. Funciona sin
+red: los frames se generan con una semilla fija (o se leen de --frames-dir).
+
+Uso:
+    python -m benchmarks.biometrics --out resultados.json
+    python -m benchmarks.biometrics --quick --out actual.json --compare base.json
+
+Con --compare se reporta la razón p50 actual/base por métrica y el comando
+termina con código 1 si alguna supera --max-regression.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.services.biometrics import encoders, model_registry, pose_checks
+from app.services.biometrics.ann_index import IVFIndex
+from app.services.biometrics.gallery import ENCODING_DIM, FaceGallery
+
+DEFAULT_RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080))
+DEFAULT_QUALITIES = (70, 85, 95)
+DEFAULT_GALLERY_SIZES = (10, 1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_SEED = 1234
+
+# Fracción del ancho del frame que ocupa el rostro sintético
+_FACE_RATIO = 0.35
+# Distancia típica entre encodings de personas distintas (escala de los sintéticos)
+_ENCODING_SCALE = 0.6 / np.sqrt(ENCODING_DIM)
+
+
+def synthetic_face_frame(width, height, seed=DEFAULT_SEED):
+    """
+    Dibuja un rostro esquemático sobre un fondo texturizado (determinista).
+
+    Returns:
+        ndarray: Imagen BGR (height, width, 3)
+    """
+    rng = np.random.default_rng(seed + width * 7 + height)
+    image = rng.integers(60, 120, size=(height, width, 3), dtype=np.uint8)
+    image = cv2.GaussianBlur(image, (0, 0), 3)
+
+    cx, cy = width // 2, height // 2
+    face_w = int(width * _FACE_RATIO)
+    face_h = int(face_w * 1.3)
+    skin = (140, 170, 210)
+    cv2.ellipse(image, (cx, cy), (face_w // 2, face_h // 2), 0, 0, 360, skin, -1)
+    eye_dy, eye_dx = face_h // 8, face_w // 5
+    for side in (-1, 1):
+        cv2.ellipse(image, (cx + side * eye_dx, cy - eye_dy), (face_w // 10, face_w // 22), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(image, (cx + side * eye_dx, cy - eye_dy), face_w // 28, (40, 30, 20), -1)
+        cv2.line(image, (cx + side * eye_dx - face_w // 9, cy - eye_dy - face_w // 8),
+                 (cx + side * eye_dx + face_w // 9, cy - eye_dy - face_w // 8), (40, 40, 60), max(2, face_w // 40))
+    nose = np.array([[cx, cy - face_h // 16], [cx - face_w // 14, cy + face_h // 10], [cx + face_w // 14, cy + face_h // 10]])
+    cv2.fillPoly(image, [nose], (110, 140, 180))
+    cv2.ellipse(image, (cx, cy + face_h // 4), (face_w // 6, face_h // 20), 0, 0, 180, (60, 60, 150), max(2, face_w // 50))
+    return image
+
+
+def encode_jpeg(image, quality):
+    ok, buf = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("No se pudo codificar el frame a JPEG")
+    return buf.tobytes()
+
+
+def load_frames(frames_dir, resolutions, qualities, seed):
+    """
+    Retorna las combinaciones (etiqueta, resolución, calidad, bytes JPEG).
+    Con `frames_dir` se usan las imágenes del directorio (re-escaladas).
+    """
+    sources = []
+    if frames_dir:
+        for path in sorted(Path(frames_dir).iterdir()):
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is not None:
+                sources.append((path.stem, image))
+        if not sources:
+            raise SystemExit(f"No hay imágenes legibles en {frames_dir}")
+
+    frames = []
+    for width, height in resolutions:
+        if sources:
+            images = [(name, cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)) for name, img in sources]
+        else:
+            images = [('synthetic', synthetic_face_frame(width, height, seed))]
+        for name, image in images:
+            for quality in qualities:
+                frames.append((name, (width, height), quality, encode_jpeg(image, quality)))
+    return frames
+
+
+def summarize(samples):
+    """Resumen de latencias (ms) y throughput (ops/s) de una lista de segundos."""
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    mean = float(values.mean())
+    return {
+        'n': int(values.size),
+        'mean_ms': mean * 1e3,
+        'p50_ms': float(p50) * 1e3,
+        'p95_ms': float(p95) * 1e3,
+        'p99_ms': float(p99) * 1e3,
+        'throughput_per_s': 1.0 / mean if mean > 0 else None,
+    }
+
+
+def _time(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _default_box(width, height):
+    """Caja (top, right, bottom, left) del rostro sintético cuando HOG no lo detecta."""
+    face_w = int(width * _FACE_RATIO)
+    face_h = int(face_w * 1.3)
+    cx, cy = width // 2, height // 2
+    return (cy - face_h // 2, cx + face_w // 2, cy + face_h // 2, cx - face_w // 2)
+
+
+def ensure_landmark_model():
+    """
+    Carga el predictor de 68 puntos (el que distribuye face_recognition_models,
+    compartido con face_recognition) para medir la etapa de landmarks.
+
+    Returns:
+        bool: True si hay predictor disponible
+    """
+    has_predictor = model_registry.get_landmark_predictor() is not None
+    if not has_predictor:
+        print("  sin predictor de landmarks: face_recognition no disponible", file=sys.stderr)
+    return has_predictor
+
+
+def synthetic_gallery(size, seed, index=None):
+    """Galería con `size` encodings aleatorios y una consulta cercana al primero."""
+    rng = np.random.default_rng(seed + size)
+    encodings = rng.normal(0.0, _ENCODING_SCALE, size=(size, ENCODING_DIM)).astype(np.float32)
+    gallery = FaceGallery(index=index)
+    gallery.load_arrays(encodings, np.arange(1, size + 1, dtype=np.int64))
+    query = encodings[0] + rng.normal(0.0, _ENCODING_SCALE / 4, size=ENCODING_DIM).astype(np.float32)
+    return gallery, query
+
+
+def bench_frame(jpeg, resolution, iterations, warmup, gallery, query):
+    """Mide cada etapa y el recorrido completo sobre un frame JPEG."""
+    width, height = resolution
+    ratio = pose_checks.MIN_PROXIMITY_STRUCTURE
+
+    probe = encoders.decode_frame(jpeg)
+    boxes = encoders.detect_faces_in_frame(probe, ratio)
+    box = boxes[0] if boxes else _default_box(width, height)
+    has_predictor = model_registry.get_landmark_predictor() is not None
+
+    def landmarks(frame):
+        return pose_checks.get_face_metrics(frame.gray, box) if has_predictor else None
+
+    def encode(frame):
+        return encoders.encode_faces(frame.rgb, [box])
+
+    def end_to_end():
+        frame = encoders.decode_frame(jpeg)
+        encoders.detect_faces_in_frame(frame, ratio)
+        landmarks(frame)
+        encode(frame)
+        gallery.best_match(query)
+
+    # Las etapas posteriores a decode reciben un frame nuevo por iteración
+    # (las vistas gris/RGB se memorizan por frame)
+    stages = {
+        'decode': _time(lambda: encoders.decode_frame(jpeg), iterations, warmup),
+        'detect': _time(lambda: encoders.detect_faces_in_frame(encoders.decode_frame(jpeg), ratio), iterations, warmup),
+    }
+    decode_p50 = float(np.median(stages['decode']))
+    stages['detect'] = [max(0.0, s - decode_p50) for s in stages['detect']]
+
+    frame = encoders.decode_frame(jpeg)
+    frame.gray, frame.rgb  # noqa: B018  (precalcula las vistas fuera de la medición)
+    if has_predictor:
+        stages['landmarks'] = _time(lambda: landmarks(frame), iterations, warmup)
+    stages['encode'] = _time(lambda: encode(frame), iterations, warmup)
+    stages['match'] = _time(lambda: gallery.best_match(query), iterations, warmup)
+    stages['end_to_end'] = _time(end_to_end, iterations, warmup)
+
+    return {
+        'detected': bool(boxes),
+        'landmarks_model': has_predictor,
+        'stages': {name: summarize(samples) for name, samples in stages.items()},
+    }
+
+
+def bench_match(sizes, index_kinds, iterations, warmup, seed):
+    """Mide la búsqueda 1:N (best_match) para cada tamaño de galería e índice."""
+    results = []
+    for size in sizes:
+        for kind in index_kinds:
+            index = IVFIndex(seed=seed) if kind == 'ivf' else None
+            start = time.perf_counter()
+            gallery, query = synthetic_gallery(size, seed, index=index)
+            build_s = time.perf_counter() - start
+            samples = _time(lambda: gallery.best_match(query), iterations, warmup)
+            user_id, _ = gallery.best_match(query)
+            results.append({
+                'gallery_size': size,
+                'index': kind,
+                'build_s': build_s,
+                'found_expected': user_id == 1,
+                **summarize(samples),
+            })
+            del gallery
+    return results
+
+
+def run(args):
+    ensure_landmark_model()
+    frames = load_frames(args.frames_dir, args.resolutions, args.qualities, args.seed)
+    small_gallery, small_query = synthetic_gallery(min(args.gallery_sizes), args.seed)
+
+    frame_results = []
+    for name, resolution, quality, jpeg in frames:
+        result = bench_frame(jpeg, resolution, args.iterations, args.warmup, small_gallery, small_query)
+        frame_results.append({
+            'frame': name,
+            'resolution': f"{resolution[0]}x{resolution[1]}",
+            'jpeg_quality': quality,
+            'jpeg_bytes': len(jpeg),
+            **result,
+        })
+        print(f"  frame {name} {resolution[0]}x{resolution[1]} q{quality}: "
+              f"e2e p50 {result['stages']['end_to_end']['p50_ms']:.1f} ms", file=sys.stderr)
+
+    match_results = bench_match(args.gallery_sizes, args.index, args.match_iterations, args.warmup, args.seed)
+    for row in match_results:
+        print(f"  match {row['index']} N={row['gallery_size']}: p50 {row['p50_ms']:.3f} ms", file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'seed': args.seed,
+            'iterations': args.iterations,
+            'match_iterations': args.match_iterations,
+        },
+        'frames': frame_results,
+        'match': match_results,
+    }
+
+
+def flatten(results):
+    """Métricas p50 indexadas por una clave estable, para comparar corridas."""
+    flat = {}
+    for row in results.get('frames', []):
+        prefix = f"frame/{row['frame']}/{row['resolution']}/q{row['jpeg_quality']}"
+        for stage, stats in row['stages'].items():
+            flat[f"{prefix}/{stage}"] = stats['p50_ms']
+    for row in results.get('match', []):
+        flat[f"match/{row['index']}/{row['gallery_size']}"] = row['p50_ms']
+    return flat
+
+
+def compare(current, baseline, max_regression):
+    """
+    Compara p50 actual contra una corrida base.
+
+    Returns:
+        list: Tuplas (métrica, base_ms, actual_ms, razón) que superan el umbral
+    """
+    now, base = flatten(current), flatten(baseline)
+    regressions = []
+    for key in sorted(now.keys() & base.keys()):
+        if base[key] > 0:
+            ratio = now[key] / base[key]
+            if ratio > max_regression:
+                regressions.append((key, base[key], now[key], ratio))
+    return regressions
+
+
+def _parse_resolutions(value):
+    return tuple(tuple(int(v) for v in item.lower().split('x')) for item in value.split(','))
+
+
+def _parse_ints(value):
+    return tuple(int(v) for v in value.split(','))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', type=_parse_resolutions, default=DEFAULT_RESOLUTIONS,
+                        help="Lista WxH separada por comas (default: 640x480,1280x720,1920x1080)")
+    parser.add_argument('--qualities', type=_parse_ints, default=DEFAULT_QUALITIES,
+                        help="Calidades JPEG separadas por comas (default: 70,85,95)")
+    parser.add_argument('--gallery-sizes', type=_parse_ints, default=DEFAULT_GALLERY_SIZES,
+                        help="Tamaños de galería separados por comas (default: 10 a 1M)")
+    parser.add_argument('--index', type=lambda v: tuple(v.split(',')), default=('flat',),
+                        help="Índices a medir en match: flat, ivf (default: flat)")
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--match-iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--frames-dir', help="Directorio con imágenes de rostros reales (opcional)")
+    parser.add_argument('--quick', action='store_true',
+                        help="Corrida corta: 640x480, q85, galerías 10 y 10k, 5 iteraciones")
+    parser.add_argument('--out', help="Archivo JSON de salida (default: stdout)")
+    parser.add_argument('--compare', help="JSON de una corrida base para detectar regresiones")
+    parser.add_argument('--max-regression', type=float, default=1.25,
+                        help="Razón p50 actual/base tolerada (default: 1.25)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.quick:
+        args.resolutions = ((640, 480),)
+        args.qualities = (85,)
+        args.gallery_sizes = (10, 10_000)
+        args.iterations = args.match_iterations = 5
+        args.warmup = 1
+
+    results = run(args)
+    payload = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload)
+    else:
+        print(payload)
+
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.max_regression)
+        for key, base, now, ratio in regressions:
+            print(f"REGRESIÓN {key}: {base:.3f} ms -> {now:.3f} ms (x{ratio:.2f})", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
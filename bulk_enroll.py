@@ -0,0 +1,90 @@
+"""
+Enrolamiento biométrico masivo desde un directorio de imágenes.
+
+Estructura aceptada (el nombre identifica al usuario por su username):
+    <directorio>/<username>.jpg            una imagen por usuario
+    <directorio>/<username>/<cualquiera>   varias imágenes (plantillas) por usuario
+
+Uso:
+    python bulk_enroll.py fotos/ --workers 4 --batch-size 200
+"""
+
+import argparse
+import os
+from collections import defaultdict
+
+from app import create_app
+from app.models import User
+from app.services.biometrics.engine import InlineEngine, ProcessPoolEngine
+from app.services.biometrics.pipelines import enroll_images_bulk
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def collect_images(directory):
+    """Retorna {username: [rutas]} según la estructura del directorio."""
+    images = defaultdict(list)
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_dir():
+            for name in sorted(os.listdir(entry.path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    images[entry.name].append(os.path.join(entry.path, name))
+        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            images[os.path.splitext(entry.name)[0]].append(entry.path)
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enrolamiento biométrico masivo")
+    parser.add_argument('directory', help="Directorio con las imágenes")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Procesos de codificación (1 = en este proceso)")
+    parser.add_argument('--batch-size', type=int, default=200,
+                        help="Usuarios por lote (una transacción por lote)")
+    args = parser.parse_args()
+
+    images = collect_images(args.directory)
+    usernames = list(images)
+    print(f"--- {sum(len(paths) for paths in images.values())} imágenes de {len(usernames)} usuarios ---")
+
+    app = create_app()
+    engine = ProcessPoolEngine(workers=args.workers) if args.workers > 1 else InlineEngine()
+    enrolled = skipped = 0
+    unknown = []
+
+    try:
+        with app.app_context():
+            for start in range(0, len(usernames), args.batch_size):
+                chunk = usernames[start:start + args.batch_size]
+                ids = dict(
+                    User.query.with_entities(User.username, User.id)
+                    .filter(User.username.in_(chunk))
+                    .all()
+                )
+                unknown.extend(name for name in chunk if name not in ids)
+
+                user_images = {}
+                for username in chunk:
+                    if username in ids:
+                        user_images[ids[username]] = [_read(path) for path in images[username]]
+
+                done, discarded = enroll_images_bulk(user_images, engine)
+                enrolled += done
+                skipped += discarded
+                print(f"Lote {start // args.batch_size + 1}: {done} usuarios enrolados, "
+                      f"{discarded} imágenes sin un único rostro")
+    finally:
+        engine.shutdown()
+
+    print(f"--- {enrolled} usuarios enrolados, {skipped} imágenes descartadas ---")
+    if unknown:
+        print(f"Usuarios inexistentes ({len(unknown)}): {', '.join(unknown[:20])}")
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+from app import create_app
+from app.services.passwords import calibrate, get_algorithm
+from app.services.passwords.policy import DEFAULT_MEMORY_KIB
+
+# Latencia objetivo si no se configura PASSWORD_HASH_TARGET_MS
+DEFAULT_TARGET_MS = 250
+
+app = create_app()
+
+# Calibra una sola vez en el hardware de producción; el costo resultante se
+# fija en PASSWORD_HASH_COST para no medir en cada proceso
+algorithm = get_algorithm(app.config.get('PASSWORD_HASH_ALGORITHM', 'bcrypt'))
+target_ms = app.config.get('PASSWORD_HASH_TARGET_MS') or DEFAULT_TARGET_MS
+memory_kib = app.config.get('PASSWORD_HASH_MEMORY_KIB') or DEFAULT_MEMORY_KIB
+
+cost, elapsed = calibrate(algorithm, target_ms / 1000.0, memory_kib)
+print(f"--- {algorithm.name}: costo {cost} ({elapsed * 1000:.0f} ms por hash, objetivo {target_ms} ms) ---")
+print(f"PASSWORD_HASH_COST={cost}")
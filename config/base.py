@@ -28,6 +28,54 @@ class BaseConfig:
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
 
+    # Índice de identificación facial 1:N: 'flat' (scan exacto) | 'ivf' (ANN)
+    BIOMETRIC_INDEX = os.getenv("BIOMETRIC_INDEX", "flat")
+    BIOMETRIC_IVF_NLIST = int(os.getenv("BIOMETRIC_IVF_NLIST", 256))      # Más listas = consultas más rápidas
+    BIOMETRIC_IVF_NPROBE = int(os.getenv("BIOMETRIC_IVF_NPROBE", 8))      # Más listas exploradas = mejor recall
+    BIOMETRIC_IVF_MIN_TRAIN_SIZE = int(os.getenv("BIOMETRIC_IVF_MIN_TRAIN_SIZE", 2048))
+    BIOMETRIC_RERANK_K = int(os.getenv("BIOMETRIC_RERANK_K", 8))          # Candidatos re-puntuados con plantillas
+
+    # Detección sobre copia reducida: ancho (px) que conserva el rostro mínimo aceptable
+    BIOMETRIC_DETECT_MIN_FACE_PX = int(os.getenv("BIOMETRIC_DETECT_MIN_FACE_PX", 100))  # 0 = resolución completa
+    BIOMETRIC_POSE_DECODE_REDUCTION = int(os.getenv("BIOMETRIC_POSE_DECODE_REDUCTION", 2))  # 1, 2, 4 u 8
+
+    # Seguimiento del rostro en el desafío de pose (región alrededor de la última caja)
+    BIOMETRIC_TRACK_PADDING = float(os.getenv("BIOMETRIC_TRACK_PADDING", 0.5))        # Fracción del rostro
+    BIOMETRIC_POSE_SESSION_TTL = float(os.getenv("BIOMETRIC_POSE_SESSION_TTL", 120))  # Segundos de inactividad
+
+    # Precargar los modelos biométricos al crear la app (si no, al primer uso)
+    BIOMETRIC_WARM_UP = os.getenv("BIOMETRIC_WARM_UP", "False") == "True"
+
+    # Motor biométrico: 'inline' (hilo del request) | 'process' (pool de procesos)
+    BIOMETRIC_ENGINE = os.getenv("BIOMETRIC_ENGINE", "inline")
+    BIOMETRIC_ENGINE_WORKERS = int(os.getenv("BIOMETRIC_ENGINE_WORKERS", 0))          # 0 = núcleos / WEB_CONCURRENCY
+    BIOMETRIC_ENGINE_MAX_PENDING = int(os.getenv("BIOMETRIC_ENGINE_MAX_PENDING", 0))  # 0 = 2 x procesos
+    BIOMETRIC_JOB_TIMEOUT = float(os.getenv("BIOMETRIC_JOB_TIMEOUT", 10))             # Segundos por trabajo
+
+    # Control de admisión: espera máxima estimada en cola antes de responder 503
+    BIOMETRIC_ADMISSION_ENABLED = os.getenv("BIOMETRIC_ADMISSION_ENABLED", "True") == "True"
+    BIOMETRIC_QUEUE_BUDGET = float(os.getenv("BIOMETRIC_QUEUE_BUDGET", 2.0))          # Segundos (face-enroll)
+    BIOMETRIC_ADMISSION_CAPACITY = int(os.getenv("BIOMETRIC_ADMISSION_CAPACITY", 0))  # 0 = procesos del motor (inline: sin admisión)
+
+    # Histogramas de duración por etapa expuestos en /metrics (Prometheus)
+    BIOMETRIC_METRICS_ENABLED = os.getenv("BIOMETRIC_METRICS_ENABLED", "False") == "True"
+
+    # Hashing de contraseñas: 'process' (pool dedicado) | 'inline' (hilo del request)
+    PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "inline")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0))          # 0 = núcleos / WEB_CONCURRENCY
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 0))  # 0 = 4 x procesos
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))        # Segundos por operación
+
+    # Política de hashing: 'bcrypt' | 'scrypt' | 'argon2id' (requiere argon2-cffi)
+    PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "bcrypt")
+    PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST", 0))                # 0 = default del algoritmo
+    PASSWORD_HASH_TARGET_MS = int(os.getenv("PASSWORD_HASH_TARGET_MS", 0))       # > 0 = calibrar sin COST fijo (ver calibrate_passwords.py)
+    PASSWORD_HASH_MEMORY_KIB = int(os.getenv("PASSWORD_HASH_MEMORY_KIB", 65536))  # scrypt / argon2id
+
+    # Caché del usuario autenticado (user_loader) entre requests
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 5))  # Segundos; 0 = solo caché por request
+
     # Otros ajustes globales
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = "Lax"
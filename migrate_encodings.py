@@ -0,0 +1,13 @@
+from app import create_app
+from app.services.biometrics.repository import migrate_face_encodings, move_face_encodings_to_templates
+
+app = create_app()
+
+with app.app_context():
+    # Mueve los encodings de la columna user.face_encoding a la tabla FaceTemplate (por bloques)
+    moved = move_face_encodings_to_templates(batch_size=500)
+    print(f"--- {moved} encodings movidos a FaceTemplate ---")
+
+    # Reescribe los encodings Pickle heredados al formato binario v1 (por bloques)
+    migrated = migrate_face_encodings(batch_size=500)
+    print(f"--- {migrated} encodings migrados al formato v1 ---")
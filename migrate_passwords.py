@@ -0,0 +1,11 @@
+from app import create_app
+from app.services.passwords import widen_password_column
+
+app = create_app()
+
+with app.app_context():
+    # Amplía user.password a VARCHAR(255) para los hashes scrypt/argon2id (no-op en SQLite)
+    if widen_password_column():
+        print("--- Columna user.password ampliada a VARCHAR(255) ---")
+    else:
+        print("--- Columna user.password sin cambios ---")
@@ -13,3 +13,25 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+
+class _InMemoryConfig:
+    """Configuración con BD SQLite en memoria para tests que persisten datos."""
+    SECRET_KEY = "test-key"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+
+
+@pytest.fixture()
+def db_app():
+    from app import db
+
+    app = create_app(_InMemoryConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
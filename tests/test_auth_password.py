@@ -8,3 +8,85 @@ def test_register_page_renders(client):
     resp = client.get('/register')
     assert resp.status_code == 200
     assert b"Registro Blindado" in resp.data
+
+
+class TestRegisterUniqueness:
+    """Tests para la verificación de campos únicos en el registro."""
+
+    FORM = {'username': 'ana', 'email': 'Ana@x.com', 'phone': '+5491100000000', 'password': 'Secreta1!'}
+
+    def _setup(self, monkeypatch):
+        from app.blueprints.auth.auth_password import routes
+        from app.services.passwords import InlineHasher, PasswordPolicy
+        from app.services.passwords import hasher as hasher_module
+
+        monkeypatch.setattr(hasher_module, '_hasher', InlineHasher(PasswordPolicy('bcrypt', {'rounds': 4})))
+        monkeypatch.setattr(routes, 'send_confirmation_email', lambda user: None)
+        return routes
+
+    def _existing(self, **fields):
+        from app import db
+        from app.models import User
+
+        values = {'username': 'otro', 'email': 'otro@x.com', 'phone_number': None, 'password': 'x'}
+        values.update(fields)
+        db.session.add(User(**values))
+        db.session.commit()
+
+    def test_register_runs_one_select_and_one_insert(self, db_app, monkeypatch):
+        from sqlalchemy import event
+        from app import db
+
+        self._setup(monkeypatch)
+        statements = []
+        engine = db.engine
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement.split()[0])
+
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            resp = db_app.test_client().post('/register', data=self.FORM)
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+        assert resp.status_code == 302
+        assert statements == ['SELECT', 'INSERT']
+
+    def test_reports_colliding_field(self, db_app, monkeypatch):
+        from app.blueprints.auth.auth_password.routes import _taken_fields
+
+        self._existing(email='ana@x.com', phone_number='+5491100000000')
+
+        assert _taken_fields('ana', 'ana@x.com', '+5491100000000') == ['email', 'phone_number']
+        assert _taken_fields('nuevo', 'nuevo@x.com', None) == []
+
+        self._setup(monkeypatch)
+        with db_app.test_client() as client:
+            client.post('/register', data=self.FORM)
+            with client.session_transaction() as flask_session:
+                assert flask_session['_flashes'] == [('danger', 'Ese correo ya está registrado.')]
+
+    def test_concurrent_registration_is_reported(self, db_app, monkeypatch):
+        from app.models import User
+
+        routes = self._setup(monkeypatch)
+        taken_fields = routes._taken_fields
+        checks = iter([[], None])
+
+        def racing_check(username, email, phone):
+            # El registro concurrente gana entre la consulta y el INSERT
+            result = next(checks)
+            if result is None:
+                return taken_fields(username, email, phone)
+            self._existing(username='ana')
+            return result
+
+        monkeypatch.setattr(routes, '_taken_fields', racing_check)
+        with db_app.test_client() as client:
+            resp = client.post('/register', data=self.FORM)
+            with client.session_transaction() as flask_session:
+                assert flask_session['_flashes'] == [('danger', 'El usuario ya existe.')]
+
+        assert resp.status_code == 302
+        assert User.query.filter_by(username='ana').count() == 1
@@ -0,0 +1,52 @@
+"""
+Tests para el benchmark biométrico offline.
+"""
+
+import numpy as np
+
+
+class TestBenchmarkHelpers:
+    """Tests para las utilidades del benchmark (sin correr dlib)."""
+
+    def test_synthetic_frame_is_deterministic(self):
+        from benchmarks.biometrics import synthetic_face_frame
+
+        first = synthetic_face_frame(320, 240, seed=7)
+        second = synthetic_face_frame(320, 240, seed=7)
+
+        assert first.shape == (240, 320, 3)
+        assert np.array_equal(first, second)
+
+    def test_summarize_reports_percentiles_in_ms(self):
+        from benchmarks.biometrics import summarize
+
+        stats = summarize([0.001] * 98 + [0.1, 0.2])
+
+        assert stats['n'] == 100
+        assert stats['p50_ms'] == 1.0
+        assert stats['p99_ms'] > stats['p95_ms'] >= stats['p50_ms']
+        assert stats['throughput_per_s'] > 0
+
+    def test_synthetic_gallery_matches_seed_user(self):
+        from benchmarks.biometrics import synthetic_gallery
+
+        gallery, query = synthetic_gallery(500, seed=3)
+
+        assert len(gallery) == 500
+        assert gallery.best_match(query)[0] == 1
+
+    def test_compare_flags_only_regressions_over_threshold(self):
+        from benchmarks.biometrics import compare
+
+        def run(decode_ms, match_ms):
+            return {
+                'frames': [{
+                    'frame': 'synthetic', 'resolution': '640x480', 'jpeg_quality': 85,
+                    'stages': {'decode': {'p50_ms': decode_ms}},
+                }],
+                'match': [{'index': 'flat', 'gallery_size': 10, 'p50_ms': match_ms}],
+            }
+
+        regressions = compare(run(2.0, 0.1), run(1.0, 0.1), max_regression=1.25)
+
+        assert [key for key, *_ in regressions] == ['frame/synthetic/640x480/q85/decode']
@@ -0,0 +1,101 @@
+"""
+Tests para el control de admisión biométrico.
+"""
+
+from contextlib import ExitStack
+
+import pytest
+
+
+class TestAdmissionController:
+    """Tests para AdmissionController."""
+    
+    def test_low_priority_flows_are_shed_first(self):
+        from app.services.biometrics.admission import (
+            AdmissionController, OverloadedError, FLOW_ENROLL, FLOW_LOGIN, FLOW_POSE,
+        )
+        
+        controller = AdmissionController(capacity=1, budget=1.0, initial_service_time=0.45)
+        
+        with ExitStack() as stack:
+            stack.enter_context(controller.admit(FLOW_ENROLL))
+            # Espera estimada 0.45s: solo /check-pose (presupuesto 0.5s) aún entra
+            with controller.admit(FLOW_POSE):
+                # Espera estimada 0.9s: se descartan pose y login, no enroll
+                with pytest.raises(OverloadedError):
+                    stack.enter_context(controller.admit(FLOW_POSE))
+                with pytest.raises(OverloadedError):
+                    stack.enter_context(controller.admit(FLOW_LOGIN))
+                with controller.admit(FLOW_ENROLL):
+                    assert controller.in_flight == 3
+        
+        assert controller.in_flight == 0
+    
+    def test_rejection_carries_retry_after(self):
+        from app.services.biometrics.admission import AdmissionController, OverloadedError, FLOW_LOGIN
+        
+        controller = AdmissionController(capacity=1, budget=1.0, initial_service_time=3.0)
+        
+        with controller.admit(FLOW_LOGIN):
+            with pytest.raises(OverloadedError) as excinfo:
+                with controller.admit(FLOW_LOGIN):
+                    pass
+        
+        assert excinfo.value.retry_after == 3
+    
+    def test_service_time_tracks_observed_durations(self):
+        from app.services.biometrics.admission import AdmissionController, FLOW_POSE
+        
+        controller = AdmissionController(capacity=2, initial_service_time=1.0)
+        
+        with controller.admit(FLOW_POSE):
+            pass
+        
+        assert controller.service_time < 1.0
+        assert controller.estimated_wait() == 0
+
+
+class TestCreateAdmissionController:
+    """Tests para create_admission_controller."""
+    
+    def test_inline_engine_has_no_admission_by_default(self, monkeypatch):
+        from app.services.biometrics import admission
+        from app.services.biometrics.engine import InlineEngine
+        
+        monkeypatch.setattr(admission, 'get_engine', lambda: InlineEngine())
+        
+        assert admission.create_admission_controller({}) is None
+    
+    def test_inline_engine_uses_configured_capacity(self, monkeypatch):
+        from app.services.biometrics import admission
+        from app.services.biometrics.engine import InlineEngine
+        
+        monkeypatch.setattr(admission, 'get_engine', lambda: InlineEngine())
+        
+        controller = admission.create_admission_controller({'BIOMETRIC_ADMISSION_CAPACITY': 8})
+        assert controller.capacity == 8
+    
+    def test_process_engine_capacity_is_its_workers(self, monkeypatch):
+        from app.services.biometrics import admission
+        from app.services.biometrics.engine import ProcessPoolEngine
+        
+        engine = ProcessPoolEngine.__new__(ProcessPoolEngine)
+        engine.workers = 3
+        monkeypatch.setattr(admission, 'get_engine', lambda: engine)
+        
+        assert admission.create_admission_controller({}).capacity == 3
+
+
+def test_overloaded_route_returns_503_with_retry_after(client, monkeypatch):
+    from app.services.biometrics import pipelines
+    from app.services.biometrics.admission import OverloadedError
+    
+    def overloaded(*args, **kwargs):
+        raise OverloadedError('login', 4)
+    
+    monkeypatch.setattr(pipelines, 'login_biometric_pipeline', overloaded)
+    
+    resp = client.post('/face-login', json={'image': 'AAAA'})
+    
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '4'
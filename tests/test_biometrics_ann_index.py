@@ -0,0 +1,94 @@
+"""
+Tests para el índice ANN (IVF) de la galería biométrica.
+"""
+
+import pytest
+import numpy as np
+
+
+def _clustered_encodings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 0.3, (max(n // 10, 1), 128))
+    noise = rng.normal(0, 0.02, (n, 128))
+    return (centers[rng.integers(0, len(centers), n)] + noise).astype(np.float32)
+
+
+def _ivf_gallery(encodings, **kwargs):
+    from app.services.biometrics.ann_index import IVFIndex
+    from app.services.biometrics.gallery import FaceGallery
+    
+    params = dict(nlist=16, nprobe=4, min_train_size=100)
+    params.update(kwargs)
+    gallery = FaceGallery(index=IVFIndex(**params))
+    gallery.load_arrays(encodings, np.arange(len(encodings)))
+    return gallery
+
+
+class TestIVFIndex:
+    """Tests para IVFIndex."""
+    
+    def test_small_gallery_falls_back_to_exact_scan(self):
+        gallery = _ivf_gallery(_clustered_encodings(50))
+        
+        assert gallery._index.ready is False
+        assert gallery.nearest(gallery.encodings[7])[0] == 7
+    
+    def test_trained_index_finds_exact_neighbours(self):
+        encodings = _clustered_encodings(1000)
+        gallery = _ivf_gallery(encodings)
+        
+        assert gallery._index.ready is True
+        for user_id in (0, 123, 999):
+            found_id, distance = gallery.nearest(encodings[user_id])
+            assert found_id == user_id
+            assert distance == pytest.approx(0.0, abs=1e-5)
+    
+    def test_tolerance_semantics_preserved(self):
+        encodings = _clustered_encodings(1000)
+        gallery = _ivf_gallery(encodings)
+        far_query = np.full(128, 5.0, dtype=np.float32)
+        
+        assert gallery.best_match(far_query, tolerance=0.45) == (None, None)
+    
+    def test_incremental_insert_and_delete(self):
+        encodings = _clustered_encodings(1000)
+        gallery = _ivf_gallery(encodings)
+        new_encoding = np.full(128, 0.7, dtype=np.float32)
+        
+        gallery.upsert(5000, new_encoding)
+        assert gallery.best_match(new_encoding, tolerance=0.01)[0] == 5000
+        
+        gallery.remove(5000)
+        assert gallery.best_match(new_encoding, tolerance=0.01) == (None, None)
+    
+    def test_index_retrains_when_gallery_doubles(self):
+        encodings = _clustered_encodings(1000)
+        gallery = _ivf_gallery(encodings[:100])
+        
+        for user_id in range(100, 1000):
+            gallery.upsert(user_id, encodings[user_id])
+        
+        assert gallery._index._trained_size >= 800
+        assert gallery.nearest(encodings[900])[0] == 900
+
+
+class TestCreateFaceIndex:
+    """Tests para create_face_index."""
+    
+    def test_default_is_flat(self):
+        from app.services.biometrics.ann_index import create_face_index
+        
+        assert create_face_index({}) is None
+    
+    def test_ivf_reads_config_knobs(self):
+        from app.services.biometrics.ann_index import create_face_index, IVFIndex
+        
+        index = create_face_index({
+            'BIOMETRIC_INDEX': 'ivf',
+            'BIOMETRIC_IVF_NLIST': 32,
+            'BIOMETRIC_IVF_NPROBE': 4,
+        })
+        
+        assert isinstance(index, IVFIndex)
+        assert index.nlist == 32
+        assert index.nprobe == 4
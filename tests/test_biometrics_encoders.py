@@ -2,9 +2,11 @@
 Tests para el módulo de encoders biométricos.
 """
 
-import pytest
-import numpy as np
 import base64
+import types
+
+import numpy as np
+import pytest
 
 
 class TestDecodeBase64Image:
@@ -40,6 +42,58 @@ class TestDecodeBase64Image:
         assert isinstance(result_gray, np.ndarray)
 
 
+class TestReducedDecode:
+    """Tests para la decodificación reducida de JPEG."""
+    
+    def _jpeg_base64(self, width=640, height=480):
+        import cv2
+        
+        image = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+        ok, buf = cv2.imencode('.jpg', image)
+        assert ok
+        return base64.b64encode(buf.tobytes()).decode()
+    
+    def test_reduced_color_decode_halves_resolution(self):
+        from app.services.biometrics.encoders import decode_frame
+        
+        frame = decode_frame(self._jpeg_base64(), reduction=2)
+        
+        assert frame.bgr.shape == (240, 320, 3)
+        assert frame.reduction == 2
+    
+    def test_gray_only_decode_has_no_color_view(self):
+        from app.services.biometrics.encoders import decode_frame
+        
+        frame = decode_frame(self._jpeg_base64(), reduction=4, gray_only=True)
+        
+        assert frame.bgr is None
+        assert frame.gray.shape == (120, 160)
+        assert (frame.width, frame.height) == (160, 120)
+    
+    def test_pose_decode_uses_configured_reduction(self, app):
+        from app.services.biometrics.encoders import decode_pose_frame
+        
+        app.config['BIOMETRIC_POSE_DECODE_REDUCTION'] = 8
+        with app.app_context():
+            frame = decode_pose_frame(self._jpeg_base64())
+        
+        assert frame.gray.shape == (60, 80)
+    
+    def test_raw_bytes_are_decoded_without_base64(self):
+        from app.services.biometrics.encoders import decode_frame
+        
+        raw = base64.b64decode(self._jpeg_base64())
+        
+        frame = decode_frame(raw)
+        
+        assert frame.bgr.shape == (480, 640, 3)
+    
+    def test_unsupported_reduction_returns_none(self):
+        from app.services.biometrics.encoders import decode_frame
+        
+        assert decode_frame(self._jpeg_base64(), reduction=3) is None
+
+
 class TestDetectFaces:
     """Tests para detect_faces."""
     
@@ -74,3 +128,44 @@ class TestExtractFaceEncodings:
         encodings = extract_face_encodings(dummy_image, [])
         
         assert encodings == []
+
+
+class TestDetectionScale:
+    """Tests para detection_scale y detect_faces_in_frame."""
+    
+    def test_scale_keeps_min_face_above_threshold(self):
+        from app.services.biometrics.encoders import detection_scale
+        
+        scale = detection_scale(1280, 0.22, min_face_px=100)
+        
+        assert scale == pytest.approx(100 / (1280 * 0.22))
+        assert 1280 * 0.22 * scale >= 99.9
+    
+    def test_small_images_are_not_upscaled(self):
+        from app.services.biometrics.encoders import detection_scale
+        
+        assert detection_scale(320, 0.22, min_face_px=100) == 1.0
+        assert detection_scale(1280, 0.22, min_face_px=0) == 1.0
+    
+    def test_boxes_are_remapped_to_full_resolution(self, monkeypatch):
+        from app.services.biometrics import encoders
+        from app.services.biometrics.frame import FrameContext
+        
+        seen = {}
+        
+        def fake_locations(image, number_of_times_to_upsample=1, model="hog"):
+            seen['shape'] = image.shape
+            seen['upsample'] = number_of_times_to_upsample
+            return [(10, 60, 60, 10)]
+        
+        monkeypatch.setattr(encoders, 'get_face_recognition', lambda: types.SimpleNamespace(face_locations=fake_locations))
+        frame = FrameContext(bgr=np.zeros((720, 1280, 3), dtype=np.uint8))
+        
+        boxes = encoders.detect_faces_in_frame(frame, 0.25)
+        
+        assert seen['shape'][1] < 1280
+        assert seen['upsample'] == 0
+        scale = seen['shape'][1] / 1280
+        top, right, bottom, left = boxes[0]
+        assert right == pytest.approx(60 / scale, abs=2)
+        assert bottom <= 720
@@ -0,0 +1,118 @@
+"""
+Tests para el motor biométrico (inline y pool de procesos).
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+
+def _mean_task(frame, offset):
+    """Tarea de prueba: debe ser de nivel de módulo para viajar al worker."""
+    return float(frame.gray.mean()) + offset
+
+
+def _slow_task(frame, seconds):
+    time.sleep(seconds)
+    return True
+
+
+@pytest.fixture(scope="module")
+def pool_engine():
+    from app.services.biometrics.engine import ProcessPoolEngine
+    
+    engine = ProcessPoolEngine(workers=1, max_pending=1, job_timeout=5, start_method='fork')
+    yield engine
+    engine.shutdown()
+
+
+class TestInlineEngine:
+    """Tests para InlineEngine y la selección de motor."""
+    
+    def test_runs_task_in_caller(self):
+        from app.services.biometrics.engine import InlineEngine
+        from app.services.biometrics.frame import FrameContext
+        
+        frame = FrameContext(gray=np.full((4, 4), 10, np.uint8))
+        
+        assert InlineEngine().run(_mean_task, frame, 1.0) == 11.0
+    
+    def test_map_preserves_job_order(self):
+        from app.services.biometrics.engine import InlineEngine
+        from app.services.biometrics.frame import FrameContext
+        
+        jobs = [(FrameContext(gray=np.full((2, 2), v, np.uint8)), (0.5,)) for v in (3, 1, 2)]
+        
+        assert InlineEngine().map(_mean_task, jobs) == [3.5, 1.5, 2.5]
+    
+    def test_factory_defaults_to_inline(self):
+        from app.services.biometrics.engine import InlineEngine, create_engine
+        
+        assert isinstance(create_engine({}), InlineEngine)
+    
+    def test_default_workers_split_cores_between_web_workers(self, monkeypatch):
+        import os
+        from app.workers import default_workers
+        
+        monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+        monkeypatch.setenv('WEB_CONCURRENCY', '4')
+        
+        assert default_workers() == 2
+        assert default_workers(16) == 1
+        monkeypatch.delenv('WEB_CONCURRENCY')
+        assert default_workers() == 8
+
+
+class TestProcessPoolEngine:
+    """Tests para ProcessPoolEngine."""
+    
+    def test_frame_travels_through_shared_memory(self, pool_engine):
+        from app.services.biometrics.frame import FrameContext
+        
+        frame = FrameContext(bgr=np.full((8, 8, 3), 30, np.uint8))
+        
+        assert pool_engine.run(_mean_task, frame, 0.5) == pytest.approx(30.5)
+        assert pool_engine.pending == 0
+    
+    def test_worker_attach_does_not_track_block(self, monkeypatch):
+        from multiprocessing import resource_tracker
+        from multiprocessing.shared_memory import SharedMemory
+        from app.services.biometrics.engine import _attach_shared
+        
+        owner = SharedMemory(create=True, size=16)
+        registered = []
+        monkeypatch.setattr(resource_tracker, 'register', lambda name, rtype: registered.append(name))
+        try:
+            shm = _attach_shared(owner.name)
+            shm.close()
+        finally:
+            owner.close()
+            owner.unlink()
+        
+        assert registered == []
+    
+    def test_map_runs_batch_through_pool(self, pool_engine):
+        from app.services.biometrics.frame import FrameContext
+        
+        jobs = [(FrameContext(gray=np.full((4, 4), v, np.uint8)), (0,)) for v in range(5)]
+        
+        assert pool_engine.map(_mean_task, jobs) == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert pool_engine.pending == 0
+    
+    def test_timeout_and_bounded_queue(self, pool_engine):
+        from app.services.biometrics.engine import EngineBusyError, EngineTimeoutError
+        from app.services.biometrics.frame import FrameContext
+        
+        frame = FrameContext(gray=np.zeros((2, 2), np.uint8))
+        
+        with pytest.raises(EngineTimeoutError):
+            pool_engine.run(_slow_task, frame, 1.0, timeout=0.1)
+        # El trabajo sigue ocupando su cupo hasta terminar en el worker
+        with pytest.raises(EngineBusyError):
+            pool_engine.run(_mean_task, frame, 0)
+        
+        deadline = time.monotonic() + 10
+        while pool_engine.pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool_engine.run(_mean_task, frame, 0) == 0.0
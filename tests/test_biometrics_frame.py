@@ -0,0 +1,50 @@
+"""
+Tests para FrameContext.
+"""
+
+import pytest
+import numpy as np
+
+
+def _bgr(height=40, width=60):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+class TestFrameContext:
+    """Tests para las vistas perezosas de FrameContext."""
+    
+    def test_views_are_computed_once(self):
+        from app.services.biometrics.frame import FrameContext
+        
+        frame = FrameContext(bgr=_bgr())
+        
+        assert frame.gray is frame.gray
+        assert frame.rgb is frame.rgb
+        assert frame.rgb.flags['C_CONTIGUOUS']
+        np.testing.assert_array_equal(frame.rgb[..., 0], frame.bgr[..., 2])
+    
+    def test_dimensions(self):
+        from app.services.biometrics.frame import FrameContext
+        
+        frame = FrameContext(bgr=_bgr(40, 60))
+        
+        assert (frame.height, frame.width) == (40, 60)
+    
+    def test_downscaled_gray_is_memoized(self):
+        from app.services.biometrics.frame import FrameContext
+        
+        frame = FrameContext(bgr=_bgr(40, 60))
+        scaled = frame.downscaled_gray(0.5)
+        
+        assert scaled.shape == (20, 30)
+        assert frame.downscaled_gray(0.5) is scaled
+        assert frame.downscaled_gray(1.0) is frame.gray
+    
+    def test_gray_only_frame_rejects_rgb(self):
+        from app.services.biometrics.frame import FrameContext
+        
+        frame = FrameContext(gray=np.zeros((10, 10), np.uint8))
+        
+        with pytest.raises(ValueError):
+            frame.rgb
@@ -0,0 +1,132 @@
+"""
+Tests para la galería biométrica en memoria.
+"""
+
+import pytest
+import numpy as np
+
+
+def _encoding(seed):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.1, 128)
+
+
+class TestFaceGallery:
+    """Tests para FaceGallery."""
+    
+    def test_empty_gallery_returns_no_match(self):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        gallery = FaceGallery()
+        
+        assert gallery.best_match(_encoding(0)) == (None, None)
+    
+    def test_load_builds_contiguous_float32_matrix(self):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        gallery = FaceGallery()
+        gallery.load([(1, _encoding(1)), (2, _encoding(2))])
+        
+        assert gallery.encodings.shape == (2, 128)
+        assert gallery.encodings.dtype == np.float32
+        assert gallery.encodings.flags['C_CONTIGUOUS']
+        assert list(gallery.user_ids) == [1, 2]
+    
+    def test_best_match_returns_closest_not_first(self):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        target = _encoding(7)
+        gallery = FaceGallery()
+        gallery.load([
+            (1, target + 0.02),
+            (2, target + 0.001),
+            (3, _encoding(8)),
+        ])
+        
+        user_id, distance = gallery.best_match(target, tolerance=0.45)
+        
+        assert user_id == 2
+        assert distance < 0.45
+    
+    def test_best_match_respects_tolerance(self):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        gallery = FaceGallery()
+        gallery.load([(1, _encoding(1))])
+        
+        assert gallery.best_match(_encoding(2), tolerance=0.1) == (None, None)
+    
+    def test_remove_keeps_rows_compact(self):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        gallery = FaceGallery()
+        gallery.load([(1, _encoding(1)), (2, _encoding(2)), (3, _encoding(3))])
+        
+        assert gallery.remove(1) is True
+        assert gallery.remove(1) is False
+        assert len(gallery) == 2
+        assert sorted(gallery.user_ids) == [2, 3]
+        assert gallery.best_match(_encoding(3), tolerance=0.01)[0] == 3
+    
+    def test_upsert_grows_and_replaces(self):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        gallery = FaceGallery()
+        for user_id in range(100):
+            gallery.upsert(user_id, _encoding(user_id))
+        gallery.upsert(5, _encoding(500))
+        
+        assert len(gallery) == 100
+        assert gallery.best_match(_encoding(500), tolerance=0.01)[0] == 5
+
+
+class TestTemplateStore:
+    """Tests para TemplateStore y el re-ranking best-of-k."""
+    
+    def test_templates_are_contiguous_per_user(self):
+        from app.services.biometrics.gallery import TemplateStore
+        
+        store = TemplateStore()
+        store.set(1, np.stack([_encoding(1), _encoding(2)]))
+        store.set(2, np.stack([_encoding(3), _encoding(4), _encoding(5)]))
+        
+        assert len(store) == 5
+        assert store.get(2).shape == (3, 128)
+        assert store.get(2).flags['C_CONTIGUOUS']
+    
+    def test_min_distances_best_of_k(self):
+        from app.services.biometrics.gallery import TemplateStore
+        
+        store = TemplateStore()
+        store.set(1, np.stack([_encoding(1), _encoding(2)]))
+        
+        result = store.min_distances(_encoding(2).astype(np.float32), np.array([1, 99]))
+        
+        assert result[0] == pytest.approx(0.0, abs=1e-6)
+        assert np.isinf(result[1])
+    
+    def test_replace_and_remove_compacts(self):
+        from app.services.biometrics.gallery import TemplateStore
+        
+        store = TemplateStore()
+        for user_id in range(50):
+            store.set(user_id, np.stack([_encoding(user_id)] * 3))
+        for user_id in range(40):
+            store.remove(user_id)
+        store.set(45, np.stack([_encoding(7)] * 2))
+        
+        assert len(store) == 10 * 3 - 1
+        np.testing.assert_allclose(store.get(45)[0], _encoding(7), rtol=1e-6)
+    
+    def test_gallery_reranks_with_templates(self):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        left, right = _encoding(1), _encoding(2)
+        gallery = FaceGallery()
+        gallery.load([(1, (left + right) / 2), (2, _encoding(3))])
+        gallery.set_templates(1, np.stack([left, right]))
+        
+        user_id, distance = gallery.best_match(right, tolerance=0.45)
+        
+        assert user_id == 1
+        assert distance == pytest.approx(0.0, abs=1e-6)
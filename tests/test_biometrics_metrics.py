@@ -0,0 +1,72 @@
+"""
+Tests para el registro de métricas biométricas.
+"""
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture()
+def enabled_registry(monkeypatch):
+    from app.services.biometrics.metrics import registry
+    
+    monkeypatch.setattr(registry, 'enabled', True)
+    registry.reset()
+    yield registry
+    registry.reset()
+
+
+class TestMetricsRegistry:
+    """Tests para MetricsRegistry y los temporizadores."""
+    
+    def test_histogram_buckets_are_cumulative_in_exposition(self):
+        from app.services.biometrics.metrics import MetricsRegistry
+        
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        labels = (('flow', 'login'), ('stage', 'detect'))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            registry.observe('biometric_stage_seconds', labels, value)
+        
+        text = registry.render_prometheus()
+        
+        assert '# TYPE biometric_stage_seconds histogram' in text
+        assert 'biometric_stage_seconds_bucket{flow="login",stage="detect",le="0.1"} 2' in text
+        assert 'biometric_stage_seconds_bucket{flow="login",stage="detect",le="1.0"} 3' in text
+        assert 'biometric_stage_seconds_bucket{flow="login",stage="detect",le="+Inf"} 4' in text
+        assert 'biometric_stage_seconds_count{flow="login",stage="detect"} 4' in text
+    
+    def test_disabled_registry_hands_out_null_timer(self, monkeypatch):
+        from app.services.biometrics import metrics
+        
+        monkeypatch.setattr(metrics.registry, 'enabled', False)
+        
+        assert metrics.pipeline_timer('login') is metrics.pipeline_timer('check_pose')
+    
+    def test_pose_pipeline_records_stages_and_outcome(self, enabled_registry, monkeypatch):
+        from app.services.biometrics import pipelines
+        from app.services.biometrics.frame import FrameContext
+        from app.services.biometrics.metrics import PIPELINE_METRIC, REJECTION_METRIC, STAGE_METRIC
+        
+        monkeypatch.setattr(pipelines.encoders, 'decode_pose_frame', lambda data: FrameContext(gray=np.zeros((10, 10), np.uint8)))
+        monkeypatch.setattr(pipelines.encoders, 'detect_faces_in_frame', lambda frame, ratio: [])
+        
+        valid, _ = pipelines.validate_pose_challenge("img", "CENTER")
+        
+        assert valid is False
+        for stage in ('decode', 'detect', 'engine'):
+            assert enabled_registry.get(STAGE_METRIC, flow='check_pose', stage=stage).count == 1
+        assert enabled_registry.get(PIPELINE_METRIC, flow='check_pose', outcome='no_face').count == 1
+        assert enabled_registry.get(REJECTION_METRIC, flow='check_pose', stage='detect', reason='no_face').count == 1
+
+
+def test_metrics_endpoint(client, enabled_registry, monkeypatch):
+    enabled_registry.observe('biometric_pipeline_seconds', (('flow', 'login'), ('outcome', 'ok')), 0.2)
+    
+    resp = client.get('/metrics')
+    
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+    assert b'biometric_pipeline_seconds_count{flow="login",outcome="ok"} 1' in resp.data
+    
+    monkeypatch.setattr(enabled_registry, 'enabled', False)
+    assert client.get('/metrics').status_code == 404
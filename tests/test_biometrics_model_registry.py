@@ -0,0 +1,77 @@
+"""
+Tests para el registro de modelos biométricos.
+"""
+
+import subprocess
+import sys
+
+
+class TestModelRegistry:
+    """Tests para ModelRegistry."""
+    
+    def test_loads_once_on_first_use(self):
+        from app.services.biometrics.model_registry import ModelRegistry
+        
+        calls = []
+        registry = ModelRegistry()
+        registry.register('m', lambda: calls.append(1) or object())
+        
+        assert not registry.is_loaded('m')
+        first = registry.get('m')
+        
+        assert registry.get('m') is first
+        assert calls == [1]
+    
+    def test_failed_load_is_cached_as_none(self):
+        from app.services.biometrics.model_registry import ModelRegistry
+        
+        calls = []
+        
+        def broken():
+            calls.append(1)
+            raise OSError("modelo corrupto")
+        
+        registry = ModelRegistry()
+        registry.register('m', broken)
+        
+        assert registry.warm_up() == {'m': False}
+        assert registry.get('m') is None
+        assert calls == [1]
+    
+    def test_set_and_reset_override_model(self):
+        from app.services.biometrics.model_registry import ModelRegistry
+        
+        registry = ModelRegistry()
+        registry.register('m', lambda: 'cargado')
+        registry.set('m', 'fijo')
+        
+        assert registry.get('m') == 'fijo'
+        registry.reset('m')
+        assert registry.get('m') == 'cargado'
+
+
+def test_importing_blueprints_does_not_load_models():
+    code = (
+        "import sys\n"
+        "import app.blueprints.auth, app.blueprints.auth.bio_logic\n"
+        "from app.services.biometrics import model_registry\n"
+        "assert 'face_recognition' not in sys.modules\n"
+        "assert not model_registry.registry.is_loaded(model_registry.LANDMARKS_68)\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    
+    assert result.returncode == 0, result.stderr
+
+
+def test_landmark_predictor_is_shared_with_face_recognition(monkeypatch):
+    from types import SimpleNamespace
+    from app.services.biometrics import model_registry
+    
+    predictor = object()
+    fake_face_recognition = SimpleNamespace(api=SimpleNamespace(pose_predictor_68_point=predictor))
+    monkeypatch.setattr(model_registry, 'registry', model_registry.ModelRegistry())
+    model_registry.registry.register(model_registry.LANDMARKS_68, model_registry._load_landmark_predictor)
+    model_registry.registry.register(model_registry.FACE_RECOGNITION, lambda: fake_face_recognition)
+    
+    assert model_registry.get_landmark_predictor() is predictor
+    assert model_registry.get_face_recognition() is fake_face_recognition
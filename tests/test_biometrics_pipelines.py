@@ -2,7 +2,10 @@
 Tests para el módulo de pipelines biométricos.
 """
 
+import types
+
 import pytest
+import numpy as np
 
 
 class TestEnrollBiometricPipeline:
@@ -43,6 +46,150 @@ class TestLoginBiometricPipeline:
         success, message, user = login_biometric_pipeline("invalid", tolerance=0.6)
         
         assert success is False
+    
+    def test_login_with_claimed_identity_skips_gallery(self, monkeypatch):
+        from app.services.biometrics import pipelines
+        
+        from app.services.biometrics.frame import FrameContext
+        
+        claimed = object()
+        monkeypatch.setattr(pipelines.encoders, 'decode_frame', lambda data: FrameContext(bgr=np.zeros((10, 10, 3), np.uint8)))
+        monkeypatch.setattr(pipelines.encoders, 'detect_faces_in_frame', lambda frame, ratio: [(0, 9, 9, 0)])
+        monkeypatch.setattr(pipelines.tasks.pose_checks, 'analyze_face_structure', lambda *args: (True, "ok"))
+        monkeypatch.setattr(pipelines.encoders, 'encode_faces', lambda img, boxes: [np.zeros(128)])
+        monkeypatch.setattr(pipelines.repository, 'get_claimed_user', lambda username=None, user_id=None: claimed)
+        monkeypatch.setattr(pipelines.repository, 'verify_user_face', lambda user, enc, tolerance=0.45: user is claimed)
+        monkeypatch.setattr(pipelines.repository, 'find_matching_user', lambda *a, **k: pytest.fail("1:N no debe ejecutarse"))
+        
+        success, message, user = pipelines.login_biometric_pipeline("img", username="alice")
+        
+        assert success is True
+        assert user is claimed
+    
+    def test_login_encoder_uses_its_own_alignment(self, app, monkeypatch):
+        from flask import g
+        from app.services.biometrics import pipelines
+        from app.services.biometrics.frame import FrameContext
+        
+        calls = []
+        
+        def fake_metrics(frame, rect):
+            frame.predictor_calls += 1
+            return types.SimpleNamespace()
+        
+        def fake_encode(img, boxes):
+            calls.append(boxes)
+            return [np.zeros(128)]
+        
+        monkeypatch.setattr(pipelines.encoders, 'decode_frame', lambda data: FrameContext(bgr=np.zeros((10, 10, 3), np.uint8)))
+        monkeypatch.setattr(pipelines.encoders, 'detect_faces_in_frame', lambda frame, ratio: [(0, 9, 9, 0)])
+        monkeypatch.setattr(pipelines.tasks.pose_checks, 'get_frame_metrics', fake_metrics)
+        monkeypatch.setattr(pipelines.tasks.pose_checks, 'analyze_face_structure', lambda *args: (True, "ok"))
+        monkeypatch.setattr(pipelines.encoders, 'encode_faces', fake_encode)
+        monkeypatch.setattr(pipelines.repository, 'find_matching_user', lambda *a, **k: None)
+        
+        with app.test_request_context():
+            pipelines.login_biometric_pipeline("img")
+            # Landmarks de 68 puntos para la estructura + 5 puntos del encoder
+            assert g.predictor_calls == 2
+        
+        # Los landmarks de la app no alinean el encoder (plantillas guardadas con 5 puntos)
+        assert calls == [[(0, 9, 9, 0)]]
+
+
+class TestRejectionCascade:
+    """Tests para el orden de costo de la cascada de analyze_face_task."""
+    
+    def _frame(self):
+        from app.services.biometrics.frame import FrameContext
+        return FrameContext(bgr=np.zeros((480, 640, 3), np.uint8))
+    
+    def test_multiple_faces_rejected_before_landmarks(self, monkeypatch):
+        from app.services.biometrics import tasks
+        
+        monkeypatch.setattr(tasks.encoders, 'detect_faces_in_frame', lambda frame, ratio: [(0, 300, 300, 0)] * 2)
+        monkeypatch.setattr(tasks.pose_checks, 'get_frame_metrics', lambda *a: pytest.fail("sin landmarks"))
+        
+        analysis = tasks.analyze_face_task(self._frame())
+        
+        assert (analysis.status, analysis.stage) == (tasks.FACE_MULTIPLE, tasks.STAGE_DETECT)
+    
+    def test_far_face_rejected_by_box_without_predictor(self, monkeypatch):
+        from app.services.biometrics import tasks
+        
+        monkeypatch.setattr(tasks.pose_checks, 'get_landmark_predictor', lambda: object())
+        monkeypatch.setattr(tasks.encoders, 'detect_faces_in_frame', lambda frame, ratio: [(100, 150, 150, 100)])
+        monkeypatch.setattr(tasks.pose_checks, 'get_frame_metrics', lambda *a: pytest.fail("sin landmarks"))
+        
+        analysis = tasks.analyze_face_task(self._frame(), True)
+        
+        assert analysis.status == tasks.FACE_REJECTED
+        assert analysis.stage == tasks.STAGE_BOX
+        assert analysis.reason == 'too_far'
+        assert analysis.predictor_calls == 0
+        assert [stage for stage, _ in analysis.timings] == ['detect', 'box']
+    
+    def test_landmark_rejection_skips_encoder(self, monkeypatch):
+        from app.services.biometrics import tasks
+        
+        monkeypatch.setattr(tasks.encoders, 'detect_faces_in_frame', lambda frame, ratio: [(0, 300, 300, 0)])
+        monkeypatch.setattr(tasks.pose_checks, 'get_frame_metrics', lambda *a: None)
+        monkeypatch.setattr(tasks.pose_checks, 'analyze_face_structure',
+                            lambda *a: (False, "OJOS CERRADOS. Ábrelos bien."))
+        monkeypatch.setattr(tasks.encoders, 'encode_faces', lambda *a, **k: pytest.fail("sin encoder"))
+        
+        analysis = tasks.analyze_face_task(self._frame())
+        
+        assert (analysis.stage, analysis.reason) == (tasks.STAGE_LANDMARKS, 'eyes_closed')
+
+
+class TestEncodeFaceBatch:
+    """Tests para la API de encodings por lotes."""
+    
+    def test_stacks_encodings_with_owner_rows(self, monkeypatch):
+        from app.services.biometrics import pipelines
+        
+        faces = {1: 1, 2: 0, 3: 2}
+        
+        def fake_task(frame, boxes):
+            count = faces[int(frame.bgr[0, 0, 0])]
+            return np.full((count, 128), frame.bgr[0, 0, 0], np.float32)
+        
+        monkeypatch.setattr(pipelines.tasks, 'encode_boxes_task', fake_task)
+        images = [np.full((4, 4, 3), value, np.uint8) for value in (1, 2, 3)]
+        
+        encodings, owners = pipelines.encode_face_batch([(image, None) for image in images])
+        
+        assert encodings.shape == (3, 128) and encodings.dtype == np.float32
+        assert owners.tolist() == [0, 2, 2]
+        assert encodings[:, 0].tolist() == [1.0, 3.0, 3.0]
+    
+    def test_unreadable_images_are_skipped(self):
+        from app.services.biometrics import pipelines
+        
+        encodings, owners = pipelines.encode_face_batch([(b'', None), ('no-es-imagen', None)])
+        
+        assert encodings.shape == (0, 128)
+        assert owners.size == 0
+    
+    def test_bulk_enroll_uses_single_face_images(self, db_app, monkeypatch):
+        from app import db
+        from app.models import FaceSample, User
+        from app.services.biometrics import pipelines
+        from app.services.biometrics.gallery import FaceGallery
+        
+        monkeypatch.setattr(pipelines.repository, '_gallery', FaceGallery())
+        user = User(username='bulk', email='bulk@test.com', password='x' * 60)
+        db.session.add(user)
+        db.session.commit()
+        monkeypatch.setattr(pipelines.tasks, 'encode_boxes_task',
+                            lambda frame, boxes: np.ones((int(frame.bgr[0, 0, 0]), 128), np.float32))
+        images = [np.full((4, 4, 3), faces, np.uint8) for faces in (1, 1, 2, 0)]
+        
+        enrolled, skipped = pipelines.enroll_images_bulk({user.id: images})
+        
+        assert (enrolled, skipped) == (1, 2)
+        assert FaceSample.query.filter_by(user_id=user.id).count() == 2
 
 
 class TestValidatePoseChallenge:
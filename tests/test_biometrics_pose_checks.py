@@ -0,0 +1,160 @@
+"""
+Tests para las métricas faciales de pose_checks.
+"""
+
+import dataclasses
+
+import numpy as np
+import pytest
+
+
+def _landmarks(seed=0):
+    """Landmarks sintéticos (68, 2) con un rostro frontal aproximado."""
+    rng = np.random.default_rng(seed)
+    coords = rng.uniform(100, 300, size=(68, 2))
+    coords[0] = (100, 200)
+    coords[16] = (300, 200)
+    coords[30] = (200, 220)   # Nariz
+    coords[36] = (150, 180)   # Ojo (espejo)
+    coords[45] = (250, 182)
+    coords[51] = (200, 260)   # Boca
+    return coords
+
+
+class _FakePoint:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class _FakeShape:
+    def __init__(self, coords):
+        self._points = [_FakePoint(x, y) for x, y in coords]
+    
+    def parts(self):
+        return self._points
+
+
+def _fake_predictor(monkeypatch, coords):
+    """Sustituye el predictor de dlib y cuenta sus invocaciones."""
+    from app.services.biometrics import pose_checks
+    
+    calls = []
+    
+    def predictor(gray, rect):
+        calls.append(rect)
+        return _FakeShape(coords)
+    
+    monkeypatch.setattr(pose_checks, 'get_landmark_predictor', lambda: predictor)
+    return calls
+
+
+class TestComputeFaceMetrics:
+    """Tests para compute_face_metrics."""
+    
+    def test_matches_scalar_reference(self):
+        from scipy.spatial import distance as dist
+        from app.services.biometrics.pose_checks import compute_face_metrics, lStart, lEnd, rStart, rEnd
+        
+        coords = _landmarks()
+        metrics = compute_face_metrics(coords)
+        
+        def ear(eye):
+            return (dist.euclidean(eye[1], eye[5]) + dist.euclidean(eye[2], eye[4])) / (2.0 * dist.euclidean(eye[0], eye[3]))
+        
+        assert metrics.yaw == pytest.approx((200 - 150) / (250 - 200))
+        assert metrics.pitch == pytest.approx((220 - 181) / (260 - 220))
+        assert metrics.width == pytest.approx(200.0)
+        assert metrics.left_ear == pytest.approx(ear(coords[lStart:lEnd]))
+        assert metrics.right_ear == pytest.approx(ear(coords[rStart:rEnd]))
+    
+    def test_metrics_are_immutable(self):
+        from app.services.biometrics.pose_checks import compute_face_metrics
+        
+        metrics = compute_face_metrics(_landmarks())
+        
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            metrics.yaw = 1.0
+        with pytest.raises(ValueError):
+            metrics.coords[0, 0] = 0
+        assert not hasattr(metrics, '__dict__')
+    
+    def test_caller_array_is_not_frozen(self):
+        from app.services.biometrics.pose_checks import compute_face_metrics
+        
+        coords = _landmarks()
+        compute_face_metrics(coords)
+        
+        assert coords.flags.writeable
+    
+    def test_eye_aspect_ratio_single_eye(self):
+        from app.services.biometrics.pose_checks import eye_aspect_ratio
+        
+        eye = np.array([(0, 0), (1, 1), (2, 1), (3, 0), (2, -1), (1, -1)])
+        
+        assert eye_aspect_ratio(eye) == pytest.approx(4 / 6)
+
+
+class TestFrameMetrics:
+    """Tests para la etapa de landmarks compartida (get_frame_metrics)."""
+    
+    def test_predictor_runs_once_per_face(self, monkeypatch):
+        from app.services.biometrics.frame import FrameContext
+        from app.services.biometrics.pose_checks import get_frame_metrics, validate_pose, analyze_face_structure
+        
+        calls = _fake_predictor(monkeypatch, _landmarks().astype(int))
+        frame = FrameContext(gray=np.zeros((400, 400), np.uint8))
+        box = (100, 300, 300, 100)
+        
+        metrics = get_frame_metrics(frame, box)
+        validate_pose(frame.gray, box, frame.width, 'CENTER', metrics)
+        analyze_face_structure(frame.gray, box, frame.width, frame.height, metrics)
+        
+        assert get_frame_metrics(frame, box) is metrics
+        assert len(calls) == 1
+        assert frame.predictor_calls == 1
+    
+    def test_without_model_returns_none_and_counts_nothing(self, monkeypatch):
+        from app.services.biometrics import pose_checks
+        from app.services.biometrics.frame import FrameContext
+        
+        monkeypatch.setattr(pose_checks, 'get_landmark_predictor', lambda: None)
+        frame = FrameContext(gray=np.zeros((10, 10), np.uint8))
+        
+        assert pose_checks.get_frame_metrics(frame, (0, 9, 9, 0)) is None
+        assert frame.predictor_calls == 0
+
+
+class TestBoxProximity:
+    """Tests para el chequeo de proximidad por caja (previo al predictor)."""
+    
+    def test_far_box_is_rejected_and_near_box_passes(self):
+        from app.services.biometrics.pose_checks import MIN_PROXIMITY_STRUCTURE, box_within_reach
+        
+        assert not box_within_reach((0, 100, 100, 0), 640, MIN_PROXIMITY_STRUCTURE)
+        assert box_within_reach((0, 180, 180, 0), 640, MIN_PROXIMITY_STRUCTURE)
+    
+    def test_is_conservative_with_respect_to_landmarks(self):
+        from app.services.biometrics.pose_checks import BOX_TO_JAW_MAX, box_within_reach
+        
+        # Una caja cuyo ancho mandibular máximo alcanza justo el umbral no se descarta
+        width = 0.28 * 640 / BOX_TO_JAW_MAX
+        assert box_within_reach((0, width, width, 0), 640, 0.28)
+    
+    def test_analyze_structure_skips_predictor_for_far_face(self, monkeypatch):
+        from app.services.biometrics import pose_checks
+        
+        monkeypatch.setattr(pose_checks, 'get_landmark_predictor', lambda: object())
+        monkeypatch.setattr(pose_checks, 'get_face_metrics', lambda *a: pytest.fail("predictor no debe correr"))
+        
+        ok, message = pose_checks.analyze_face_structure(None, (0, 60, 60, 0), 640, 480)
+        
+        assert ok is False
+        assert pose_checks.rejection_reason(message) == 'too_far'
+    
+    def test_box_check_is_skipped_in_dev_mode(self, monkeypatch):
+        from app.services.biometrics import pose_checks
+        
+        monkeypatch.setattr(pose_checks, 'get_landmark_predictor', lambda: None)
+        
+        assert not pose_checks.box_too_far((0, 60, 60, 0), 640, pose_checks.MIN_PROXIMITY_STRUCTURE)
+        assert pose_checks.analyze_face_structure(None, (0, 60, 60, 0), 640, 480) == (True, "Modo Dev (Sin Modelo)")
@@ -0,0 +1,340 @@
+"""
+Tests para el repositorio biométrico (persistencia + galería compartida).
+"""
+
+import pickle
+
+import pytest
+import numpy as np
+
+
+def _encoding(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+@pytest.fixture()
+def repo(db_app, monkeypatch):
+    from app.services.biometrics import repository
+    from app.services.biometrics.gallery import FaceGallery
+    
+    monkeypatch.setattr(repository, '_gallery', FaceGallery())
+    return repository
+
+
+def _make_user(username):
+    from app import db
+    from app.models import User
+    
+    user = User(username=username, email=f"{username}@test.com", password="x" * 60)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+class TestFindMatchingUser:
+    """Tests para find_matching_user."""
+    
+    def test_returns_best_match(self, repo):
+        alice = _make_user('alice')
+        bob = _make_user('bob')
+        target = _encoding(1)
+        repo.save_face_encoding(alice, target + 0.02)
+        repo.save_face_encoding(bob, target + 0.001)
+        
+        assert repo.find_matching_user(target) == bob
+    
+    def test_clear_removes_from_gallery(self, repo):
+        alice = _make_user('alice')
+        repo.save_face_encoding(alice, _encoding(1))
+        repo.get_gallery()
+        
+        repo.clear_face_encoding(alice)
+        
+        assert repo.find_matching_user(_encoding(1)) is None
+
+
+class TestSaveFaceTemplates:
+    """Tests para el enrolamiento multi-plantilla."""
+    
+    def test_stores_samples_and_centroid(self, repo):
+        from app.models import FaceSample
+        
+        alice = _make_user('alice')
+        templates = [('CENTER', _encoding(1)), ('LEFT', _encoding(2)), ('RIGHT', _encoding(3))]
+        
+        assert repo.save_face_templates(alice, templates) is True
+        
+        assert FaceSample.query.filter_by(user_id=alice.id).count() == 3
+        centroid = np.mean([enc for _, enc in templates], axis=0)
+        np.testing.assert_allclose(alice.get_face_encoding(), centroid, rtol=1e-5)
+    
+    def test_match_uses_best_template(self, repo):
+        alice = _make_user('alice')
+        repo.save_face_templates(alice, [('CENTER', _encoding(1)), ('LEFT', _encoding(2))])
+        
+        assert repo.find_matching_user(_encoding(2)) == alice
+        assert repo.verify_user_face(alice, _encoding(2)) is True
+    
+    def test_single_encoding_replaces_templates(self, repo):
+        from app.models import FaceSample
+        
+        alice = _make_user('alice')
+        repo.save_face_templates(alice, [('CENTER', _encoding(1)), ('LEFT', _encoding(2))])
+        repo.save_face_encoding(alice, _encoding(5))
+        
+        assert FaceSample.query.filter_by(user_id=alice.id).count() == 0
+        assert repo.find_matching_user(_encoding(2)) is None
+
+
+class TestSaveFaceTemplatesBulk:
+    """Tests para el guardado masivo de plantillas."""
+    
+    def test_writes_many_users_in_one_call(self, repo):
+        from app.models import BiometricChange, FaceSample
+        
+        alice = _make_user('alice')
+        bob = _make_user('bob')
+        before = repo.current_generation()
+        
+        saved = repo.save_face_templates_bulk([
+            (alice.id, np.stack([_encoding(1), _encoding(2)])),
+            (bob.id, _encoding(3)[None, :]),
+        ])
+        
+        assert saved == 2
+        assert FaceSample.query.filter_by(user_id=alice.id).count() == 2
+        assert FaceSample.query.filter_by(user_id=bob.id).count() == 0
+        assert BiometricChange.query.filter(BiometricChange.id > before).count() == 2
+        assert repo.find_matching_user(_encoding(3)) == bob
+        assert repo.find_matching_user(_encoding(2)) == alice
+
+
+class TestVerifyUserFace:
+    """Tests para la verificación 1:1 con identidad declarada."""
+    
+    def test_claimed_user_requires_enrollment(self, repo):
+        alice = _make_user('alice')
+        
+        assert repo.get_claimed_user(username='alice') is None
+        repo.save_face_encoding(alice, _encoding(1))
+        assert repo.get_claimed_user(username='alice') == alice
+        assert repo.get_claimed_user(user_id=alice.id) == alice
+        assert repo.get_claimed_user(username='nobody') is None
+    
+    def test_verify_only_against_claimed_user(self, repo):
+        alice = _make_user('alice')
+        bob = _make_user('bob')
+        repo.save_face_encoding(alice, _encoding(1))
+        repo.save_face_encoding(bob, _encoding(2))
+        
+        assert repo.verify_user_face(alice, _encoding(1)) is True
+        assert repo.verify_user_face(bob, _encoding(1)) is False
+
+
+class TestGallerySync:
+    """Tests para la sincronización por generaciones entre workers."""
+    
+    def test_writes_bump_generation(self, repo):
+        alice = _make_user('alice')
+        before = repo.current_generation()
+        
+        repo.save_face_encoding(alice, _encoding(1))
+        repo.clear_face_encoding(alice)
+        
+        assert repo.current_generation() == before + 2
+    
+    def test_applies_delta_written_by_other_worker(self, repo, monkeypatch):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        alice = _make_user('alice')
+        repo.get_gallery()
+        
+        # Otro worker: escribe en BD con su propia galería
+        local_gallery = repo._gallery
+        monkeypatch.setattr(repo, '_gallery', FaceGallery())
+        repo.save_face_encoding(alice, _encoding(1))
+        monkeypatch.setattr(repo, '_gallery', local_gallery)
+        
+        assert repo.sync_gallery() == 1
+        assert repo.find_matching_user(_encoding(1)) == alice
+        assert repo.sync_gallery() == 0
+    
+    def test_sync_rereads_generation_under_lock(self, repo, monkeypatch):
+        from app.services.biometrics.gallery import FaceGallery
+        
+        alice = _make_user('alice')
+        repo.get_gallery()
+        local_gallery = repo._gallery
+        monkeypatch.setattr(repo, '_gallery', FaceGallery())
+        repo.save_face_encoding(alice, _encoding(1))
+        monkeypatch.setattr(repo, '_gallery', local_gallery)
+        
+        class _OtherThreadSyncsFirst:
+            """Simula otro hilo que sincroniza mientras este espera el lock."""
+            def __enter__(self):
+                local_gallery.generation = repo.current_generation()
+            
+            def __exit__(self, *exc):
+                return False
+        
+        monkeypatch.setattr(repo, '_gallery_lock', _OtherThreadSyncsFirst())
+        
+        assert repo.sync_gallery() == 0
+        assert 1 not in local_gallery
+    
+    def test_pruned_log_forces_full_reload(self, repo):
+        alice = _make_user('alice')
+        repo.get_gallery()
+        for _ in range(5):
+            repo.save_face_encoding(alice, _encoding(1))
+        repo._gallery.generation = 0
+        
+        assert repo.prune_biometric_changes(keep=2) == 3
+        repo.sync_gallery()
+        
+        assert repo._gallery.generation == repo.current_generation()
+        assert 1 in repo._gallery
+
+
+class TestMigrateFaceEncodings:
+    """Tests para migrate_face_encodings."""
+    
+    def test_rewrites_legacy_pickle_rows(self, repo):
+        from app import db
+        from app.face_codec import FORMAT_LEGACY, FORMAT_V1, is_legacy_blob
+        from app.models import FaceTemplate
+        
+        users = [_make_user(f'user{i}') for i in range(5)]
+        for i, user in enumerate(users):
+            user.face_template = FaceTemplate(encoding=pickle.dumps(_encoding(i)), format_version=FORMAT_LEGACY)
+        db.session.commit()
+        
+        assert repo.migrate_face_encodings(batch_size=2) == 5
+        db.session.expire_all()
+        assert all(not is_legacy_blob(user.face_template.encoding) for user in users)
+        assert all(user.face_template.format_version == FORMAT_V1 for user in users)
+        np.testing.assert_allclose(users[3].get_face_encoding(), _encoding(3), rtol=1e-6)
+    
+    def test_concurrent_reenrollment_is_not_overwritten(self, repo, monkeypatch):
+        from app import db
+        from app.face_codec import FORMAT_LEGACY, encode_face_encoding
+        from app.models import BiometricChange, FaceTemplate
+        
+        users = [_make_user(f'user{i}') for i in range(2)]
+        for i, user in enumerate(users):
+            user.face_template = FaceTemplate(encoding=pickle.dumps(_encoding(i)), format_version=FORMAT_LEGACY)
+        db.session.commit()
+        generation = repo.current_generation()
+        
+        decode = repo.decode_face_encoding
+        fresh = encode_face_encoding(_encoding(7))
+        
+        def reenroll_during_migration(blob):
+            # El usuario 0 se re-enrola entre el SELECT del bloque y su UPDATE
+            if blob == users[0].face_template.encoding:
+                FaceTemplate.query.filter_by(user_id=users[0].id).update({'encoding': fresh})
+            return decode(blob)
+        
+        monkeypatch.setattr(repo, 'decode_face_encoding', reenroll_during_migration)
+        
+        assert repo.migrate_face_encodings() == 1
+        db.session.expire_all()
+        assert users[0].face_template.encoding == fresh
+        np.testing.assert_allclose(users[1].get_face_encoding(), _encoding(1), rtol=1e-6)
+        changed = [change.user_id for change in BiometricChange.query.filter(BiometricChange.id > generation)]
+        assert changed == [users[1].id]
+
+
+class TestMoveFaceEncodingsToTemplates:
+    """Tests para la migración de user.face_encoding a FaceTemplate."""
+    
+    def _add_legacy_column(self):
+        from sqlalchemy import text
+        from app import db
+        
+        db.session.execute(text('ALTER TABLE user ADD COLUMN face_encoding BLOB'))
+        db.session.commit()
+    
+    def _set_legacy(self, user_id, blob):
+        from sqlalchemy import text
+        from app import db
+        
+        db.session.execute(text('UPDATE user SET face_encoding = :blob WHERE id = :id'), {'blob': blob, 'id': user_id})
+        db.session.commit()
+    
+    def test_moves_rows_and_clears_legacy_column(self, repo):
+        from sqlalchemy import text
+        from app import db
+        from app.face_codec import MODEL_VERSION, encode_face_encoding
+        from app.models import BiometricChange, FaceTemplate
+        
+        users = [_make_user(f'user{i}') for i in range(4)]
+        self._add_legacy_column()
+        self._set_legacy(users[0].id, pickle.dumps(_encoding(0)))
+        self._set_legacy(users[1].id, encode_face_encoding(_encoding(1)))
+        self._set_legacy(users[2].id, encode_face_encoding(_encoding(9)))
+        # Re-enrolado después del despliegue: su plantilla nueva prevalece
+        repo.save_face_encoding(users[2], _encoding(2))
+        
+        assert repo.move_face_encodings_to_templates(batch_size=2) == 2
+        
+        db.session.expire_all()
+        assert FaceTemplate.query.count() == 3
+        for i in range(3):
+            np.testing.assert_allclose(users[i].get_face_encoding(), _encoding(i), rtol=1e-6)
+        assert users[0].face_template.model_version == MODEL_VERSION
+        assert users[3].face_template is None
+        legacy = db.session.execute(text('SELECT COUNT(*) FROM user WHERE face_encoding IS NOT NULL')).scalar()
+        assert legacy == 0
+        assert BiometricChange.query.filter(BiometricChange.user_id.in_([users[0].id, users[1].id])).count() == 2
+        
+        # Idempotente
+        assert repo.move_face_encodings_to_templates() == 0
+    
+    def test_without_legacy_column_is_noop(self, repo):
+        assert repo.move_face_encodings_to_templates() == 0
+
+
+class TestFaceTemplateFacade:
+    """Tests para la fachada set/get_face_encoding sobre FaceTemplate."""
+    
+    def test_set_get_and_clear(self, repo):
+        from app import db
+        from app.face_codec import FORMAT_V1, MODEL_VERSION
+        
+        alice = _make_user('alice')
+        assert alice.get_face_encoding() is None
+        assert alice.has_face_template is False
+        
+        alice.set_face_encoding(_encoding(1))
+        db.session.commit()
+        
+        np.testing.assert_allclose(alice.get_face_encoding(), _encoding(1), rtol=1e-6)
+        assert alice.face_template.format_version == FORMAT_V1
+        assert alice.face_template.model_version == MODEL_VERSION
+        assert alice.face_template.enrolled_at is not None
+        db.session.expire_all()
+        assert alice.has_face_template is True
+        
+        alice.clear_face_encoding()
+        db.session.commit()
+        assert alice.has_face_template is False
+    
+    def test_gallery_load_does_not_touch_user_table(self, repo):
+        from sqlalchemy import event
+        from app import db
+        
+        repo.save_face_encoding(_make_user('alice'), _encoding(1))
+        statements = []
+        
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            repo.load_gallery()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        assert len(repo._gallery) == 1
+        assert not any('FROM user' in statement for statement in statements)
@@ -0,0 +1,157 @@
+"""
+Tests para el seguimiento del rostro en el desafío de pose.
+"""
+
+import numpy as np
+import pytest
+
+
+class TestContinuity:
+    """Tests para is_continuous y PoseSession.observe."""
+
+    def test_small_motion_is_continuous(self):
+        from app.services.biometrics.tracking import is_continuous
+
+        assert is_continuous((100, 300, 300, 100), (110, 330, 310, 130))
+
+    def test_jump_or_scale_change_breaks_continuity(self):
+        from app.services.biometrics.tracking import is_continuous
+
+        assert not is_continuous((100, 300, 300, 100), (100, 900, 300, 700))
+        assert not is_continuous((100, 300, 300, 100), (100, 250, 150, 200))
+
+    def test_session_breaks_on_discontinuous_face(self):
+        from app.services.biometrics.tracking import PoseSession
+
+        session = PoseSession('t', 1, 0.0, 0.0)
+        assert session.observe((100, 300, 300, 100), (640, 480), tracked=False, now=1.0)
+        assert session.observe((105, 320, 305, 120), (640, 480), tracked=True, now=1.5)
+        assert session.tracking_box((640, 480)) == (105, 320, 305, 120)
+
+        assert not session.observe((100, 620, 300, 420), (640, 480), tracked=False, now=2.0)
+        assert session.broken
+        assert session.tracking_box((640, 480)) is None
+        assert session.tracked_frames == 1
+
+    def test_long_gap_breaks_continuity(self):
+        from app.services.biometrics.tracking import MAX_FRAME_GAP, PoseSession
+
+        session = PoseSession('t', 1, 0.0, 0.0)
+        session.observe((100, 300, 300, 100), (640, 480), tracked=False, now=1.0)
+
+        assert not session.observe((100, 300, 300, 100), (640, 480), tracked=False, now=2.0 + MAX_FRAME_GAP)
+
+
+class TestPoseSessionStore:
+    """Tests para el almacén de sesiones."""
+
+    def test_session_is_bound_to_user(self):
+        from app.services.biometrics.tracking import PoseSessionStore
+
+        store = PoseSessionStore()
+        token = store.create(user_id=1)
+
+        assert store.get(token, 2) is None
+        assert store.get(token, 1).user_id == 1
+
+    def test_pop_is_single_use(self):
+        from app.services.biometrics.tracking import PoseSessionStore
+
+        store = PoseSessionStore()
+        token = store.create(user_id=1)
+
+        assert store.pop(token, 1) is not None
+        assert store.pop(token, 1) is None
+
+    def test_expired_sessions_are_dropped(self):
+        from app.services.biometrics.tracking import PoseSessionStore
+
+        store = PoseSessionStore(ttl=-1)
+        token = store.create(user_id=1)
+
+        assert store.get(token, 1) is None
+        assert len(store) == 0
+
+
+class TestRegionDetection:
+    """Tests para la detección en la región de seguimiento."""
+
+    def test_region_boxes_are_remapped_to_frame(self, monkeypatch):
+        from app.services.biometrics import encoders
+        from app.services.biometrics.frame import FrameContext
+
+        seen = {}
+
+        def fake_detect(gray, model="hog", upsample=1):
+            seen['shape'] = gray.shape
+            seen['contiguous'] = gray.flags['C_CONTIGUOUS']
+            return [(10, 60, 60, 10)]
+
+        monkeypatch.setattr(encoders, 'detect_faces', fake_detect)
+        frame = FrameContext(gray=np.zeros((480, 640), np.uint8))
+
+        boxes = encoders.detect_faces_in_region(frame, (200, 300, 300, 200), padding=0.5, min_face_px=0)
+
+        # Recorte de 200x200 desde (150, 150): la caja se desplaza al frame
+        assert seen == {'shape': (200, 200), 'contiguous': True}
+        assert boxes == [(160, 210, 210, 160)]
+
+    def test_pose_task_falls_back_to_full_detection(self, monkeypatch):
+        from app.services.biometrics import tasks
+        from app.services.biometrics.frame import FrameContext
+
+        calls = []
+        monkeypatch.setattr(tasks.encoders, 'detect_faces_in_region', lambda frame, box: calls.append('track') or [])
+        monkeypatch.setattr(tasks.encoders, 'detect_faces_in_frame',
+                            lambda frame, ratio: calls.append('detect') or [(0, 9, 9, 0), (100, 300, 300, 100)])
+        monkeypatch.setattr(tasks.pose_checks, 'get_frame_metrics', lambda frame, box: None)
+        monkeypatch.setattr(tasks.pose_checks, 'validate_pose', lambda *args: (True, "ok"))
+
+        frame = FrameContext(gray=np.zeros((480, 640), np.uint8))
+        analysis = tasks.pose_challenge_task(frame, 'CENTER', (110, 310, 310, 110))
+
+        assert calls == ['track', 'detect']
+        assert analysis.tracked is False
+        # Entre varios rostros se evalúa el más cercano al seguido
+        assert analysis.box == (100, 300, 300, 100)
+        assert [stage for stage, _ in analysis.timings] == ['track', 'detect', 'landmarks']
+
+    def test_pose_task_uses_tracked_region(self, monkeypatch):
+        from app.services.biometrics import tasks
+        from app.services.biometrics.frame import FrameContext
+
+        monkeypatch.setattr(tasks.encoders, 'detect_faces_in_region', lambda frame, box: [(105, 305, 305, 105)])
+        monkeypatch.setattr(tasks.encoders, 'detect_faces_in_frame', lambda frame, ratio: pytest.fail("sin detección completa"))
+        monkeypatch.setattr(tasks.pose_checks, 'get_frame_metrics', lambda frame, box: None)
+        monkeypatch.setattr(tasks.pose_checks, 'validate_pose', lambda *args: (True, "ok"))
+
+        frame = FrameContext(gray=np.zeros((480, 640), np.uint8))
+        analysis = tasks.pose_challenge_task(frame, 'LEFT', (100, 300, 300, 100))
+
+        assert analysis.tracked is True
+        assert analysis.box == (105, 305, 305, 105)
+
+
+class TestPoseSessionPipeline:
+    """Tests para validate_pose_challenge con sesión de seguimiento."""
+
+    def test_discontinuous_frame_invalidates_session(self, monkeypatch):
+        from app.services.biometrics import pipelines
+        from app.services.biometrics.frame import FrameContext
+        from app.services.biometrics.tasks import PoseAnalysis
+        from app.services.biometrics.tracking import PoseSession
+
+        boxes = iter([(100, 300, 300, 100), (100, 620, 300, 420)])
+        monkeypatch.setattr(pipelines.encoders, 'decode_pose_frame', lambda data: FrameContext(gray=np.zeros((480, 640), np.uint8)))
+        monkeypatch.setattr(pipelines.tasks, 'pose_challenge_task',
+                            lambda frame, pose, last_box=None: PoseAnalysis(True, "ok", box=next(boxes)))
+        session = PoseSession('t', 1, 0.0, 0.0)
+
+        assert pipelines.validate_pose_challenge("img", "CENTER", session) == (True, "ok")
+        valid, message = pipelines.validate_pose_challenge("img", "LEFT", session)
+
+        assert valid is False
+        assert "reinicia" in message
+        assert session.passed_poses == ['CENTER']
+        assert not session.is_complete()
+
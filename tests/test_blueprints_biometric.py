@@ -1,3 +1,6 @@
+import pytest
+
+
 def test_face_login_page_accessible(client):
     resp = client.get('/face-login-page')
     assert resp.status_code == 200
@@ -8,3 +11,221 @@ def test_face_enroll_requires_login(client):
     resp = client.get('/face-enroll-page')
     # Flask-Login redirects to login when unauthenticated
     assert resp.status_code in (301, 302)
+
+
+def _capture_login(monkeypatch):
+    from app.services.biometrics import pipelines
+
+    calls = []
+
+    def fake_login(image_data, username=None, user_id=None):
+        calls.append((image_data, username, user_id))
+        return False, "Acceso Denegado", None
+
+    monkeypatch.setattr(pipelines, 'login_biometric_pipeline', fake_login)
+    return calls
+
+
+def test_face_login_accepts_raw_jpeg_body(client, monkeypatch):
+    calls = _capture_login(monkeypatch)
+
+    resp = client.post('/face-login?username=ana', data=b'\xff\xd8jpeg', content_type='image/jpeg')
+
+    assert resp.status_code == 401
+    assert calls == [(b'\xff\xd8jpeg', 'ana', None)]
+
+
+def test_face_login_accepts_multipart_upload(client, monkeypatch):
+    import io
+
+    calls = _capture_login(monkeypatch)
+
+    resp = client.post(
+        '/face-login',
+        data={'image': (io.BytesIO(b'\xff\xd8jpeg'), 'frame.jpg'), 'user_id': '7'},
+        content_type='multipart/form-data',
+    )
+
+    assert resp.status_code == 401
+    assert calls == [(b'\xff\xd8jpeg', None, 7)]
+
+
+def test_face_login_keeps_base64_json(client, monkeypatch):
+    calls = _capture_login(monkeypatch)
+
+    resp = client.post('/face-login', json={'image': 'data:image/jpeg;base64,AAAA'})
+
+    assert resp.status_code == 401
+    assert calls == [('data:image/jpeg;base64,AAAA', None, None)]
+
+
+def test_face_login_without_image_is_rejected(client):
+    resp = client.post('/face-login', data=b'', content_type='image/jpeg')
+    assert resp.status_code == 400
+
+
+@pytest.fixture()
+def csrf_client(db_app, monkeypatch):
+    monkeypatch.setitem(db_app.config, 'WTF_CSRF_ENABLED', True)
+    return db_app.test_client()
+
+
+def test_face_login_rejects_simple_request_without_csrf_token(csrf_client, monkeypatch):
+    calls = _capture_login(monkeypatch)
+
+    resp = csrf_client.post('/face-login?username=ana', data=b'\xff\xd8jpeg', content_type='image/jpeg')
+
+    assert resp.status_code == 400
+    assert calls == []
+
+
+def test_face_login_accepts_csrf_token_from_page(csrf_client, monkeypatch):
+    import io
+    from app.csrf import SESSION_KEY
+
+    calls = _capture_login(monkeypatch)
+    csrf_client.get('/face-login-page')
+    with csrf_client.session_transaction() as session:
+        token = session[SESSION_KEY]
+
+    resp = csrf_client.post('/face-login', data=b'\xff\xd8jpeg', content_type='image/jpeg',
+                            headers={'X-CSRFToken': token})
+    assert resp.status_code == 401
+
+    resp = csrf_client.post('/face-login', data={'image': (io.BytesIO(b'\xff\xd8jpeg'), 'f.jpg')},
+                            content_type='multipart/form-data', headers={'X-CSRFToken': 'otro'})
+    assert resp.status_code == 400
+    assert len(calls) == 1
+
+
+def _enroll_client(db_app, monkeypatch):
+    """Cliente autenticado con un enrolamiento CENTER fijo y plantillas de pose por frame."""
+    import cv2
+    import numpy as np
+    from app import db
+    from app.models import User
+    from app.services.biometrics import pipelines, repository, tasks
+    from app.services.biometrics.gallery import FaceGallery
+
+    monkeypatch.setattr(repository, '_gallery', FaceGallery())
+    user = User(username='ana', email='ana@x.com', password='x' * 60, confirmed=True)
+    db.session.add(user)
+    db.session.commit()
+
+    center = np.zeros(128, np.float32)
+    monkeypatch.setattr(pipelines, 'enroll_biometric_pipeline',
+                        lambda image_data: (True, "Registro Biométrico Exitoso", center))
+    # El valor del píxel de cada frame decide a qué distancia del CENTER queda su plantilla
+    monkeypatch.setattr(pipelines.tasks, 'pose_template_task', lambda frame, pose: tasks.FaceAnalysis(
+        tasks.FACE_OK, encoding=np.full(128, frame.bgr[0, 0, 0] / 1000.0, np.float32)))
+
+    client = db_app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+
+    def frame(value):
+        return cv2.imencode('.png', np.full((8, 8, 3), value, np.uint8))[1].tobytes()
+
+    return client, user, frame
+
+
+def _completed_pose_session(user_id):
+    from app.services.biometrics.tracking import get_session_store
+
+    store = get_session_store()
+    token = store.create(user_id)
+    store.get(token, user_id).passed_poses.extend(['LEFT', 'RIGHT'])
+    return token
+
+
+def test_face_enroll_drops_pose_templates_of_another_face(db_app, monkeypatch):
+    import base64
+    from app.models import FaceSample
+
+    client, user, frame = _enroll_client(db_app, monkeypatch)
+
+    # LEFT: distancia ≈ 0.11 (mismo rostro); RIGHT: distancia ≈ 2.2 (otra persona)
+    pose_frames = [
+        {'pose': 'LEFT', 'image': base64.b64encode(frame(10)).decode()},
+        {'pose': 'RIGHT', 'image': base64.b64encode(frame(200)).decode()},
+    ]
+    resp = client.post('/face-enroll', json={
+        'image': 'AAAA', 'pose_frames': pose_frames, 'pose_session': _completed_pose_session(user.id),
+    })
+
+    assert resp.status_code == 200
+    poses = sorted(sample.pose for sample in FaceSample.query.filter_by(user_id=user.id))
+    assert poses == ['CENTER', 'LEFT']
+
+
+def test_face_enroll_ignores_pose_frames_without_session(db_app, monkeypatch):
+    import base64
+    from app.models import FaceSample
+    from app.services.biometrics import pipelines
+
+    client, user, frame = _enroll_client(db_app, monkeypatch)
+    monkeypatch.setattr(pipelines.tasks, 'pose_template_task', lambda *a: pytest.fail("sin plantillas de pose"))
+
+    pose_frames = [{'pose': 'LEFT', 'image': base64.b64encode(frame(10)).decode()}]
+    resp = client.post('/face-enroll', json={'image': 'AAAA', 'pose_frames': pose_frames})
+
+    assert resp.status_code == 200
+    assert FaceSample.query.filter_by(user_id=user.id).count() == 0
+    assert user.get_face_encoding() is not None
+
+
+def test_face_enroll_rejects_incomplete_pose_session(db_app, monkeypatch):
+    from app.services.biometrics.tracking import get_session_store
+
+    client, user, _ = _enroll_client(db_app, monkeypatch)
+    token = get_session_store().create(user.id)
+
+    resp = client.post('/face-enroll', json={'image': 'AAAA', 'pose_session': token})
+
+    assert resp.status_code == 400
+
+
+def test_face_enroll_requires_csrf_token_when_enabled(db_app, monkeypatch):
+    from app.csrf import SESSION_KEY
+
+    client, user, _ = _enroll_client(db_app, monkeypatch)
+    monkeypatch.setitem(db_app.config, 'WTF_CSRF_ENABLED', True)
+    with client.session_transaction() as session:
+        session[SESSION_KEY] = 'token-de-la-sesion'
+
+    resp = client.post('/face-enroll', data=b'\xff\xd8jpeg', content_type='image/jpeg')
+    assert resp.status_code == 400
+    assert user.get_face_encoding() is None
+
+    resp = client.post('/face-enroll', data=b'\xff\xd8jpeg', content_type='image/jpeg',
+                       headers={'X-CSRFToken': 'token-de-la-sesion'})
+    assert resp.status_code == 200
+
+
+def test_face_enroll_keeps_pose_session_until_saved(db_app, monkeypatch):
+    import numpy as np
+    from app.services.biometrics import pipelines
+    from app.services.biometrics.engine import EngineBusyError
+    from app.services.biometrics.tracking import get_session_store
+
+    client, user, _ = _enroll_client(db_app, monkeypatch)
+    token = _completed_pose_session(user.id)
+    store = get_session_store()
+
+    def busy(image_data):
+        raise EngineBusyError("cola llena")
+
+    monkeypatch.setattr(pipelines, 'enroll_biometric_pipeline', busy)
+    assert client.post('/face-enroll', json={'image': 'AAAA', 'pose_session': token}).status_code == 503
+    assert store.get(token, user.id) is not None
+
+    monkeypatch.setattr(pipelines, 'enroll_biometric_pipeline',
+                        lambda image_data: (False, "Rostro no detectado", None))
+    assert client.post('/face-enroll', json={'image': 'AAAA', 'pose_session': token}).status_code == 400
+    assert store.get(token, user.id) is not None
+
+    center = np.zeros(128, np.float32)
+    monkeypatch.setattr(pipelines, 'enroll_biometric_pipeline',
+                        lambda image_data: (True, "Registro Biométrico Exitoso", center))
+    assert client.post('/face-enroll', json={'image': 'AAAA', 'pose_session': token}).status_code == 200
+    assert store.get(token, user.id) is None
@@ -0,0 +1,57 @@
+"""
+Tests para el formato binario de encodings faciales.
+"""
+
+import pickle
+
+import pytest
+import numpy as np
+
+
+class TestEncodeFaceEncoding:
+    """Tests para encode_face_encoding."""
+    
+    def test_v1_blob_is_header_plus_512_bytes(self):
+        from app.face_codec import encode_face_encoding, FORMAT_V1
+        
+        blob = encode_face_encoding(np.zeros(128))
+        
+        assert len(blob) == 513
+        assert blob[0] == FORMAT_V1
+    
+    def test_roundtrip_is_float32_zero_copy(self):
+        from app.face_codec import encode_face_encoding, decode_face_encoding
+        
+        original = np.random.default_rng(0).normal(0, 0.1, 128)
+        blob = encode_face_encoding(original)
+        
+        decoded = decode_face_encoding(blob)
+        
+        assert decoded.dtype == np.float32
+        assert decoded.base is not None
+        np.testing.assert_allclose(decoded, original, rtol=1e-6)
+
+
+class TestDecodeFaceEncoding:
+    """Tests para decode_face_encoding."""
+    
+    def test_reads_legacy_pickle(self):
+        from app.face_codec import decode_face_encoding, is_legacy_blob
+        
+        original = np.random.default_rng(1).normal(0, 0.1, 128)
+        blob = pickle.dumps(original)
+        
+        assert is_legacy_blob(blob) is True
+        np.testing.assert_array_equal(decode_face_encoding(blob), original)
+    
+    def test_empty_blob_returns_none(self):
+        from app.face_codec import decode_face_encoding
+        
+        assert decode_face_encoding(None) is None
+        assert decode_face_encoding(b'') is None
+    
+    def test_unknown_header_raises(self):
+        from app.face_codec import decode_face_encoding
+        
+        with pytest.raises(ValueError):
+            decode_face_encoding(b'\x07' + bytes(512))
@@ -0,0 +1,183 @@
+"""
+Tests para la política de hashing y la actualización transparente de hashes.
+"""
+
+import pytest
+
+
+class TestAlgorithms:
+    """Tests para los algoritmos identificados por prefijo."""
+
+    def test_scrypt_roundtrip(self):
+        from app.services.passwords import get_algorithm, identify, verify_password
+
+        scrypt = get_algorithm('scrypt')
+        pw_hash = scrypt.hash("Secreta1!", {'ln': 10, 'r': 8, 'p': 1})
+
+        assert pw_hash.startswith("$scrypt$ln=10,r=8,p=1$")
+        assert identify(pw_hash) is scrypt
+        assert scrypt.params_of(pw_hash) == {'ln': 10, 'r': 8, 'p': 1}
+        assert verify_password(pw_hash, "Secreta1!")
+        assert not verify_password(pw_hash, "otra")
+
+    def test_verify_dispatches_by_prefix(self):
+        from app.services.passwords import get_algorithm, verify_password
+
+        bcrypt_hash = get_algorithm('bcrypt').hash("Secreta1!", {'rounds': 4})
+
+        assert verify_password(bcrypt_hash, "Secreta1!")
+        assert not verify_password("$md5$desconocido", "Secreta1!")
+        assert not verify_password("$scrypt$roto", "Secreta1!")
+
+    def test_scrypt_cost_is_capped_by_memory(self):
+        from app.services.passwords import get_algorithm
+
+        scrypt = get_algorithm('scrypt')
+
+        # 128 · r · 2^16 = 64 MiB
+        assert scrypt.max_cost_for(65536) == 16
+        assert scrypt.max_cost_for(1) == scrypt.min_cost
+
+    def test_argon2_policy_requires_package(self):
+        from app.services.passwords import create_password_policy
+
+        # argon2-cffi es opcional
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            with pytest.raises(RuntimeError, match="argon2-cffi"):
+                create_password_policy({'PASSWORD_HASH_ALGORITHM': 'argon2id'})
+        else:
+            policy = create_password_policy({'PASSWORD_HASH_ALGORITHM': 'argon2id', 'PASSWORD_HASH_MEMORY_KIB': 1024})
+            assert policy.params == {'t': 3, 'm': 1024, 'p': 1}
+
+
+class TestPolicy:
+    """Tests para PasswordPolicy y la calibración."""
+
+    def test_needs_rehash_below_policy(self):
+        from app.services.passwords import PasswordPolicy, get_algorithm
+
+        bcrypt = get_algorithm('bcrypt')
+        policy = PasswordPolicy('bcrypt', {'rounds': 5})
+
+        assert policy.needs_rehash(bcrypt.hash("x", {'rounds': 4}))
+        assert not policy.needs_rehash(bcrypt.hash("x", {'rounds': 5}))
+        assert not policy.needs_rehash(bcrypt.hash("x", {'rounds': 6}))
+        assert not policy.needs_rehash("texto-plano-heredado")
+
+    def test_algorithm_change_needs_rehash(self):
+        from app.services.passwords import PasswordPolicy, get_algorithm
+
+        policy = PasswordPolicy('scrypt', {'ln': 10, 'r': 8, 'p': 1})
+
+        assert policy.needs_rehash(get_algorithm('bcrypt').hash("x", {'rounds': 4}))
+
+    def test_calibration_picks_largest_cost_within_target(self, monkeypatch):
+        from app.services.passwords import calibrate, get_algorithm
+
+        bcrypt = get_algorithm('bcrypt')
+        # Reloj simulado: cada hash tarda 2^(costo - 10) · 40 ms
+        monkeypatch.setattr(bcrypt, 'hash', lambda password, params: None)
+        durations = []
+
+        def clock():
+            return durations.pop(0) if durations else 0.0
+
+        def measured(cost):
+            return [0.0, 0.040 * 2 ** (cost - 10)]
+
+        for cost in range(10, 14):
+            durations.extend(measured(cost))
+
+        cost, elapsed = calibrate(bcrypt, 0.250, clock=clock)
+
+        # 40 → 80 → 160 ms; 320 ms superaría el objetivo
+        assert cost == 12
+        assert elapsed == pytest.approx(0.160)
+
+    def test_calibration_never_goes_below_floor(self, monkeypatch):
+        from app.services.passwords import calibrate, get_algorithm
+
+        bcrypt = get_algorithm('bcrypt')
+        monkeypatch.setattr(bcrypt, 'hash', lambda password, params: None)
+        ticks = iter([0.0, 1.0])
+
+        cost, _ = calibrate(bcrypt, 0.010, clock=lambda: next(ticks))
+
+        assert cost == bcrypt.min_cost
+
+    def test_fixed_cost_without_target(self):
+        from app.services.passwords import create_password_policy
+
+        assert create_password_policy({'BCRYPT_LOG_ROUNDS': 11}).params == {'rounds': 11}
+        assert create_password_policy({'PASSWORD_HASH_ALGORITHM': 'scrypt'}).params == {'ln': 15, 'r': 8, 'p': 1}
+
+    def test_pinned_cost_skips_calibration(self, monkeypatch):
+        from app.services.passwords import policy as policy_module
+
+        monkeypatch.setattr(policy_module, 'calibrate', lambda *a: pytest.fail("no debe calibrar"))
+        config = {'PASSWORD_HASH_COST': 11, 'PASSWORD_HASH_TARGET_MS': 250}
+
+        assert policy_module.create_password_policy(config).params == {'rounds': 11}
+
+
+class TestRehashOnLogin:
+    """Tests para la actualización del hash tras un login correcto."""
+
+    def _user(self, password_hash):
+        from app import db
+        from app.models import User
+
+        user = User(username='ana', email='ana@x.com', password=password_hash, confirmed=True)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+    def test_login_upgrades_weak_hash(self, db_app, monkeypatch):
+        from app.models import User
+        from app.services.passwords import InlineHasher, PasswordPolicy, get_algorithm, identify, upgrade
+        from app.services.passwords import hasher as hasher_module
+
+        policy = PasswordPolicy('scrypt', {'ln': 10, 'r': 8, 'p': 1})
+        monkeypatch.setattr(hasher_module, '_hasher', InlineHasher(policy))
+        futures = []
+        schedule = upgrade.schedule_rehash
+        monkeypatch.setattr(
+            'app.blueprints.auth.auth_password.routes.schedule_rehash',
+            lambda user, password: futures.append(schedule(user, password)),
+        )
+        user_id = self._user(get_algorithm('bcrypt').hash("Secreta1!", {'rounds': 4}))
+
+        resp = db_app.test_client().post('/login', data={'username': 'ana', 'password': 'Secreta1!'})
+        assert resp.status_code == 302
+        assert futures[0].result(timeout=5) is True
+
+        stored = User.query.with_entities(User.password).filter_by(id=user_id).scalar()
+        assert identify(stored).name == 'scrypt'
+        assert not policy.needs_rehash(stored)
+
+    def test_concurrent_password_change_is_not_overwritten(self, db_app):
+        from app import db
+        from app.models import User
+        from app.services.passwords import InlineHasher, PasswordPolicy, get_algorithm
+        from app.services.passwords.upgrade import rehash_password
+
+        old_hash = get_algorithm('bcrypt').hash("Vieja1!", {'rounds': 4})
+        user_id = self._user(old_hash)
+        User.query.filter_by(id=user_id).update({'password': 'cambiada'})
+        db.session.commit()
+
+        hasher = InlineHasher(PasswordPolicy('bcrypt', {'rounds': 5}))
+
+        assert rehash_password(db_app, hasher, user_id, old_hash, "Vieja1!") is False
+        assert User.query.with_entities(User.password).filter_by(id=user_id).scalar() == 'cambiada'
+
+
+class TestPasswordColumn:
+    """Tests para la ampliación de user.password."""
+
+    def test_sqlite_needs_no_alter(self, db_app):
+        from app.services.passwords import widen_password_column
+
+        assert widen_password_column() is False
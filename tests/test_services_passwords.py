@@ -0,0 +1,183 @@
+"""
+Tests para el servicio de hashing de contraseñas.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+
+def _bcrypt(rounds=4):
+    from app.services.passwords import PasswordPolicy
+
+    return PasswordPolicy('bcrypt', {'rounds': rounds})
+
+
+class TestInlineHasher:
+    """Tests para InlineHasher."""
+
+    def test_hash_roundtrip(self):
+        from app.services.passwords import InlineHasher
+
+        hasher = InlineHasher(_bcrypt())
+        pw_hash = hasher.hash("Secreta1!")
+
+        assert pw_hash.startswith("$2b$04$")
+        assert hasher.verify(pw_hash, "Secreta1!")
+        assert not hasher.verify(pw_hash, "otra")
+
+    def test_accepts_flask_bcrypt_hashes(self):
+        from app import bcrypt
+        from app.services.passwords import InlineHasher
+
+        legacy = bcrypt.generate_password_hash("Secreta1!", 4).decode('utf-8')
+
+        assert InlineHasher().verify(legacy, "Secreta1!")
+
+    def test_invalid_hash_does_not_match(self):
+        from app.services.passwords import InlineHasher
+
+        hasher = InlineHasher()
+
+        assert not hasher.verify("no-es-un-hash", "Secreta1!")
+        assert not hasher.verify(None, "Secreta1!")
+
+
+class TestProcessPoolHasher:
+    """Tests para el pool de hashing."""
+
+    def test_runs_in_pool(self):
+        from app.services.passwords import ProcessPoolHasher
+
+        hasher = ProcessPoolHasher(_bcrypt(), workers=1)
+        try:
+            pw_hash = hasher.hash("Secreta1!")
+            assert hasher.verify(pw_hash, "Secreta1!")
+        finally:
+            hasher.shutdown()
+        assert hasher.pending == 0
+
+    def test_full_queue_rejects(self):
+        from app.services.passwords import HasherBusyError, ProcessPoolHasher
+
+        hasher = ProcessPoolHasher(_bcrypt(), workers=1, max_pending=1)
+        try:
+            hasher._pending = 1
+            with pytest.raises(HasherBusyError):
+                hasher.hash("Secreta1!")
+        finally:
+            hasher._pending = 0
+            hasher.shutdown()
+
+    def test_timeout_keeps_slot_until_job_finishes(self):
+        from app.services.passwords import HasherTimeoutError, ProcessPoolHasher
+
+        hasher = ProcessPoolHasher(_bcrypt(14), workers=1, timeout=0.01)
+        try:
+            with pytest.raises(HasherTimeoutError):
+                hasher.hash("Secreta1!")
+            assert hasher.pending == 1
+        finally:
+            hasher.shutdown()
+
+
+class TestFactory:
+    """Tests para create_password_hasher y get_password_hasher."""
+
+    def test_factory_selects_backend(self):
+        from app.services.passwords import InlineHasher, ProcessPoolHasher, create_password_hasher
+
+        inline = create_password_hasher({'PASSWORD_HASHER': 'inline', 'BCRYPT_LOG_ROUNDS': 5})
+        assert isinstance(inline, InlineHasher)
+        assert inline.policy.params == {'rounds': 5}
+
+        assert isinstance(create_password_hasher({}), InlineHasher)
+
+        pool = create_password_hasher({'PASSWORD_HASHER': 'process', 'PASSWORD_HASH_WORKERS': 2, 'PASSWORD_HASH_TIMEOUT': 1.5})
+        try:
+            assert isinstance(pool, ProcessPoolHasher)
+            assert (pool.workers, pool.max_pending, pool.timeout) == (2, 8, 1.5)
+        finally:
+            pool.shutdown()
+
+    def test_pool_is_sized_per_web_worker(self, monkeypatch):
+        import os
+        from app.services.passwords import ProcessPoolHasher
+
+        monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+        monkeypatch.setenv('WEB_CONCURRENCY', '4')
+
+        hasher = ProcessPoolHasher(_bcrypt())
+        try:
+            assert hasher.workers == 2
+        finally:
+            hasher.shutdown()
+
+    def test_outside_app_context_runs_inline(self):
+        from app.services.passwords import InlineHasher, get_password_hasher
+
+        assert isinstance(get_password_hasher(), InlineHasher)
+
+    def test_records_metrics(self, monkeypatch):
+        from app.metrics import MetricsRegistry
+        from app.services.passwords import InlineHasher, hasher as hasher_module
+
+        metrics = MetricsRegistry()
+        metrics.enabled = True
+        monkeypatch.setattr(hasher_module, 'metrics_registry', metrics)
+
+        InlineHasher(_bcrypt()).hash("Secreta1!")
+
+        histogram = metrics.get(hasher_module.PASSWORD_METRIC, op='hash', outcome='ok')
+        assert histogram.count == 1
+
+
+def test_importing_passwords_does_not_load_biometrics():
+    code = (
+        "import sys\n"
+        "import app.services.passwords\n"
+        "assert 'app.services.biometrics' not in sys.modules\n"
+        "assert 'cv2' not in sys.modules\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+
+
+class TestLoginRoute:
+    """Tests para el login con el servicio de hashing."""
+
+    def _user(self, password_hash):
+        from app import db
+        from app.models import User
+
+        user = User(username='ana', email='ana@x.com', password=password_hash, confirmed=True)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def test_busy_hasher_returns_503(self, db_app, monkeypatch):
+        from app.blueprints.auth.auth_password import routes
+        from app.services.passwords import HasherBusyError
+
+        def busy(pw_hash, password):
+            raise HasherBusyError("llena")
+
+        self._user("$2b$04$" + "x" * 53)
+        monkeypatch.setattr(routes, 'check_password', busy)
+
+        resp = db_app.test_client().post('/login', data={'username': 'ana', 'password': 'Secreta1!'})
+
+        assert resp.status_code == 503
+
+    def test_valid_password_logs_in(self, db_app, monkeypatch):
+        from app.services.passwords import InlineHasher, hasher as hasher_module
+
+        monkeypatch.setattr(hasher_module, '_hasher', InlineHasher(_bcrypt()))
+        self._user(InlineHasher(_bcrypt()).hash("Secreta1!"))
+
+        resp = db_app.test_client().post('/login', data={'username': 'ana', 'password': 'Secreta1!'})
+
+        assert resp.status_code == 302
+        assert '/dashboard' in resp.headers['Location']
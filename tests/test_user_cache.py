@@ -0,0 +1,193 @@
+"""
+Tests para la caché del user_loader.
+"""
+
+
+class TestUserCache:
+    """Tests para el LRU con TTL."""
+
+    def test_entries_expire(self):
+        from app.user_cache import UserCache
+
+        now = [0.0]
+        cache = UserCache(ttl=10, clock=lambda: now[0])
+        cache.put(1, {'id': 1})
+
+        assert cache.get(1) == {'id': 1}
+        now[0] = 11.0
+        assert cache.get(1) is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        from app.user_cache import UserCache
+
+        cache = UserCache(max_size=2)
+        cache.put(1, {'id': 1})
+        cache.put(2, {'id': 2})
+        cache.get(1)
+        cache.put(3, {'id': 3})
+
+        assert cache.get(2) is None
+        assert cache.get(1) == {'id': 1}
+
+    def test_zero_ttl_disables_cache(self):
+        from app.user_cache import UserCache
+
+        cache = UserCache(ttl=0)
+        cache.put(1, {'id': 1})
+
+        assert cache.get(1) is None
+
+
+class TestLoadUser:
+    """Tests para load_user con caché."""
+
+    def _user(self):
+        import numpy as np
+        from app import db
+        from app.models import User
+
+        user = User(username='ana', email='ana@x.com', password='x', confirmed=True)
+        user.set_face_encoding(np.ones(128, dtype=np.float32))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        db.session.remove()
+        return user_id
+
+    def _request(self, app):
+        # Como en un request real: app context propio (flask.g nuevo)
+        from contextlib import ExitStack
+
+        stack = ExitStack()
+        stack.enter_context(app.app_context())
+        stack.enter_context(app.test_request_context())
+        return stack
+
+    def _statements(self):
+        from sqlalchemy import event
+        from app import db
+
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        return statements, lambda: event.remove(db.engine, 'before_cursor_execute', listener)
+
+    def test_second_request_skips_database(self, db_app):
+        from app import db
+        from app.models import load_user
+
+        user_id = self._user()
+        statements, stop = self._statements()
+        try:
+            with self._request(db_app):
+                user = load_user(str(user_id))
+                assert load_user(str(user_id)) is user
+            db.session.remove()
+            with self._request(db_app):
+                cached = load_user(str(user_id))
+                assert cached.username == 'ana'
+                assert cached.is_authenticated
+        finally:
+            stop()
+
+        # Una sola consulta, solo sobre la fila del usuario (el encoding vive en face_template)
+        assert len(statements) == 1
+        assert 'face_template' not in statements[0]
+
+    def test_cached_user_loads_encoding_on_demand(self, db_app):
+        import numpy as np
+        from app import db
+        from app.models import load_user
+
+        user_id = self._user()
+        with self._request(db_app):
+            load_user(str(user_id))
+        db.session.remove()
+
+        with self._request(db_app):
+            user = load_user(str(user_id))
+            assert np.allclose(user.get_face_encoding(), 1.0)
+
+    def test_orm_update_invalidates(self, db_app):
+        from app import db
+        from app.models import User, load_user
+        from app.user_cache import get_user_cache
+
+        user_id = self._user()
+        with self._request(db_app):
+            load_user(str(user_id))
+        db.session.remove()
+
+        with self._request(db_app):
+            user = load_user(str(user_id))
+            user.otp_secret = 'SECRETO'
+            db.session.commit()
+            assert get_user_cache().get(user_id) is None
+        db.session.remove()
+
+        with self._request(db_app):
+            assert load_user(str(user_id)).otp_secret == 'SECRETO'
+
+        User.query.filter_by(id=user_id).update({'confirmed': False})
+        db.session.commit()
+        assert get_user_cache().get(user_id) is None
+
+    def test_invalidation_waits_for_commit(self, db_app):
+        from app import db
+        from app.models import User, load_user
+        from app.user_cache import get_user_cache
+
+        user_id = self._user()
+        with self._request(db_app):
+            user = db.session.get(User, user_id)
+            user.phone_number = '555'
+            db.session.flush()
+            # Un request concurrente lee la fila confirmada entre el flush y el commit
+            get_user_cache().put(user_id, {'id': user_id, 'username': 'ana'})
+            db.session.commit()
+            assert get_user_cache().get(user_id) is None
+
+            user.phone_number = '666'
+            db.session.flush()
+            get_user_cache().put(user_id, {'id': user_id, 'username': 'ana'})
+            db.session.rollback()
+            assert get_user_cache().get(user_id) is not None
+
+    def test_security_columns_are_read_from_database(self, db_app):
+        from sqlalchemy import text
+        from app import db
+        from app.models import load_user
+
+        user_id = self._user()
+        with self._request(db_app):
+            load_user(str(user_id))
+        db.session.remove()
+
+        # Otro proceso activa el 2FA: esta caché no se entera
+        with db.engine.begin() as connection:
+            connection.execute(text("UPDATE user SET otp_secret = 'OTRO' WHERE id = :id"), {'id': user_id})
+
+        with self._request(db_app):
+            user = load_user(str(user_id))
+            assert user.otp_secret == 'OTRO'
+            assert user.confirmed is True
+
+    def test_session_instance_wins_over_cache(self, db_app):
+        from app import db
+        from app.models import User, load_user
+
+        user_id = self._user()
+        with self._request(db_app):
+            load_user(str(user_id))
+        db.session.remove()
+
+        with self._request(db_app):
+            user = db.session.get(User, user_id)
+            user.username = 'ana2'
+
+            assert load_user(str(user_id)) is user
+            assert user.username == 'ana2'